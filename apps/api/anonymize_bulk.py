@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Anonymize document archives offline, without going through the API.
+
+Usage:
+    python anonymize_bulk.py ARCHIVE_DIR [MORE_PATHS ...] > anonymized.ndjson
+    python anonymize_bulk.py < documents.ndjson > anonymized.ndjson
+
+Paths may be files or directories; directories are walked recursively for
+.txt, .md, .pdf and .docx files.  With no paths (or ``-``), NDJSON is read
+from stdin, one ``{"id": ..., "text": ...}`` object per line.
+
+Documents are spread over a pool of worker processes (at most two by
+default), each of which loads the analyzer once.  With a profile that uses
+NER that is a private copy of the model per worker -- roughly 1 GB for
+``en_core_web_lg`` -- so raise ``--workers`` only as far as memory allows;
+``--profile fast`` loads no model.  Every document gets its own mapping,
+seeded from its text, so re-running the script on the same
+input gives the same replacements.  One NDJSON line is written per
+document as soon as it is done:
+
+    {"id": ..., "anonymized_text": ..., "mapping": [...], "entities_found": [...]}
+
+or ``{"id": ..., "error": ...}`` if it could not be read or anonymized.
+Output order follows completion unless ``--ordered`` is given.  Progress
+goes to stderr; the exit status is 1 if any document failed.
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import Iterator, Optional
+
+EXTENSIONS = (".txt", ".md", ".pdf", ".docx")
+# Small by default: with NER, every worker holds its own copy of the model.
+DEFAULT_WORKERS = min(2, os.cpu_count() or 1)
+
+
+# --- Worker side ---
+
+_profile: Optional[str] = None
+
+
+def _init_worker(profile: Optional[str]) -> None:
+    global _profile
+    _profile = profile
+
+    from services.anonymization.analyzer import warm_up
+    from services.anonymization.fake_bank import get_bank
+    from services.anonymization.profiles import get_profile
+
+    # Profiles without NER never touch the model; do not load it.
+    if get_profile(profile)["use_nlp"]:
+        warm_up()
+    get_bank()
+
+
+def _read_text(path: str) -> str:
+    """Extract the text of *path* the same way ``/api/ingest/parse-file`` does."""
+    with open(path, "rb") as f:
+        content = f.read()
+    name = path.lower()
+
+    if name.endswith(".pdf"):
+        import pypdf
+        reader = pypdf.PdfReader(io.BytesIO(content))
+        return "".join((page.extract_text() or "") + "\n\n" for page in reader.pages)
+
+    if name.endswith(".docx"):
+        import docx
+        doc = docx.Document(io.BytesIO(content))
+        return "\n\n".join(p.text for p in doc.paragraphs)
+
+    return content.decode("utf-8", errors="replace")
+
+
+def _anonymize(task: tuple[str, Optional[str], Optional[str]]) -> tuple[dict, int]:
+    """Anonymize one document; returns its output record and character count."""
+    from services.anonymization import engine
+
+    doc_id, path, text = task
+    try:
+        if text is None:
+            text = _read_text(path)
+        result = engine.anonymize(text, profile=_profile)
+    except Exception as e:
+        return {"id": doc_id, "error": f"{type(e).__name__}: {e}"}, 0
+    return {"id": doc_id, **result}, len(text)
+
+
+# --- Input ---
+
+def _walk(paths: list[str]) -> Iterator[tuple[str, Optional[str], Optional[str]]]:
+    """Yield ``(id, path, None)`` for each supported file under *paths*."""
+    for root in paths:
+        if not os.path.isdir(root):
+            yield root, root, None
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith(EXTENSIONS):
+                    path = os.path.join(dirpath, filename)
+                    yield path, path, None
+
+
+def _stdin() -> Iterator[tuple[str, Optional[str], Optional[str]]]:
+    """Yield ``(id, None, text)`` for each NDJSON line on stdin."""
+    for number, line in enumerate(sys.stdin, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            text = record["text"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"Skipping line {number}: {e!r}", file=sys.stderr)
+            continue
+        yield str(record.get("id", number)), None, text
+
+
+def _bounded(tasks: Iterator, slots: threading.Semaphore) -> Iterator:
+    """Hold back *tasks* until a slot is free.
+
+    ``Pool.imap`` reads its input as fast as it can, which for a large
+    stdin stream would buffer the whole archive in memory.
+    """
+    for task in tasks:
+        slots.acquire()
+        yield task
+
+
+# --- Progress ---
+
+class Progress:
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.documents = 0
+        self.errors = 0
+        self.chars = 0
+        self._started = time.perf_counter()
+        self._shown = 0.0
+
+    def update(self, record: dict, chars: int) -> None:
+        self.documents += 1
+        self.errors += "error" in record
+        self.chars += chars
+        now = time.perf_counter()
+        if now - self._shown >= 0.5:
+            self._shown = now
+            self.show()
+
+    def show(self, end: str = "") -> None:
+        if not self.enabled:
+            return
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        print(
+            f"\r{self.documents} documents ({self.errors} failed) | "
+            f"{self.documents / elapsed:.1f} docs/s | {self.chars / elapsed:,.0f} chars/s",
+            end=end,
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", help="files or directories (default: NDJSON on stdin)")
+    parser.add_argument("--output", "-o", help="write NDJSON here instead of stdout")
+    parser.add_argument("--profile", default=None, help="detection profile (default: full)")
+    parser.add_argument("--workers", "-j", type=int, default=DEFAULT_WORKERS,
+                        help=f"worker processes (default: {DEFAULT_WORKERS}; 0 runs in this "
+                        "process).  Unless --profile skips NER, each worker loads its own "
+                        "copy of the NER model, about 1 GB for spacy-lg")
+    parser.add_argument("--ordered", action="store_true", help="write results in input order")
+    parser.add_argument("--quiet", "-q", action="store_true", help="no progress on stderr")
+    args = parser.parse_args()
+
+    from services.anonymization.pool import START_METHOD
+    from services.anonymization.profiles import get_profile
+
+    try:
+        get_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+
+    paths = [p for p in args.paths if p != "-"]
+    tasks = _walk(paths) if paths else _stdin()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    progress = Progress(not args.quiet)
+
+    def write(record: dict, chars: int) -> None:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        progress.update(record, chars)
+
+    try:
+        if args.workers <= 0:
+            _init_worker(args.profile)
+            for task in tasks:
+                write(*_anonymize(task))
+        else:
+            slots = threading.Semaphore(args.workers * 4)
+            context = multiprocessing.get_context(START_METHOD)
+            with context.Pool(args.workers, _init_worker, (args.profile,)) as pool:
+                imap = pool.imap if args.ordered else pool.imap_unordered
+                for record, chars in imap(_anonymize, _bounded(tasks, slots)):
+                    slots.release()
+                    write(record, chars)
+    finally:
+        progress.show(end="\n")
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+
+    return 1 if progress.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
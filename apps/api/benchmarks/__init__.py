@@ -0,0 +1,8 @@
+"""Offline performance benchmarks for the BurnChat API services.
+
+Run modules from ``apps/api``, e.g. ``python -m benchmarks.span_resolution``.
+``benchmarks.suite`` runs the anonymization services over the synthetic
+corpus in ``benchmarks.corpus`` and writes JSON for comparing releases;
+``benchmarks.ner_backends`` scores the NLP backends against its gold spans,
+and ``benchmarks.embedding_backends`` times the embedding backends.
+"""
@@ -0,0 +1,242 @@
+"""
+Deterministic synthetic legal corpus for benchmarks and evaluation.
+
+Generates contracts, pleadings and emails of a requested size with a
+controlled density of PII, and records where every planted entity is (the
+"gold" spans), so the same corpus can be used to measure throughput and to
+score detection quality.  Values come from fixed word lists and a seeded
+``random.Random`` -- not Faker -- so a given (kind, size, density, seed)
+always produces byte-identical text across releases and library versions.
+
+Usage (from ``apps/api``), to write a document to stdout::
+
+    python -m benchmarks.corpus --kind pleading --size 100k [--density 4] [--seed 0]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from typing import Callable, NamedTuple
+
+from services.anonymization.spans import Span
+
+KINDS = ("contract", "pleading", "email")
+
+SIZES: dict[str, int] = {
+    "1k": 1_000,
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "5m": 5_000_000,
+}
+
+# Planted entities per 1,000 characters.
+DEFAULT_DENSITY = 4.0
+
+
+class Document(NamedTuple):
+    """A generated document and the entities planted in it."""
+
+    kind: str
+    size: str
+    text: str
+    spans: list[Span]
+
+
+# --- Value pools ----------------------------------------------------------
+
+_FIRST = [
+    "Maria", "James", "Wei", "Fatima", "Oliver", "Priya", "Diego", "Anna",
+    "Samuel", "Grace", "Tomasz", "Aisha", "Henry", "Mei", "Lucas", "Ruth",
+]
+_LAST = [
+    "Garcia", "Smith", "Chen", "Khan", "Brown", "Patel", "Lopez", "Novak",
+    "Okafor", "Schmidt", "Rossi", "Nguyen", "Walker", "Haddad", "Silva", "Cohen",
+]
+_COMPANIES = [
+    "Acme Holdings LLC", "Northwind Traders Inc.", "Bluewater Capital LP",
+    "Granite Peak Logistics Corp.", "Harbor & Finch LLP", "Summit Ridge Partners",
+]
+_CITIES = ["Chicago", "Houston", "Phoenix", "Denver", "Seattle", "Boston", "Atlanta", "Portland"]
+_MONTHS = [
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+]
+_COURTS = [
+    "United States District Court for the Southern District of New York",
+    "U.S. Court of Appeals for the Ninth Circuit",
+    "Superior Court of California, County of Los Angeles",
+    "Circuit Court of Cook County",
+    "U.S. Bankruptcy Court for the District of Delaware",
+]
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+
+
+def _email(rng: random.Random) -> str:
+    return f"{rng.choice(_FIRST).lower()}.{rng.choice(_LAST).lower()}{rng.randint(1, 99)}@example.com"
+
+
+def _phone(rng: random.Random) -> str:
+    return f"({rng.randint(201, 989)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+
+
+def _ssn(rng: random.Random) -> str:
+    return f"{rng.randint(100, 665)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}"
+
+
+def _date(rng: random.Random) -> str:
+    return f"{rng.choice(_MONTHS)} {rng.randint(1, 28)}, {rng.randint(2015, 2025)}"
+
+
+def _case_number(rng: random.Random) -> str:
+    return f"{rng.randint(1, 9)}:{rng.randint(18, 25)}-cv-{rng.randint(10000, 99999)}"
+
+
+def _credit_card(rng: random.Random) -> str:
+    digits = [4] + [rng.randint(0, 9) for _ in range(14)]
+    # Luhn check digit, so validating recognizers accept the number.
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    digits.append((10 - total % 10) % 10)
+    number = "".join(map(str, digits))
+    return " ".join(number[i : i + 4] for i in range(0, 16, 4))
+
+
+def _ip(rng: random.Random) -> str:
+    return f"{rng.randint(11, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+_VALUES: dict[str, Callable[[random.Random], str]] = {
+    "PERSON": _person,
+    "ORGANIZATION": lambda rng: rng.choice(_COMPANIES),
+    "LOCATION": lambda rng: rng.choice(_CITIES),
+    "EMAIL_ADDRESS": _email,
+    "PHONE_NUMBER": _phone,
+    "US_SSN": _ssn,
+    "DATE_TIME": _date,
+    "CASE_NUMBER": _case_number,
+    "COURT_NAME": lambda rng: rng.choice(_COURTS),
+    "CREDIT_CARD": _credit_card,
+    "IP_ADDRESS": _ip,
+}
+
+# --- Templates --------------------------------------------------------------
+# ``{TYPE}`` marks an entity slot; everything else is literal text.
+
+_TEMPLATES: dict[str, list[str]] = {
+    "contract": [
+        "This Agreement is entered into on {DATE_TIME} by and between {ORGANIZATION} and {PERSON}. ",
+        "Notices shall be sent to {PERSON} at {EMAIL_ADDRESS} or by telephone at {PHONE_NUMBER}. ",
+        "The Contractor's principal office is located in {LOCATION}. ",
+        "Payment shall be made to the card ending in the number {CREDIT_CARD} on file. ",
+        "Any dispute shall be resolved exclusively in the {COURT_NAME}. ",
+    ],
+    "pleading": [
+        "Plaintiff {PERSON}, by and through counsel, files this complaint in Case No. {CASE_NUMBER}. ",
+        "This action is properly before the {COURT_NAME}. ",
+        "On {DATE_TIME}, Defendant {PERSON} accessed the system from IP address {IP_ADDRESS}. ",
+        "Plaintiff's Social Security number, {US_SSN}, was disclosed without consent. ",
+        "Counsel for {ORGANIZATION} may be reached at {EMAIL_ADDRESS}. ",
+    ],
+    "email": [
+        "Hi {PERSON}, following up on our call from {DATE_TIME}. ",
+        "Please reach me at {PHONE_NUMBER} or reply to {EMAIL_ADDRESS}. ",
+        "I will be in {LOCATION} next week to meet with {ORGANIZATION}. ",
+        "Forwarding the filing in {CASE_NUMBER} for your review. ",
+        "Thanks, {PERSON}\n\n",
+    ],
+}
+
+_FILLER: dict[str, list[str]] = {
+    "contract": [
+        "The parties agree that the deliverables described in Schedule A shall be completed "
+        "no later than the dates set out therein. ",
+        "Neither party shall be liable for any failure to perform caused by circumstances "
+        "beyond its reasonable control. ",
+        "This Agreement constitutes the entire understanding of the parties.\n\n",
+    ],
+    "pleading": [
+        "Plaintiff repeats and realleges each of the foregoing paragraphs as if fully set forth herein. ",
+        "Defendant's conduct was willful, wanton, and in reckless disregard of Plaintiff's rights. ",
+        "WHEREFORE, Plaintiff respectfully requests that the Court grant the relief requested.\n\n",
+    ],
+    "email": [
+        "Let me know if the attached draft works for everyone. ",
+        "I have a few comments on section four that we can go through on the next call. ",
+        "Best regards and talk soon.\n\n",
+    ],
+}
+
+
+def _fill(template: str, rng: random.Random, offset: int, spans: list[Span]) -> str:
+    """Expand *template*, appending a gold span for each slot."""
+    parts: list[str] = []
+    length = 0
+    rest = template
+    while "{" in rest:
+        before, _, tail = rest.partition("{")
+        entity_type, _, rest = tail.partition("}")
+        value = _VALUES[entity_type](rng)
+        parts.append(before)
+        length += len(before)
+        spans.append(Span(offset + length, offset + length + len(value), entity_type, 1.0))
+        parts.append(value)
+        length += len(value)
+    parts.append(rest)
+    return "".join(parts)
+
+
+def generate(
+    kind: str, size: str | int, density: float = DEFAULT_DENSITY, seed: int = 0
+) -> Document:
+    """Generate one document of roughly *size* characters.
+
+    *size* is a key of ``SIZES`` or a character count.  *density* is the
+    target number of planted entities per 1,000 characters.
+    """
+    if kind not in _TEMPLATES:
+        raise ValueError(f"Unknown document kind '{kind}'. Available: {', '.join(KINDS)}")
+    chars = SIZES[size] if isinstance(size, str) else size
+    rng = random.Random(f"{kind}:{chars}:{density}:{seed}")
+
+    parts: list[str] = []
+    spans: list[Span] = []
+    length = 0
+    while length < chars:
+        # Keep the running entity count on target for the text so far.
+        if len(spans) < density * length / 1000:
+            part = _fill(rng.choice(_TEMPLATES[kind]), rng, length, spans)
+        else:
+            part = rng.choice(_FILLER[kind])
+        parts.append(part)
+        length += len(part)
+    return Document(kind, str(size), "".join(parts), spans)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--kind", choices=KINDS, default="contract")
+    parser.add_argument("--size", default="10k", help=f"one of {', '.join(SIZES)} or a character count")
+    parser.add_argument("--density", type=float, default=DEFAULT_DENSITY)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    size = args.size if args.size in SIZES else int(args.size)
+    document = generate(args.kind, size, args.density, args.seed)
+    sys.stdout.write(document.text)
+    print(f"{len(document.text):,} chars, {len(document.spans):,} entities", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
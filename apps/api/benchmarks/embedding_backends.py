@@ -0,0 +1,151 @@
+"""
+Throughput and query latency of the embedding backends.
+
+Chunks the synthetic corpus with ``chunker.chunk_document`` and embeds
+the chunks with each backend, bypassing the embedding cache, to get
+chunks and tokens per second (median of the repeated runs).  Then embeds
+a one-sentence query ``--queries`` times, one call each, for the latency
+``/api/chat`` and ``/documents/search`` add before retrieval.
+
+``hashing`` needs nothing; ``onnx`` needs ``onnxruntime``, ``tokenizers``
+and an exported model; ``openrouter`` needs ``OPENROUTER_API_KEY`` and
+the network.  A backend may name a model as ``backend=model``.
+
+Usage (from ``apps/api``)::
+
+    python -m benchmarks.embedding_backends [--backends hashing,onnx]
+        [--kinds contract,pleading,email] [--sizes 100k] [--repeat 3]
+        [--queries 50] [--output results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.corpus import DEFAULT_DENSITY, KINDS, SIZES, generate
+from benchmarks.suite import percentile
+
+DEFAULT_BACKENDS = ("hashing", "onnx")
+DEFAULT_SIZES = ("100k",)
+QUERY = "What notice period applies if the tenant ends the lease early?"
+
+
+async def evaluate(
+    backend: str, model: str | None, chunks: list[dict], repeat: int, queries: int
+) -> dict:
+    from services.rag.embedder import create_backend
+
+    started = time.perf_counter()
+    embedder = create_backend(backend, model)
+    load_seconds = time.perf_counter() - started
+
+    texts = [chunk["text"] for chunk in chunks]
+    token_counts = [chunk["token_count"] for chunk in chunks]
+    samples: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await embedder.embed(texts, token_counts)
+        samples.append(time.perf_counter() - started)
+    seconds = percentile(samples, 50)
+
+    latencies: list[float] = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        await embedder.embed([QUERY], None)
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "model": model,
+        "name": embedder.name,
+        "load_seconds": round(load_seconds, 3),
+        "chunks": len(texts),
+        "chunks_per_sec": round(len(texts) / seconds, 1) if seconds else None,
+        "tokens_per_sec": round(sum(token_counts) / seconds) if seconds else None,
+        "query_p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "query_p95_ms": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+    }
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    from services.rag.chunker import chunk_document
+    from services.rag.embedder import EMBEDDING_BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", type=_csv, default=list(DEFAULT_BACKENDS),
+                        help=f"from {', '.join(EMBEDDING_BACKENDS)}; optionally backend=model")
+    parser.add_argument("--kinds", type=_csv, default=list(KINDS))
+    parser.add_argument("--sizes", type=_csv, default=list(DEFAULT_SIZES))
+    parser.add_argument("--density", type=float, default=DEFAULT_DENSITY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    backends = [tuple(item.partition("=")[::2]) for item in args.backends]
+    for name, values, allowed in (
+        ("backend", [backend for backend, _ in backends], EMBEDDING_BACKENDS),
+        ("kind", args.kinds, KINDS),
+        ("size", args.sizes, SIZES),
+    ):
+        unknown = set(values) - set(allowed)
+        if unknown:
+            parser.error(f"unknown {name}(s): {', '.join(sorted(unknown))}")
+
+    chunks = [
+        chunk
+        for kind in args.kinds
+        for size in args.sizes
+        for chunk in chunk_document(generate(kind, size, args.density, args.seed).text)
+    ]
+
+    results: list[dict] = []
+    for name, model in backends:
+        label = f"{name}={model}" if model else name
+        try:
+            row = asyncio.run(evaluate(name, model or None, chunks, args.repeat, args.queries))
+        except Exception as exc:
+            row = {"backend": name, "model": model or None, "error": f"{type(exc).__name__}: {exc}"}
+            print(f"{label:>24} | failed: {row['error']}", file=sys.stderr)
+        else:
+            print(
+                f"{label:>24} | {row['chunks_per_sec'] or 0:>10,} chunks/s"
+                f" | {row['tokens_per_sec'] or 0:>12,} tokens/s"
+                f" | query p50 {row['query_p50_ms']} ms | load {row['load_seconds']}s",
+                file=sys.stderr,
+            )
+        results.append(row)
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
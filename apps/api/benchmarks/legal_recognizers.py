@@ -0,0 +1,115 @@
+"""
+Benchmark of the single-pass legal recognizer against the per-pattern ones.
+
+Generates a large synthetic filing sprinkled with case numbers and court
+names, runs the original ``CaseNumberRecognizer`` + ``CourtNameRecognizer``
+pair and the combined ``LegalPatternRecognizer`` over it, and checks that
+both yield the same spans after overlap resolution.  A second document
+without any court names shows the effect of the literal prefilter.
+
+Usage (from ``apps/api``)::
+
+    python -m benchmarks.legal_recognizers [--chars 5000000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+from services.anonymization.legal_recognizers import (
+    case_number_recognizer,
+    court_name_recognizer,
+    legal_pattern_recognizer,
+)
+from services.anonymization.spans import resolve_overlaps
+
+_ENTITIES = ["CASE_NUMBER", "COURT_NAME"]
+_FILLER = (
+    "The plaintiff alleges that the defendant breached the agreement "
+    "dated March 3 and failed to cure within thirty days. "
+)
+_CASE_NUMBERS = [
+    "Case No. 2023-CF-001234",
+    "2:24-cv-01234",
+    "1:23-cr-00567-ABC",
+    "No. 22-1234",
+    "23-CV-2024-000123",
+    "Docket No. 12345",
+]
+_COURTS = [
+    "United States District Court for the Southern District of New York",
+    "U.S. Court of Appeals for the Ninth Circuit",
+    "Supreme Court of the United States",
+    "Superior Court of California, County of Los Angeles",
+    "Circuit Court of Cook County",
+    "U.S. Bankruptcy Court for the District of Delaware",
+]
+
+
+def build_filing(chars: int, with_courts: bool = True, seed: int = 0) -> str:
+    """Return roughly *chars* characters of filing-like text."""
+    rng = random.Random(seed)
+    values = _CASE_NUMBERS + (_COURTS if with_courts else [])
+    parts: list[str] = []
+    length = 0
+    while length < chars:
+        part = _FILLER[: rng.randint(30, len(_FILLER))]
+        if rng.random() < 0.3:
+            part += rng.choice(values) + ". "
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+
+def _legacy(text: str):
+    return (
+        case_number_recognizer.analyze(text, ["CASE_NUMBER"])
+        + court_name_recognizer.analyze(text, ["COURT_NAME"])
+    )
+
+
+def _combined(text: str):
+    return legal_pattern_recognizer.analyze(text, _ENTITIES)
+
+
+def _time(repeat: int, func, text: str) -> tuple[float, list]:
+    best = float("inf")
+    results: list = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = func(text)
+        best = min(best, time.perf_counter() - started)
+    return best, results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chars", type=int, default=5_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    status = 0
+    for label, with_courts in (("filing", True), ("no courts", False)):
+        text = build_filing(args.chars, with_courts=with_courts)
+        legacy_time, legacy = _time(args.repeat, _legacy, text)
+        combined_time, combined = _time(args.repeat, _combined, text)
+
+        def spans(results):
+            return [(r.start, r.end, r.entity_type) for r in resolve_overlaps(results)]
+
+        same = spans(legacy) == spans(combined)
+        print(
+            f"{label:>10}: {len(text):,} chars | per-pattern {legacy_time * 1000:8.1f} ms"
+            f" | combined {combined_time * 1000:8.1f} ms"
+            f" ({legacy_time / combined_time:.1f}x) | spans match: {same}"
+        )
+        if not same:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
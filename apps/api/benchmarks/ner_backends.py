@@ -0,0 +1,230 @@
+"""
+Accuracy and throughput of the NLP backends on the synthetic corpus.
+
+Runs ``engine.analyze_spans`` (the full detection pipeline, ``full``
+profile) over the corpus with each backend and scores the detections
+against the planted gold spans.  A detection counts as correct if it
+overlaps an unmatched gold span of the same entity type; ``exact_recall``
+only counts spans with identical boundaries.  Throughput is characters
+per second at the median of the repeated runs.
+
+Each backend is evaluated in a fresh process that builds its own
+analyzer, so load time and RSS are measured as a worker would see them
+and models are not all held at once.  A backend may name a different
+model as ``backend=model``, e.g. ``transformers=./models/distil-ner``.  With ``--min-recall``, the fastest
+backend meeting that recall is reported as ``recommended``.
+
+Usage (from ``apps/api``; the models must be installed)::
+
+    python -m benchmarks.ner_backends [--backends spacy-sm,spacy-md,spacy-lg]
+        [--kinds contract,pleading,email] [--sizes 10k,100k] [--density 4]
+        [--repeat 3] [--min-recall 0.9] [--output results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.corpus import DEFAULT_DENSITY, KINDS, SIZES, Document, generate
+from benchmarks.suite import percentile
+from services.anonymization.spans import Span
+
+DEFAULT_BACKENDS = ("spacy-sm", "spacy-md", "spacy-lg")
+DEFAULT_SIZES = ("10k", "100k")
+
+
+# --- Scoring ------------------------------------------------------------------
+
+def score(gold: list[Span], predicted: list[Span]) -> dict:
+    """Match *predicted* against *gold* spans (both sorted by start).
+
+    Returns counts of true positives (overlapping, same type), exact
+    matches, false positives and false negatives, plus per-type gold and
+    found counts.
+    """
+    matched = [False] * len(gold)
+    true_positives = exact = 0
+    found: Counter = Counter()
+    first = 0
+    for span in predicted:
+        while first < len(gold) and gold[first].end <= span.start:
+            first += 1
+        for i in range(first, len(gold)):
+            candidate = gold[i]
+            if candidate.start >= span.end:
+                break
+            if not matched[i] and candidate.entity_type == span.entity_type:
+                matched[i] = True
+                true_positives += 1
+                exact += (candidate.start, candidate.end) == (span.start, span.end)
+                found[candidate.entity_type] += 1
+                break
+    return {
+        "tp": true_positives,
+        "exact": exact,
+        "fp": len(predicted) - true_positives,
+        "fn": len(gold) - true_positives,
+        "gold_by_type": Counter(span.entity_type for span in gold),
+        "found_by_type": found,
+    }
+
+
+def _ratio(numerator: int, denominator: int) -> float | None:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+# --- Evaluation (runs in a fresh process per backend) --------------------------
+
+def evaluate(backend: str, model: str | None, documents: list[Document], repeat: int) -> dict:
+    from services.anonymization import analyzer, engine
+
+    analyzer.NLP_BACKEND, analyzer.NLP_MODEL = backend, model
+    analyzer.warm_up()
+    totals: Counter = Counter()
+    gold_by_type: Counter = Counter()
+    found_by_type: Counter = Counter()
+    chars = 0
+    seconds = 0.0
+    for document in documents:
+        samples: list[float] = []
+        for _ in range(repeat):
+            engine._cache.clear()
+            started = time.perf_counter()
+            predicted = engine.analyze_spans(document.text, profile="full")
+            samples.append(time.perf_counter() - started)
+        result = score(document.spans, predicted)
+        gold_by_type.update(result.pop("gold_by_type"))
+        found_by_type.update(result.pop("found_by_type"))
+        totals.update(result)
+        chars += len(document.text)
+        seconds += percentile(samples, 50)
+
+    tp, fp, fn = totals["tp"], totals["fp"], totals["fn"]
+    precision, recall = _ratio(tp, tp + fp), _ratio(tp, tp + fn)
+    stats = analyzer.stats()
+    return {
+        "backend": backend,
+        "model": model,
+        "models": stats.get("models"),
+        "load_seconds": stats.get("load_seconds"),
+        "rss_delta_mb": stats.get("rss_delta_mb"),
+        "chars_per_sec": round(chars / seconds) if seconds else None,
+        "precision": precision,
+        "recall": recall,
+        "f1": (
+            round(2 * precision * recall / (precision + recall), 4)
+            if precision and recall
+            else None
+        ),
+        "exact_recall": _ratio(totals["exact"], tp + fn),
+        "recall_by_type": {
+            entity_type: _ratio(found_by_type[entity_type], count)
+            for entity_type, count in sorted(gold_by_type.items())
+        },
+        "counts": {"tp": tp, "fp": fp, "fn": fn},
+    }
+
+
+def _run_isolated(backend: str, model: str | None, documents: list[Document], repeat: int) -> dict:
+    from services.anonymization.pool import START_METHOD
+
+    context = multiprocessing.get_context(START_METHOD)
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        try:
+            return executor.submit(evaluate, backend, model, documents, repeat).result()
+        except Exception as exc:
+            return {"backend": backend, "model": model, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    from services.anonymization.analyzer import NLP_BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", type=_csv, default=list(DEFAULT_BACKENDS),
+                        help=f"from {', '.join(NLP_BACKENDS)}; optionally backend=model")
+    parser.add_argument("--kinds", type=_csv, default=list(KINDS))
+    parser.add_argument("--sizes", type=_csv, default=list(DEFAULT_SIZES))
+    parser.add_argument("--density", type=float, default=DEFAULT_DENSITY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-recall", type=float, default=None)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    backends = [tuple(item.partition("=")[::2]) for item in args.backends]
+    for name, values, allowed in (
+        ("backend", [backend for backend, _ in backends], NLP_BACKENDS),
+        ("kind", args.kinds, KINDS),
+        ("size", args.sizes, SIZES),
+    ):
+        unknown = set(values) - set(allowed)
+        if unknown:
+            parser.error(f"unknown {name}(s): {', '.join(sorted(unknown))}")
+
+    documents = [
+        generate(kind, size, args.density, args.seed)
+        for kind in args.kinds
+        for size in args.sizes
+    ]
+
+    results: list[dict] = []
+    for name, model in backends:
+        row = _run_isolated(name, model or None, documents, args.repeat)
+        results.append(row)
+        label = f"{name}={model}" if model else name
+        if "error" in row:
+            print(f"{label:>24} | failed: {row['error']}", file=sys.stderr)
+            continue
+        print(
+            f"{label:>24} | P {row['precision'] or 0:.3f} R {row['recall'] or 0:.3f}"
+            f" F1 {row['f1'] or 0:.3f} | {row['chars_per_sec'] or 0:>10,} chars/s"
+            f" | load {row['load_seconds']}s, +{row['rss_delta_mb']} MB",
+            file=sys.stderr,
+        )
+
+    recommended = None
+    if args.min_recall is not None:
+        eligible = [
+            row for row in results
+            if "error" not in row and (row["recall"] or 0) >= args.min_recall
+        ]
+        if eligible:
+            best = max(eligible, key=lambda row: row["chars_per_sec"] or 0)
+            recommended = {"backend": best["backend"], "model": best["model"]}
+        print(f"Recommended at recall >= {args.min_recall}: {recommended}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+        },
+        "results": results,
+        "recommended": recommended,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Regression benchmark for span resolution and text substitution.
+
+Builds a synthetic document with 10,000 entities (each also detected as a
+shorter, lower-scoring sub-span, the way overlapping Presidio recognizers
+report them), then times ``resolve_overlaps`` + ``apply_replacements``
+against the previous quadratic implementations.  Exits non-zero if the
+outputs differ or the current implementation is not faster.
+
+Usage (from ``apps/api``)::
+
+    python -m benchmarks.span_resolution [--entities 10000] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+
+from services.anonymization.spans import apply_replacements, resolve_overlaps
+
+_ENTITY_TYPES = ["PERSON", "ORGANIZATION", "LOCATION", "EMAIL_ADDRESS", "CASE_NUMBER"]
+_FILLER = "The parties agree that the foregoing terms shall apply. "
+
+
+class _Span:
+    """Minimal stand-in for ``RecognizerResult`` (only the fields used)."""
+
+    __slots__ = ("entity_type", "start", "end", "score")
+
+    def __init__(self, entity_type: str, start: int, end: int, score: float) -> None:
+        self.entity_type = entity_type
+        self.start = start
+        self.end = end
+        self.score = score
+
+
+class _TagGenerator:
+    """Cheap deterministic replacement source, so timings exclude Faker."""
+
+    def __init__(self) -> None:
+        self._cache: dict[tuple[str, str], str] = {}
+
+    def replacement_for(self, entity_type: str, original: str) -> str:
+        key = (entity_type, original)
+        if key not in self._cache:
+            self._cache[key] = f"<{entity_type}_{len(self._cache)}>"
+        return self._cache[key]
+
+
+def build_document(entity_count: int, seed: int = 0) -> tuple[str, list[_Span]]:
+    """Return a synthetic text and its (overlapping) detections."""
+    rng = random.Random(seed)
+    parts: list[str] = []
+    spans: list[_Span] = []
+    position = 0
+    for i in range(entity_count):
+        filler = _FILLER[: rng.randint(10, len(_FILLER))]
+        parts.append(filler)
+        position += len(filler)
+
+        entity_type = rng.choice(_ENTITY_TYPES)
+        value = f"Entity{rng.randint(0, entity_count // 4)} Value{i % 97}"
+        parts.append(value)
+        spans.append(_Span(entity_type, position, position + len(value), 0.85))
+        # A competing partial detection of the first word only.
+        spans.append(_Span("PERSON", position, position + value.index(" "), 0.6))
+        position += len(value)
+    rng.shuffle(spans)
+    return "".join(parts), spans
+
+
+# ------------------------------------------------------------------
+# Previous implementations, kept verbatim for comparison
+# ------------------------------------------------------------------
+
+def _legacy_resolve_overlaps(results):
+    results = sorted(results, key=lambda r: (-(r.end - r.start), -r.score))
+    kept = []
+    for candidate in results:
+        if not any(
+            candidate.start < existing.end and existing.start < candidate.end
+            for existing in kept
+        ):
+            kept.append(candidate)
+    return kept
+
+
+def _legacy_replace(text, results, generator):
+    anonymized = text
+    for result in sorted(results, key=lambda r: r.start, reverse=True):
+        original = text[result.start : result.end]
+        replacement = generator.replacement_for(result.entity_type, original)
+        anonymized = anonymized[: result.start] + replacement + anonymized[result.end :]
+    return anonymized
+
+
+# ------------------------------------------------------------------
+# Runner
+# ------------------------------------------------------------------
+
+def _best_of(repeat: int, func) -> tuple[float, object]:
+    best = float("inf")
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        best = min(best, time.perf_counter() - started)
+    return best, output
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--entities", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    text, spans = build_document(args.entities)
+
+    def current() -> str:
+        kept = resolve_overlaps(spans)
+        return apply_replacements(text, kept, _TagGenerator(), [], set())
+
+    def legacy() -> str:
+        return _legacy_replace(text, _legacy_resolve_overlaps(spans), _TagGenerator())
+
+    legacy_time, legacy_out = _best_of(args.repeat, legacy)
+    current_time, current_out = _best_of(args.repeat, current)
+
+    print(f"document: {len(text):,} chars, {len(spans):,} detections")
+    print(f"legacy:   {legacy_time * 1000:10.1f} ms")
+    print(f"current:  {current_time * 1000:10.1f} ms  ({legacy_time / current_time:.1f}x)")
+
+    # The tag generator numbers replacements in visit order, which differs
+    # between the two builders; compare the texts with tags normalized.
+    if _untagged(current_out) != _untagged(legacy_out):
+        print("FAIL: outputs differ", file=sys.stderr)
+        return 1
+    if current_time >= legacy_time:
+        print("FAIL: no speedup over the legacy implementation", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _untagged(text: str) -> str:
+    return re.sub(r"<([A-Z_]+)_\d+>", r"<\1>", text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
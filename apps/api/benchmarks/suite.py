@@ -0,0 +1,242 @@
+"""
+Throughput benchmark suite for the anonymization services.
+
+Runs each target over the synthetic corpus (``benchmarks.corpus``) and
+reports, per document: characters per second, p50/p95/p99 latency over the
+repeated runs and peak traced Python memory.  For the ``anonymize`` target
+it also breaks one analysis pass down per recognizer (plus the spaCy NLP
+pass).  Results are written as JSON so runs from different releases can be
+diffed; a short table goes to stderr.
+
+Targets:
+
+    anonymize          ``engine.anonymize`` end to end (result cache cleared per run)
+    fake_generator     ``FakeGenerator`` replacements for the planted entities
+    legal_recognizers  the combined case number / court name recognizer
+
+Usage (from ``apps/api``; fully offline)::
+
+    python -m benchmarks.suite [--targets anonymize,legal_recognizers]
+        [--kinds contract,pleading,email] [--sizes 1k,10k,100k,1m,5m]
+        [--density 4] [--repeat 5] [--profile full] [--output results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Callable
+
+from benchmarks.corpus import DEFAULT_DENSITY, KINDS, SIZES, Document, generate
+
+DEFAULT_SIZES = ("1k", "10k", "100k", "1m")
+
+
+# --- Targets ------------------------------------------------------------------
+# Each takes the profile name and returns a callable run once per sample.
+
+def _anonymize(profile: str) -> Callable[[Document], object]:
+    from services.anonymization import engine
+
+    def run(document: Document) -> object:
+        engine._cache.clear()
+        return engine.anonymize(document.text, profile=profile)
+
+    return run
+
+
+def _fake_generator(profile: str) -> Callable[[Document], object]:
+    from services.anonymization.fake_generator import FakeGenerator
+
+    def run(document: Document) -> object:
+        generator = FakeGenerator(document.text)
+        text = document.text
+        return [
+            generator.replacement_for(span.entity_type, text[span.start : span.end])
+            for span in document.spans
+        ]
+
+    return run
+
+
+def _legal_recognizers(profile: str) -> Callable[[Document], object]:
+    from services.anonymization.legal_recognizers import legal_pattern_recognizer
+
+    entities = ["CASE_NUMBER", "COURT_NAME"]
+    return lambda document: legal_pattern_recognizer.analyze(document.text, entities)
+
+
+TARGETS: dict[str, Callable[[str], Callable[[Document], object]]] = {
+    "anonymize": _anonymize,
+    "fake_generator": _fake_generator,
+    "legal_recognizers": _legal_recognizers,
+}
+
+
+# --- Measurement --------------------------------------------------------------
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of *samples*."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(run: Callable[[Document], object], document: Document, repeat: int) -> dict:
+    """Time *repeat* runs, then one traced run for peak memory."""
+    run(document)  # warm-up: lazy imports, banks, compiled patterns
+
+    samples: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run(document)
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        run(document)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    chars = len(document.text)
+    median = percentile(samples, 50)
+    return {
+        "chars": chars,
+        "entities": len(document.spans),
+        "runs": repeat,
+        "chars_per_sec": round(chars / median) if median else None,
+        "p50_ms": round(median * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "peak_memory_mb": round(peak / 2**20, 2),
+    }
+
+
+def recognizer_breakdown(document: Document, profile: str) -> dict:
+    """Time the NLP pass and each recognizer once over (a window of) *document*.
+
+    Texts longer than the engine's window are truncated to one window,
+    which is what a single analyzer call sees in production.
+    """
+    from presidio_analyzer.predefined_recognizers import SpacyRecognizer
+
+    from services.anonymization import engine
+    from services.anonymization.analyzer import get_analyzer
+    from services.anonymization.profiles import get_profile
+
+    settings = get_profile(profile)
+    entities = settings["entities"]
+    text = document.text[: engine.WINDOW_SIZE]
+
+    nlp_ms = None
+    artifacts = None
+    if settings["use_nlp"]:
+        started = time.perf_counter()
+        artifacts = get_analyzer().nlp_engine.process_text(text, "en")
+        nlp_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    timings: dict[str, float] = {}
+    for recognizer in get_analyzer().registry.get_recognizers(language="en", entities=entities):
+        if artifacts is None and isinstance(recognizer, SpacyRecognizer):
+            continue
+        started = time.perf_counter()
+        recognizer.analyze(text=text, entities=entities, nlp_artifacts=artifacts)
+        timings[recognizer.name] = round((time.perf_counter() - started) * 1000, 3)
+
+    return {
+        "kind": document.kind,
+        "size": document.size,
+        "chars": len(text),
+        "nlp_ms": nlp_ms,
+        "recognizers_ms": dict(sorted(timings.items(), key=lambda item: -item[1])),
+    }
+
+
+def _versions() -> dict:
+    versions = {}
+    for package in ("presidio-analyzer", "spacy", "Faker"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--targets", type=_csv, default=list(TARGETS))
+    parser.add_argument("--kinds", type=_csv, default=list(KINDS))
+    parser.add_argument("--sizes", type=_csv, default=list(DEFAULT_SIZES))
+    parser.add_argument("--density", type=float, default=DEFAULT_DENSITY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--profile", default="full")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    for name, allowed in (("target", TARGETS), ("kind", KINDS), ("size", SIZES)):
+        unknown = set(getattr(args, name + "s")) - set(allowed)
+        if unknown:
+            parser.error(f"unknown {name}(s): {', '.join(sorted(unknown))}")
+
+    documents = [
+        generate(kind, size, args.density, args.seed)
+        for kind in args.kinds
+        for size in args.sizes
+    ]
+
+    results: list[dict] = []
+    for target in args.targets:
+        run = TARGETS[target](args.profile)
+        for document in documents:
+            row = {"target": target, "kind": document.kind, "size": document.size}
+            row.update(measure(run, document, args.repeat))
+            results.append(row)
+            print(
+                f"{target:>18} {document.kind:>8} {document.size:>5}"
+                f" | {row['chars_per_sec']:>12,} chars/s"
+                f" | p50 {row['p50_ms']:>10.2f} ms p99 {row['p99_ms']:>10.2f} ms"
+                f" | peak {row['peak_memory_mb']:>8.2f} MB",
+                file=sys.stderr,
+            )
+
+    breakdown = []
+    if "anonymize" in args.targets:
+        breakdown = [recognizer_breakdown(document, args.profile) for document in documents]
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "versions": _versions(),
+            "args": {
+                key: value for key, value in vars(args).items() if key != "output"
+            },
+        },
+        "results": results,
+        "recognizers": breakdown,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Gunicorn configuration for multi-worker deployments.
+
+Run with:
+    gunicorn -c gunicorn.conf.py main:app
+
+The master process imports the app and loads the spaCy model and
+recognizer registry once, then forks the uvicorn workers.  The model's
+pages are shared copy-on-write between the master, every worker and every
+anonymization pool process (which are forked too, see
+``ANONYMIZER_POOL_START_METHOD``), so adding a worker costs its private
+heap rather than another copy of ``en_core_web_lg``.
+
+Every worker has its own anonymization pool, so the pool is sized per host
+instead: ``ANONYMIZER_HOST_POOL_SIZE`` pool processes (default: CPU count)
+are split evenly across the ``WEB_CONCURRENCY`` workers, at least one each.
+Setting ``ANONYMIZER_POOL_SIZE`` overrides the split with a per-worker size.
+
+Python's cyclic garbage collector writes to the header of every object it
+scans, which would silently un-share those pages.  The master therefore
+runs with the collector disabled while loading, and moves everything it
+loaded into the permanent generation with ``gc.freeze()`` before forking.
+
+Each worker logs its RSS/PSS split once it has booted; ``GET
+/health/memory`` reports the same figures on demand.
+"""
+
+import gc
+import logging
+import os
+
+# Workers must fork their anonymization pools so the pool processes share
+# the preloaded model too.  Set before the app is imported below.
+os.environ.setdefault("ANONYMIZER_POOL_START_METHOD", "fork")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+
+# Split the host's pool processes across the workers (also set before the
+# app is imported).
+host_pool_size = int(os.getenv("ANONYMIZER_HOST_POOL_SIZE", str(os.cpu_count() or 1)))
+os.environ.setdefault("ANONYMIZER_POOL_SIZE", str(max(1, host_pool_size // max(1, workers))))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = 120
+
+logger = logging.getLogger("gunicorn.error")
+
+# Keep the collector from touching (and copying) pages while the app and
+# model are being loaded in the master.
+gc.disable()
+
+
+def when_ready(server):
+    """Load the model in the master, then freeze the heap before forking."""
+    from services.process_memory import memory_usage
+
+    import services.anonymization.engine  # noqa: F401
+    from services.anonymization.analyzer import warm_up
+    from services.anonymization.fake_bank import get_bank
+
+    # Build the shared analyzer (spaCy model + registry) used by both the
+    # engine and the chat PII scrubber.
+    warm_up()
+    get_bank()
+
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "[Preload] Model loaded in master, %d objects frozen: %s",
+        gc.get_freeze_count(),
+        memory_usage(),
+    )
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def post_worker_init(worker):
+    from services.process_memory import memory_usage
+
+    logger.info("[Preload] Worker %s booted: %s", worker.pid, memory_usage())
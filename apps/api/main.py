@@ -12,8 +12,13 @@ from dotenv import load_dotenv
 _env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
 load_dotenv(_env_path, override=True)
 
-from routers import anonymize, ingest, chat, documents, sessions, models, auth, credits
+from routers import anonymize, ingest, chat, private_chat, documents, sessions, models, auth, credits
 from database import init_database
+from services.anonymization import analyzer
+from services.anonymization.fake_bank import get_bank
+from services.anonymization.pool import get_pool
+from services.process_memory import memory_usage
+from services.rag.embedder import get_backend
 
 # Path to the Next.js static export
 FRONTEND_DIR = Path(__file__).resolve().parent.parent / "web" / "out"
@@ -24,7 +29,15 @@ _REQ_LOG = Path("/tmp/requests.log")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_database()
+    pool = get_pool()
+    pool.start()
+    # Mapping sessions render replacements in this process.
+    get_bank()
+    # Fail fast on a bad EMBEDDING_BACKEND and load a local model before
+    # the first query waits for it.
+    get_backend()
     yield
+    pool.shutdown()
 
 
 app = FastAPI(title="BurnChat API", version="1.0.0", lifespan=lifespan)
@@ -68,6 +81,7 @@ app.add_middleware(
 app.include_router(anonymize.router, prefix="/api")
 app.include_router(ingest.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
+app.include_router(private_chat.router, prefix="/api")
 app.include_router(documents.router, prefix="/api")
 app.include_router(sessions.router, prefix="/api")
 app.include_router(models.router, prefix="/api")
@@ -80,6 +94,18 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/memory")
+async def health_memory():
+    """Report RSS/PSS and shared vs private memory for this worker and its
+    anonymization pool processes, plus what loading the shared analyzer
+    added (if this process loaded it)."""
+    return {
+        "worker": memory_usage(),
+        "analyzer": analyzer.stats(),
+        "anonymization_pool": [memory_usage(pid) for pid in get_pool().worker_pids()],
+    }
+
+
 # --- Serve the Next.js static export ---
 
 NO_CACHE_HEADERS = {"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"}
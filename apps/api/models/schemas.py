@@ -5,6 +5,9 @@ from typing import Optional
 class AnonymizeRequest(BaseModel):
     text: str
     existing_mapping: Optional[list["MappingEntry"]] = None
+    profile: str = "full"
+    mapping_session_id: Optional[str] = None
+    response_format: str = "full"
 
 
 class EntityInfo(BaseModel):
@@ -18,12 +21,42 @@ class MappingEntry(BaseModel):
     entity_type: str
 
 
+class ReplacementSpan(BaseModel):
+    offset: int
+    length: int
+    replacement: str
+    entity_type: str
+
+
 class AnonymizeResponse(BaseModel):
+    anonymized_text: Optional[str] = None
+    spans: Optional[list[ReplacementSpan]] = None
+    mapping: list[MappingEntry]
+    entities_found: list[EntityInfo]
+
+
+class AnonymizeBatchRequest(BaseModel):
+    texts: list[str]
+    existing_mapping: Optional[list[MappingEntry]] = None
+    profile: str = "full"
+
+
+class AnonymizeBatchItem(BaseModel):
     anonymized_text: str
+    entities_found: list[EntityInfo]
+
+
+class AnonymizeBatchResponse(BaseModel):
+    results: list[AnonymizeBatchItem]
     mapping: list[MappingEntry]
     entities_found: list[EntityInfo]
 
 
+class MappingSessionResponse(BaseModel):
+    mapping_session_id: str
+    expires_in: int
+
+
 class IngestURLRequest(BaseModel):
     url: str
 
@@ -57,6 +90,7 @@ class DocumentInput(BaseModel):
 class DocumentsProcessRequest(BaseModel):
     documents: list[DocumentInput]
     session_id: Optional[str] = None
+    profile: str = "full"
 
 
 class DocumentsProcessResponse(BaseModel):
@@ -88,6 +122,12 @@ class ChatMessage(BaseModel):
     content: str
 
 
+class AnonymizedChatRequest(BaseModel):
+    messages: list[ChatMessage]
+    model: Optional[str] = None
+    profile: str = "full"
+
+
 class ChatRequest(BaseModel):
     model: Optional[str] = None
     messages: list[ChatMessage]
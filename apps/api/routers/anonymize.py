@@ -6,34 +6,178 @@ and returns the anonymized text together with the entity mapping.  The raw
 input is intentionally NOT persisted -- it is discarded after processing.
 """
 
-from fastapi import APIRouter
+from typing import Optional
 
-from models.schemas import AnonymizeRequest, AnonymizeResponse
-from services.anonymization.engine import anonymize
+from fastapi import APIRouter, Depends, HTTPException
+
+from middleware.auth import get_current_user, get_optional_user
+
+from models.schemas import (
+    AnonymizeBatchRequest,
+    AnonymizeBatchResponse,
+    AnonymizeRequest,
+    AnonymizeResponse,
+    MappingEntry,
+    MappingSessionResponse,
+)
+from services.anonymization.mapping_sessions import (
+    MappingSessionLimitError,
+    get_mapping_sessions,
+)
+from services.anonymization.pool import (
+    AnonymizationTimeoutError,
+    PoolCrashedError,
+    PoolSaturatedError,
+    run_analyze_spans,
+    run_anonymize,
+    run_anonymize_batch,
+)
+from services.anonymization.profiles import get_profile
+from services.anonymization.spans import check_response_format, count_entities
 
 router = APIRouter()
 
 
-@router.post("/anonymize", response_model=AnonymizeResponse)
-async def anonymize_text(request: AnonymizeRequest) -> AnonymizeResponse:
+@router.post(
+    "/anonymize", response_model=AnonymizeResponse, response_model_exclude_none=True
+)
+async def anonymize_text(
+    request: AnonymizeRequest,
+    user: Optional[dict] = Depends(get_optional_user),
+) -> AnonymizeResponse:
     """Anonymize PII in the supplied text.
 
     The server processes the text in-memory and discards the raw input
-    immediately after building the response.
+    immediately after building the response.  ``profile="fast"`` skips the
+    NLP model and only detects structured identifiers.
+
+    With ``mapping_session_id`` the mapping accumulated by earlier chunks is
+    kept server-side and the response's ``mapping`` only holds the entries
+    this chunk added.  The session must belong to the authenticated user.
+
+    ``response_format="spans"`` returns ``spans`` (offset, length,
+    replacement, entity type; offsets in UTF-16 code units) instead of
+    ``anonymized_text``, for the client to apply to the text it sent.
     """
     raw_text: str = request.text
+    _check_profile(request.profile)
+    try:
+        check_response_format(request.response_format)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
     # Pass through existing_mapping for chunked anonymization consistency
-    existing = None
-    if request.existing_mapping:
-        existing = [
-            {"original": m.original, "replacement": m.replacement, "entity_type": m.entity_type}
-            for m in request.existing_mapping
-        ]
+    existing = _mapping_dicts(request.existing_mapping)
+
+    session = None
+    if request.mapping_session_id:
+        if user is not None:
+            session = get_mapping_sessions().get(request.mapping_session_id, user["user_id"])
+        if session is None:
+            raise HTTPException(status_code=404, detail="Mapping session not found or expired")
 
-    result = anonymize(raw_text, existing_mapping=existing)
+    try:
+        if session is None:
+            result = await run_anonymize(
+                raw_text,
+                existing_mapping=existing,
+                profile=request.profile,
+                response_format=request.response_format,
+            )
+        else:
+            # Detection runs in the pool; known originals are matched and
+            # replacement happens here, where the session state lives.
+            known = session.known_spans(raw_text, existing)
+            spans = await run_analyze_spans(
+                raw_text, profile=request.profile, known_spans=known
+            )
+            output, delta = session.render(
+                raw_text, spans, existing, response_format=request.response_format
+            )
+            output_key = "spans" if request.response_format == "spans" else "anonymized_text"
+            result = {
+                output_key: output,
+                "mapping": delta,
+                "entities_found": count_entities(spans),
+            }
+    except MappingSessionLimitError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+    except (PoolSaturatedError, PoolCrashedError) as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except AnonymizationTimeoutError as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
 
     # Explicitly discard the raw input reference.
     del raw_text
 
     return AnonymizeResponse(**result)
+
+
+@router.post("/anonymize/batch", response_model=AnonymizeBatchResponse)
+async def anonymize_batch(request: AnonymizeBatchRequest) -> AnonymizeBatchResponse:
+    """Anonymize many texts (e.g. the chunks of one document) in one call.
+
+    All texts share a single mapping, so the same entity gets the same
+    replacement in every chunk and the response carries one consolidated
+    mapping instead of one per chunk.
+    """
+    _check_profile(request.profile)
+    existing = _mapping_dicts(request.existing_mapping)
+
+    try:
+        result = await run_anonymize_batch(
+            request.texts, existing_mapping=existing, profile=request.profile
+        )
+    except (PoolSaturatedError, PoolCrashedError) as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except AnonymizationTimeoutError as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+
+    return AnonymizeBatchResponse(**result)
+
+
+@router.post("/anonymize/mapping-sessions", response_model=MappingSessionResponse)
+async def create_mapping_session(
+    user: dict = Depends(get_current_user),
+) -> MappingSessionResponse:
+    """Open a server-side mapping session for chunked anonymization.
+
+    Pass the returned ID as ``mapping_session_id`` on each chunk instead of
+    resending ``existing_mapping``.  The session expires after
+    ``expires_in`` idle seconds.  Answers 429 when the user or the server
+    already has as many sessions open as allowed.
+    """
+    try:
+        session = get_mapping_sessions().create(user["user_id"])
+    except MappingSessionLimitError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+    return MappingSessionResponse(mapping_session_id=session.id, expires_in=session.ttl)
+
+
+@router.delete("/anonymize/mapping-sessions/{mapping_session_id}")
+async def burn_mapping_session(
+    mapping_session_id: str,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Close a mapping session and wipe everything it holds."""
+    if not get_mapping_sessions().burn(mapping_session_id, user["user_id"]):
+        raise HTTPException(status_code=404, detail="Mapping session not found or expired")
+    return {"success": True}
+
+
+def _check_profile(name: str) -> None:
+    """Reject unknown detection profiles before dispatching to the pool."""
+    try:
+        get_profile(name)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _mapping_dicts(entries: list[MappingEntry] | None) -> list[dict] | None:
+    """Convert request mapping entries into the dicts the engine expects."""
+    if not entries:
+        return None
+    return [
+        {"original": m.original, "replacement": m.replacement, "entity_type": m.entity_type}
+        for m in entries
+    ]
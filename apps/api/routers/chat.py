@@ -1,22 +1,25 @@
-import json
 import os
 from typing import Optional
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException
 from sse_starlette.sse import EventSourceResponse
 
 from middleware.auth import get_optional_user
 from models.schemas import ChatRequest
+from services.chat_stream import ChatStream, message_event
+from services.credits import deduct_chat_credits
+from services.pii_scrubber import ScrubError, scrub_messages_pooled
 from services.rag.embedder import embed_texts
 from services.rag.retriever import search_chunks
 
 router = APIRouter()
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
-OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
 DEFAULT_MODEL = "openai/gpt-4o-mini"
 
+# Optional server-side second PII pass over the chat history (the browser
+# already anonymizes messages).  Off by default.
+CHAT_PII_SCRUB = os.getenv("CHAT_PII_SCRUB", "false").lower() in ("1", "true", "yes")
+
 SYSTEM_PROMPT = (
     "You are a helpful AI assistant. Answer questions directly and thoroughly. "
     "Treat all names, locations, and details in the conversation as real. "
@@ -60,55 +63,6 @@ async def _verify_session_token(session_token: str) -> dict:
     return {"user_id": user_id, "credit_balance": balance}
 
 
-async def _deduct_credits(user_id: str, prompt_tokens: int, completion_tokens: int, model: str = "openai/gpt-4o-mini") -> dict:
-    """Calculate token usage cost using model pricing with 1.5x margin and deduct credits.
-
-    Returns a dict with usage information.
-    """
-    from database import get_supabase
-    from services.model_selection.cost_calculator import estimate_credits
-
-    total_tokens = prompt_tokens + completion_tokens
-    credits_used = estimate_credits(model, prompt_tokens, completion_tokens)
-
-    db = get_supabase()
-
-    # Get current balance
-    response = (
-        db.table("users")
-        .select("credit_balance")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-
-    if not response.data:
-        return {"credits_used": credits_used, "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens, "total_tokens": total_tokens}
-
-    new_balance = max(0, response.data["credit_balance"] - credits_used)
-
-    # Update balance
-    db.table("users").update({"credit_balance": new_balance}).eq("id", user_id).execute()
-
-    # Record transaction
-    db.table("credit_transactions").insert({
-        "user_id": user_id,
-        "type": "chat",
-        "amount": -credits_used,
-        "description": f"Chat completion: {total_tokens} tokens",
-        "balance_after": new_balance,
-    }).execute()
-
-    return {
-        "credits_used": credits_used,
-        "credit_balance": new_balance,
-        "prompt_tokens": prompt_tokens,
-        "completion_tokens": completion_tokens,
-        "total_tokens": total_tokens,
-    }
-
-
 @router.post("/chat")
 async def chat(
     request: ChatRequest,
@@ -133,12 +87,20 @@ async def chat(
     # 3. Build system message parts
     system_parts: list[str] = [SYSTEM_PROMPT]
 
+    history = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+    if CHAT_PII_SCRUB:
+        # Cached per message, so only messages new this turn are analyzed.
+        try:
+            history = await scrub_messages_pooled(history)
+        except ScrubError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
     # 4. RAG context: embed last user message, search pgvector, inject
     if request.session_id:
         last_user_message = None
-        for msg in reversed(request.messages):
-            if msg.role == "user":
-                last_user_message = msg.content
+        for msg in reversed(history):
+            if msg["role"] == "user":
+                last_user_message = msg["content"]
                 break
 
         if last_user_message:
@@ -164,88 +126,17 @@ async def chat(
     # 6. Construct messages for OpenRouter
     system_message = "\n\n".join(system_parts)
     messages = [{"role": "system", "content": system_message}]
-    messages.extend(
-        {"role": msg.role, "content": msg.content} for msg in request.messages
-    )
+    messages.extend(history)
 
     # 7. Stream response from OpenRouter via SSE
     async def event_generator():
-        prompt_tokens = 0
-        completion_tokens = 0
-        full_response = ""
-
-        try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                async with client.stream(
-                    "POST",
-                    OPENROUTER_CHAT_URL,
-                    headers={
-                        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://burnchat.ai",
-                        "X-Title": "BurnChat",
-                    },
-                    json={
-                        "model": model,
-                        "messages": messages,
-                        "stream": True,
-                    },
-                ) as response:
-                    if response.status_code != 200:
-                        body = await response.aread()
-                        error_detail = body.decode("utf-8", errors="replace")
-                        yield {
-                            "event": "message",
-                            "data": json.dumps({
-                                "type": "error",
-                                "content": f"OpenRouter error ({response.status_code}): {error_detail}",
-                            }),
-                        }
-                        return
-
-                    async for line in response.aiter_lines():
-                        if not line.startswith("data: "):
-                            continue
-
-                        data_str = line[6:]
-                        if data_str.strip() == "[DONE]":
-                            break
-
-                        try:
-                            data = json.loads(data_str)
-                        except json.JSONDecodeError:
-                            continue
-
-                        # Extract usage if present in the chunk
-                        if "usage" in data:
-                            prompt_tokens = data["usage"].get("prompt_tokens", 0)
-                            completion_tokens = data["usage"].get("completion_tokens", 0)
-
-                        choices = data.get("choices", [])
-                        if not choices:
-                            continue
-
-                        delta = choices[0].get("delta", {})
-                        content = delta.get("content", "")
-                        if content:
-                            full_response += content
-                            yield {
-                                "event": "message",
-                                "data": json.dumps({
-                                    "type": "token",
-                                    "content": content,
-                                }),
-                            }
-
-        except httpx.HTTPError as exc:
-            yield {
-                "event": "message",
-                "data": json.dumps({
-                    "type": "error",
-                    "content": f"Stream error: {exc}",
-                }),
-            }
+        stream = ChatStream(model, messages)
+        async for event in stream.events():
+            yield event
+        if not stream.completed:
             return
+        prompt_tokens = stream.prompt_tokens
+        completion_tokens = stream.completion_tokens
 
         # 8. After completion: calculate token usage, deduct credits
         usage_info = {
@@ -255,7 +146,7 @@ async def chat(
         }
 
         if authenticated_user and authenticated_user.get("user_id"):
-            usage_info = await _deduct_credits(
+            usage_info = await deduct_chat_credits(
                 user_id=authenticated_user["user_id"],
                 prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
@@ -272,9 +163,6 @@ async def chat(
         if usage_info.get("credit_balance") is not None and usage_info["credit_balance"] <= 0:
             done_payload["credits_exhausted"] = True
 
-        yield {
-            "event": "message",
-            "data": json.dumps(done_payload),
-        }
+        yield message_event(done_payload)
 
     return EventSourceResponse(event_generator())
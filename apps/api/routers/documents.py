@@ -14,10 +14,15 @@ from models.schemas import (
     ChunkResult,
     EntityInfo,
 )
-from services.anonymization.engine import anonymize
-from services.rag.chunker import chunk_text, count_tokens
+from services.anonymization.pool import (
+    AnonymizationTimeoutError,
+    PoolCrashedError,
+    PoolSaturatedError,
+)
+from services.anonymization.profiles import get_profile
 from services.rag.embedder import embed_texts
-from services.rag.retriever import store_chunks, search_chunks
+from services.rag.pipeline import ingest_document
+from services.rag.retriever import search_chunks
 
 router = APIRouter()
 
@@ -33,6 +38,11 @@ async def process_documents(
     users get the session linked to their account; anonymous users get an
     unlinked session.
     """
+    try:
+        get_profile(request.profile)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
     db = get_supabase()
     session_id = request.session_id
 
@@ -61,38 +71,24 @@ async def process_documents(
     all_entities: dict[str, int] = {}
 
     for doc in request.documents:
-        # 1. Anonymize the document text
-        anon_result = anonymize(doc.text)
-        anonymized_text = anon_result["anonymized_text"]
-
-        # Accumulate entity counts
-        for entity in anon_result["entities_found"]:
-            entity_type = entity["type"]
-            all_entities[entity_type] = (
-                all_entities.get(entity_type, 0) + entity["count"]
+        # Anonymize, chunk, embed and store as one streaming pipeline
+        try:
+            result = await ingest_document(
+                session_id=session_id,
+                document_name=doc.filename,
+                text=doc.text,
+                profile=request.profile,
             )
+        except (PoolSaturatedError, PoolCrashedError) as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
+        except AnonymizationTimeoutError as exc:
+            raise HTTPException(status_code=504, detail=str(exc))
 
-        # 2. Chunk the anonymized text
-        chunks = chunk_text(anonymized_text)
-        if not chunks:
-            continue
-
-        # 3. Compute token counts for each chunk
-        token_counts = [count_tokens(chunk) for chunk in chunks]
-
-        # 4. Embed all chunks
-        embeddings = await embed_texts(chunks)
-
-        # 5. Store in pgvector
-        await store_chunks(
-            session_id=session_id,
-            document_name=doc.filename,
-            chunks=chunks,
-            embeddings=embeddings,
-            token_counts=token_counts,
-        )
+        # Accumulate entity counts
+        for entity_type, count in result["entities_found"].items():
+            all_entities[entity_type] = all_entities.get(entity_type, 0) + count
 
-        total_chunks += len(chunks)
+        total_chunks += result["chunks"]
 
     entities_found = [
         EntityInfo(type=entity_type, count=count)
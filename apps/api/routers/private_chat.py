@@ -0,0 +1,103 @@
+"""
+POST /api/chat/anonymized endpoint.
+
+Chat proxy for API-only clients, which have no browser to anonymize
+messages and reverse the replacements.  The incoming messages are
+anonymized server-side with one shared mapping, the completion is streamed
+from OpenRouter, and fake values in it are turned back into the originals
+on the fly (see ``services.anonymization.deanonymizer``).  The mapping only
+ever lives in this request's memory; the model only sees fake values.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sse_starlette.sse import EventSourceResponse
+
+from middleware.credits import check_credits
+from models.schemas import AnonymizedChatRequest
+from routers.chat import (
+    DEFAULT_MODEL,
+    SYSTEM_PROMPT,
+)
+from services.anonymization.deanonymizer import StreamingDeanonymizer
+from services.anonymization.pool import (
+    AnonymizationTimeoutError,
+    PoolCrashedError,
+    PoolSaturatedError,
+    run_anonymize_batch,
+)
+from services.anonymization.profiles import get_profile
+from services.chat_stream import ChatStream, message_event
+from services.credits import deduct_chat_credits
+
+router = APIRouter()
+
+
+@router.post("/chat/anonymized")
+async def anonymized_chat(
+    request: AnonymizedChatRequest,
+    user: dict = Depends(check_credits),
+):
+    """SSE streaming chat with server-side anonymization and reversal.
+
+    Emits the same events as ``/api/chat`` (``token``, ``error``, ``done``);
+    token contents are already de-anonymized.  ``done`` also carries
+    ``entities_found`` for the request's messages.
+    """
+    try:
+        get_profile(request.profile)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # 1. Anonymize every message with one mapping, so an entity gets the
+    #    same fake value wherever it appears in the conversation.
+    try:
+        anonymized = await run_anonymize_batch(
+            [msg.content for msg in request.messages], profile=request.profile
+        )
+    except (PoolSaturatedError, PoolCrashedError) as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except AnonymizationTimeoutError as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages.extend(
+        {"role": msg.role, "content": item["anonymized_text"]}
+        for msg, item in zip(request.messages, anonymized["results"])
+    )
+    deanonymizer = StreamingDeanonymizer(anonymized["mapping"])
+    entities_found = anonymized["entities_found"]
+    del anonymized
+
+    model = request.model or DEFAULT_MODEL
+
+    # 2. Stream the completion, reversing replacements as tokens arrive
+    async def event_generator():
+        # Fake values split across chunks are held back until they are
+        # complete.
+        stream = ChatStream(
+            model, messages, transform=deanonymizer.feed, flush=deanonymizer.flush
+        )
+        async for event in stream.events():
+            yield event
+        if not stream.completed:
+            return
+
+        # 3. After completion: deduct credits
+        usage_info = await deduct_chat_credits(
+            user_id=user["user_id"],
+            prompt_tokens=stream.prompt_tokens,
+            completion_tokens=stream.completion_tokens,
+            model=model,
+        )
+
+        done_payload: dict = {
+            "type": "done",
+            "usage": usage_info,
+            "entities_found": entities_found,
+        }
+        if usage_info.get("credit_balance") is not None and usage_info["credit_balance"] <= 0:
+            done_payload["credits_exhausted"] = True
+
+        yield message_event(done_payload)
+
+    return EventSourceResponse(event_generator())
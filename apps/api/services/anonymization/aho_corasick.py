@@ -0,0 +1,183 @@
+"""
+Aho-Corasick multi-pattern matching.
+
+``AhoCorasick`` finds every occurrence of a set of literal patterns in a
+single left-to-right scan, independent of how many patterns there are.
+Matches are exact (case-sensitive) and must start and end on word
+boundaries, so a pattern "Ann" does not match inside "Annex"; overlapping
+matches are resolved leftmost-longest.
+
+Two users:
+
+* ``KnownEntityMatcher`` -- in the chunked flow every chunk after the first
+  arrives with the mapping built so far.  Instead of waiting for NER to
+  rediscover those entities, occurrences of the mapped originals are found
+  up front.  A mapping session keeps one matcher and ``add``s each chunk's
+  new entries to it rather than rebuilding it from the whole mapping.
+* ``deanonymizer.StreamingDeanonymizer`` -- matches fake replacements in a
+  streamed completion, using ``search`` to know how much of the stream's
+  tail could still be the start of a match.
+
+Pure Python -- no optional dependency.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable, Optional
+
+from services.anonymization.spans import Span
+
+# Score given to known occurrences; they win over any NER detection.
+KNOWN_SCORE = 1.0
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class AhoCorasick:
+    """Automaton over ``(pattern, label)`` pairs; the first label per pattern wins."""
+
+    def __init__(self, patterns: Iterable[tuple[str, str]]) -> None:
+        # Trie as parallel lists indexed by node id; node 0 is the root.
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._depth: list[int] = [0]
+        # (pattern length, label) for nodes that end a pattern.
+        self._output: list[Optional[tuple[int, str]]] = [None]
+        # Nearest proper suffix node (via failure links) that ends a pattern.
+        self._next_output: list[int] = [0]
+        self.size = 0
+        self._linked = True
+        self.add(patterns)
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def add(self, patterns: Iterable[tuple[str, str]]) -> None:
+        """Insert more ``(pattern, label)`` pairs.
+
+        Only the new characters are added to the trie; the failure links
+        are recomputed once, on the next search.
+        """
+        for pattern, label in patterns:
+            if pattern.strip():
+                self._add(pattern, label)
+                self._linked = False
+
+    def find(self, text: str) -> list[tuple[int, int, str]]:
+        """Return non-overlapping ``(start, end, label)`` matches, by start."""
+        return self.search(text)[0]
+
+    def search(self, text: str) -> tuple[list[tuple[int, int, str]], int]:
+        """Like ``find``, also returning how many trailing characters of
+        *text* are a proper prefix of some pattern (a match may continue
+        there if more text follows).
+        """
+        if not self.size:
+            return [], 0
+        if not self._linked:
+            self._link()
+            self._linked = True
+
+        goto, fail = self._goto, self._fail
+        output, next_output = self._output, self._next_output
+        length = len(text)
+        candidates: list[tuple[int, int, str]] = []
+
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            node = state if output[state] is not None else next_output[state]
+            while node:
+                size, label = output[node]
+                start, end = i + 1 - size, i + 1
+                if not (
+                    (start > 0 and _is_word(text[start]) and _is_word(text[start - 1]))
+                    or (end < length and _is_word(text[i]) and _is_word(text[end]))
+                ):
+                    candidates.append((start, end, label))
+                node = next_output[node]
+
+        candidates.sort(key=lambda c: (c[0], -c[1]))
+        matches: list[tuple[int, int, str]] = []
+        position = 0
+        for start, end, label in candidates:
+            if start >= position:
+                matches.append((start, end, label))
+                position = end
+        return matches, self._depth[state]
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _add(self, pattern: str, label: str) -> None:
+        node = 0
+        for char in pattern:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._depth.append(self._depth[node] + 1)
+                self._output.append(None)
+                self._next_output.append(0)
+            node = child
+        if self._output[node] is None:
+            self._output[node] = (len(pattern), label)
+            self.size += 1
+
+    def _link(self) -> None:
+        """Compute failure and output links breadth-first."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                state = self._fail[node]
+                while state and char not in self._goto[state]:
+                    state = self._fail[state]
+                target = self._goto[state].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                fallback = self._fail[child]
+                self._next_output[child] = (
+                    fallback if self._output[fallback] is not None else self._next_output[fallback]
+                )
+
+
+class KnownEntityMatcher:
+    """Finds occurrences of previously mapped originals in new text."""
+
+    def __init__(self, mapping: Iterable[dict]) -> None:
+        self._automaton = AhoCorasick(())
+        self.size = 0
+        self.add(mapping)
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def add(self, mapping: Iterable[dict]) -> None:
+        """Extend the matcher with more mapping entries.
+
+        The first mapping entry for an original wins, including over
+        entries added later.
+        """
+        self._automaton.add(
+            (entry.get("original", ""), entry.get("entity_type", ""))
+            for entry in mapping
+            if entry.get("entity_type")
+        )
+        self.size = self._automaton.size
+
+    def find(self, text: str) -> list[Span]:
+        """Return non-overlapping occurrences, leftmost-longest, by start."""
+        return [
+            Span(start, end, entity_type, KNOWN_SCORE)
+            for start, end, entity_type in self._automaton.find(text)
+        ]
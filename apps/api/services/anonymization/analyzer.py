@@ -0,0 +1,186 @@
+"""
+Process-wide Presidio analyzer shared by every PII consumer.
+
+The spaCy model behind ``AnalyzerEngine`` is by far the largest thing the
+API loads.  The anonymization engine and the chat PII scrubber both get
+their analyzer here, so a process holds one model and one recognizer
+registry (built-in plus the legal recognizers) no matter how many
+consumers it has.
+
+The analyzer is built lazily on first use, under a lock so concurrent
+first callers do not build it twice.  ``warm_up()`` builds it eagerly and
+runs one tiny analysis so request latency never includes model loading;
+pool workers and the gunicorn master call it at startup.  ``stats()``
+reports what loading cost.
+
+The NER model is configurable, trading accuracy for load time and
+per-token cost (compare them with ``python -m benchmarks.ner_backends``):
+
+    ANONYMIZER_NLP_BACKEND   ``spacy-lg`` (default), ``spacy-md``,
+                             ``spacy-sm``, ``spacy-trf`` or ``transformers``
+                             (a Hugging Face token-classification model
+                             behind a small spaCy pipeline for tokens).
+    ANONYMIZER_NLP_MODEL     Overrides the backend's model: a spaCy package
+                             name, or a Hugging Face model id / local
+                             directory for ``transformers``.
+
+The chosen model must be installed (``python -m spacy download ...``; the
+``transformers`` backend also needs ``spacy-huggingface-pipelines``).
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import presidio_analyzer
+import yaml
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, RecognizerRegistry
+from presidio_analyzer.nlp_engine import NlpEngineProvider
+
+from services.anonymization.legal_recognizers import ALL_LEGAL_RECOGNIZERS
+from services.process_memory import memory_usage
+
+logger = logging.getLogger(__name__)
+
+# Backend name -> (Presidio NLP configuration it starts from, default model).
+# Starting from Presidio's own files keeps its entity mapping and ignored
+# labels, so ``spacy-lg`` behaves exactly like a default AnalyzerEngine.
+NLP_BACKENDS: dict[str, tuple[str, str]] = {
+    "spacy-sm": ("default.yaml", "en_core_web_sm"),
+    "spacy-md": ("default.yaml", "en_core_web_md"),
+    "spacy-lg": ("default.yaml", "en_core_web_lg"),
+    "spacy-trf": ("default.yaml", "en_core_web_trf"),
+    "transformers": ("transformers.yaml", "dslim/distilbert-NER"),
+}
+DEFAULT_NLP_BACKEND = "spacy-lg"
+
+NLP_BACKEND = os.getenv("ANONYMIZER_NLP_BACKEND", DEFAULT_NLP_BACKEND)
+NLP_MODEL = os.getenv("ANONYMIZER_NLP_MODEL") or None
+
+_PRESIDIO_CONF = Path(presidio_analyzer.__file__).parent / "conf"
+
+_analyzer: Optional[AnalyzerEngine] = None
+_batch_analyzer: Optional[BatchAnalyzerEngine] = None
+_pattern_registry: Optional[RecognizerRegistry] = None
+_lock = threading.Lock()
+_stats: dict = {"loaded": False}
+
+
+def nlp_configuration(backend: str, model: Optional[str] = None) -> dict:
+    """Return the Presidio NLP configuration for *backend*.
+
+    *model* replaces the backend's default model.  Raises ``ValueError``
+    for unknown backends.
+    """
+    if backend not in NLP_BACKENDS:
+        raise ValueError(
+            f"Unknown NLP backend '{backend}'. "
+            f"Available backends: {', '.join(sorted(NLP_BACKENDS))}"
+        )
+    conf_file, default_model = NLP_BACKENDS[backend]
+    configuration = copy.deepcopy(_read_conf(conf_file))
+    entry = configuration["models"][0]
+    if isinstance(entry["model_name"], dict):
+        entry["model_name"]["transformers"] = model or default_model
+    else:
+        entry["model_name"] = model or default_model
+    return configuration
+
+
+def _read_conf(conf_file: str) -> dict:
+    with open(_PRESIDIO_CONF / conf_file) as f:
+        return yaml.safe_load(f)
+
+
+def _build_analyzer() -> AnalyzerEngine:
+    """Create an AnalyzerEngine for the configured NLP backend, with custom
+    legal recognizers registered."""
+    configuration = nlp_configuration(NLP_BACKEND, NLP_MODEL)
+    nlp_engine = NlpEngineProvider(nlp_configuration=configuration).create_engine()
+    analyzer = AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=["en"])
+    for recognizer in ALL_LEGAL_RECOGNIZERS:
+        analyzer.registry.add_recognizer(recognizer)
+    return analyzer
+
+
+def get_analyzer() -> AnalyzerEngine:
+    """Return the shared analyzer, building it on first use."""
+    global _analyzer, _batch_analyzer
+    if _analyzer is None:
+        with _lock:
+            if _analyzer is None:
+                before = memory_usage()
+                started = time.perf_counter()
+                analyzer = _build_analyzer()
+                _stats.update(
+                    loaded=True,
+                    backend=NLP_BACKEND,
+                    models=_model_names(analyzer),
+                    recognizers=len(analyzer.registry.recognizers),
+                    load_seconds=round(time.perf_counter() - started, 2),
+                    rss_delta_mb=_rss_delta(before, memory_usage()),
+                )
+                _batch_analyzer = BatchAnalyzerEngine(analyzer_engine=analyzer)
+                _analyzer = analyzer
+                logger.info("[Analyzer] Loaded shared analyzer: %s", _stats)
+    return _analyzer
+
+
+def get_pattern_registry() -> RecognizerRegistry:
+    """Return a registry with the shared analyzer's recognizers, built
+    without an NLP engine.
+
+    Profiles that skip NER only need the pattern recognizers, so they use
+    this registry and never load a model.  Its NER recognizer has no
+    engine behind it and must be left out.
+    """
+    global _pattern_registry
+    if _pattern_registry is None:
+        with _lock:
+            if _pattern_registry is None:
+                registry = RecognizerRegistry(supported_languages=["en"])
+                registry.load_predefined_recognizers(languages=["en"])
+                for recognizer in ALL_LEGAL_RECOGNIZERS:
+                    registry.add_recognizer(recognizer)
+                _pattern_registry = registry
+    return _pattern_registry
+
+
+def get_batch_analyzer() -> BatchAnalyzerEngine:
+    """Return the ``BatchAnalyzerEngine`` wrapping the shared analyzer."""
+    get_analyzer()
+    return _batch_analyzer
+
+
+def warm_up() -> None:
+    """Build the analyzer and run one analysis to initialise lazy state."""
+    get_analyzer().analyze(text="Warm-up for John Smith.", language="en")
+
+
+def is_loaded() -> bool:
+    return _analyzer is not None
+
+
+def stats() -> dict:
+    """Return load time, models and the RSS the analyzer added to this process."""
+    return dict(_stats)
+
+
+def _model_names(analyzer: AnalyzerEngine) -> list[str]:
+    models = getattr(analyzer.nlp_engine, "nlp", None) or {}
+    return [
+        f"{nlp.meta.get('lang', language)}_{nlp.meta.get('name', '?')}"
+        for language, nlp in models.items()
+    ]
+
+
+def _rss_delta(before: dict, after: dict) -> Optional[float]:
+    if "rss_mb" not in before or "rss_mb" not in after:
+        return None
+    return round(after["rss_mb"] - before["rss_mb"], 1)
@@ -0,0 +1,91 @@
+"""
+Streaming reversal of anonymization for completions.
+
+The browser de-anonymizes model output itself (``apps/web/lib/anonymizer/
+de-anonymizer.ts``).  ``StreamingDeanonymizer`` does the same on the server
+for clients that only talk to the API: fed the completion chunk by chunk,
+it swaps fake replacements back for their originals and returns text as
+soon as it is safe to.
+
+A fake value can be split across chunks ("Paul D" + "oe"), so the tail of
+what has been received is held back while it could still be the start of
+a replacement, or while a match ends exactly at the tail (the next chunk
+decides whether the match ends on a word boundary, or a longer one
+applies).  Everything before that point is emitted immediately, so the
+added latency is at most the length of the longest fake value.  Like the
+browser, standalone first and last names of fake people (longer than
+three characters) are reversed too.
+"""
+
+from __future__ import annotations
+
+from services.anonymization.aho_corasick import AhoCorasick
+
+
+def _patterns(mapping: list[dict]) -> list[tuple[str, str]]:
+    """Return ``(fake, original)`` pairs, full values before name parts."""
+    full: list[tuple[str, str]] = []
+    parts: list[tuple[str, str]] = []
+    for entry in mapping:
+        fake, original = entry.get("replacement", ""), entry.get("original", "")
+        if not fake or not original:
+            continue
+        full.append((fake, original))
+        if "person" in entry.get("entity_type", "").lower():
+            fake_parts, real_parts = fake.split(" "), original.split(" ")
+            if len(fake_parts) >= 2 and len(real_parts) >= 2:
+                for fake_part, real_part in ((fake_parts[0], real_parts[0]), (fake_parts[-1], real_parts[-1])):
+                    if len(fake_part) > 3:
+                        parts.append((fake_part, real_part))
+    return full + parts
+
+
+class StreamingDeanonymizer:
+    """Replaces fake values with originals in text that arrives in pieces."""
+
+    def __init__(self, mapping: list[dict]) -> None:
+        self._automaton = AhoCorasick(_patterns(mapping))
+        self._buffer = ""
+        # Last character already emitted: the word-boundary check for a
+        # match at the start of the buffer needs it.
+        self._previous = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add *chunk* and return the de-anonymized text that is now final."""
+        self._buffer += chunk
+        if not self._automaton:
+            return self.flush()
+
+        text = self._previous + self._buffer
+        offset = len(self._previous)
+        matches, pending = self._automaton.search(text)
+        matches = [m for m in matches if m[0] >= offset]
+        cut = max(offset, len(text) - pending)
+        for start, end, _ in matches:
+            if end > cut or end == len(text):
+                cut = min(cut, start)
+                break
+        return self._emit(text, offset, cut, [m for m in matches if m[1] <= cut])
+
+    def flush(self) -> str:
+        """Return whatever is still held back (call at end of stream)."""
+        text = self._previous + self._buffer
+        offset = len(self._previous)
+        matches = [m for m in self._automaton.find(text) if m[0] >= offset] if self._automaton else []
+        return self._emit(text, offset, len(text), matches)
+
+    def _emit(
+        self, text: str, offset: int, cut: int, matches: list[tuple[int, int, str]]
+    ) -> str:
+        """Render ``text[offset:cut]`` with *matches* reversed; keep the rest."""
+        self._buffer = text[cut:]
+        if cut > offset:
+            self._previous = text[cut - 1]
+        parts: list[str] = []
+        position = offset
+        for start, end, original in matches:
+            parts.append(text[position:start])
+            parts.append(original)
+            position = end
+        parts.append(text[position:cut])
+        return "".join(parts)
@@ -1,63 +1,75 @@
 """
 Main Presidio-based anonymization engine.
 
-Sets up the AnalyzerEngine with both built-in and custom legal recognizers,
-detects PII entities, generates Faker-based replacements, and performs
+Uses the process-wide AnalyzerEngine (built-in and custom legal recognizers,
+see ``analyzer``) to detect PII entities, generates Faker-based replacements, and performs
 longest-first text substitution to avoid partial-match corruption.
 """
 
 from __future__ import annotations
 
-from collections import Counter
-from typing import TYPE_CHECKING
+import os
+from functools import lru_cache
+from typing import Iterable
 
-from presidio_analyzer import AnalyzerEngine
+from presidio_analyzer import EntityRecognizer, RecognizerResult
+from presidio_analyzer.predefined_recognizers import SpacyRecognizer
 
-from services.anonymization.legal_recognizers import ALL_LEGAL_RECOGNIZERS
+from services.anonymization.aho_corasick import KnownEntityMatcher
+from services.anonymization.analyzer import (
+    get_analyzer,
+    get_batch_analyzer,
+    get_pattern_registry,
+)
 from services.anonymization.fake_generator import FakeGenerator
-
-if TYPE_CHECKING:
-    from presidio_analyzer import RecognizerResult
-
-# Entity types the engine will attempt to detect.
-SUPPORTED_ENTITIES: list[str] = [
-    "PERSON",
-    "ORGANIZATION",
-    "LOCATION",
-    "PHONE_NUMBER",
-    "EMAIL_ADDRESS",
-    "US_SSN",
-    "DATE_TIME",
-    "CASE_NUMBER",
-    "COURT_NAME",
-    "US_DRIVER_LICENSE",
-    "CREDIT_CARD",
-    "IP_ADDRESS",
-]
-
-
-def _build_analyzer() -> AnalyzerEngine:
-    """Create an AnalyzerEngine with custom legal recognizers registered."""
-    analyzer = AnalyzerEngine()
-    for recognizer in ALL_LEGAL_RECOGNIZERS:
-        analyzer.registry.add_recognizer(recognizer)
-    return analyzer
-
-
-# Module-level singleton -- initialized once, reused across requests.
-_analyzer: AnalyzerEngine = _build_analyzer()
+from services.anonymization.profiles import get_profile
+from services.anonymization.result_cache import AnalysisCache
+from services.anonymization.segmentation import (
+    owns_span,
+    paragraph_spans,
+    seam_ranges,
+    sentence_windows,
+)
+from services.anonymization.spans import (
+    Span,
+    apply_replacements,
+    check_response_format,
+    count_entities,
+    replacement_spans,
+    resolve_overlaps,
+)
+
+
+# Texts longer than WINDOW_SIZE characters are analyzed in overlapping
+# sentence-aligned windows instead of one spaCy call, keeping memory bounded
+# and staying well below spaCy's ``max_length`` (1,000,000 by default).
+WINDOW_SIZE = int(os.getenv("ANONYMIZER_WINDOW_CHARS", "100000"))
+WINDOW_OVERLAP = int(os.getenv("ANONYMIZER_WINDOW_OVERLAP", "2000"))
+
+# Paragraph-level cache of analyzer results (per process).
+_cache = AnalysisCache()
 
 
 # ------------------------------------------------------------------
 # Public API
 # ------------------------------------------------------------------
 
-def anonymize(text: str, existing_mapping: list[dict] | None = None) -> dict:
+def anonymize(
+    text: str,
+    existing_mapping: list[dict] | None = None,
+    profile: str | None = None,
+    response_format: str = "full",
+) -> dict:
     """Detect PII in *text*, replace with fake values, and return results.
 
     If *existing_mapping* is provided, pre-populates the replacement cache so
     that entities seen in earlier chunks get the same fake value.  This enables
     consistent anonymization when the client splits large texts into chunks.
+    Occurrences of the mapped originals are found up front (see
+    ``aho_corasick``) and NER only runs on the text between them.
+
+    *profile* names the detection profile (see ``profiles.PROFILES``);
+    ``"fast"`` skips the spaCy pipeline and only runs pattern recognizers.
 
     Returns a dict matching the ``AnonymizeResponse`` schema::
 
@@ -66,91 +78,317 @@ def anonymize(text: str, existing_mapping: list[dict] | None = None) -> dict:
             "mapping": [{"original": ..., "replacement": ..., "entity_type": ...}, ...],
             "entities_found": [{"type": ..., "count": ...}, ...],
         }
+
+    With ``response_format="spans"``, ``anonymized_text`` is replaced by
+    ``"spans"``: the edits that turn *text* into it (see
+    ``spans.replacement_spans``), which is much smaller for large texts.
     """
+    check_response_format(response_format)
+
     # 1. Analyse -----------------------------------------------------------
-    results: list[RecognizerResult] = _analyzer.analyze(
-        text=text,
-        language="en",
-        entities=SUPPORTED_ENTITIES,
-    )
+    results: list[RecognizerResult] = _analyze_known(
+        [text], get_profile(profile), existing_mapping
+    )[0]
+
+    # 2. Deduplicate & resolve overlaps ------------------------------------
+    #    Sort longest-first so broader spans take priority, then by start.
+    results = resolve_overlaps(results)
+
+    return render(text, results, existing_mapping, response_format)
+
+
+def render(
+    text: str,
+    results: list[RecognizerResult] | list[Span],
+    existing_mapping: list[dict] | None = None,
+    response_format: str = "full",
+) -> dict:
+    """Replace the non-overlapping detections *results* in *text*.
+
+    The second half of ``anonymize``, for detections made elsewhere: the
+    pool analyzes segments of a large text in parallel and renders the
+    merged spans with this.  Returns the same dict as ``anonymize``.
+    """
+    check_response_format(response_format)
+    output_key = "spans" if response_format == "spans" else "anonymized_text"
 
     if not results:
         return {
-            "anonymized_text": text,
+            output_key: [] if response_format == "spans" else text,
             "mapping": [],
             "entities_found": [],
         }
 
-    # 2. Deduplicate & resolve overlaps ------------------------------------
-    #    Sort longest-first so broader spans take priority, then by start.
-    results = _resolve_overlaps(results)
-
     # 3. Build replacements ------------------------------------------------
-    generator = FakeGenerator(text)
+    generator = _make_generator(text, existing_mapping)
+    mapping: list[dict] = []
+    replace = replacement_spans if response_format == "spans" else apply_replacements
+    output = replace(text, results, generator, mapping, set())
 
-    # Pre-populate the cache with previously seen entity replacements so
-    # chunked anonymization stays consistent across calls.
-    if existing_mapping:
-        for entry in existing_mapping:
-            key = (entry.get("entity_type", ""), entry.get("original", ""))
-            if key[0] and key[1] and "replacement" in entry:
-                generator._cache[key] = entry["replacement"]
+    # 4. Aggregate entity counts -------------------------------------------
+    return {
+        output_key: output,
+        "mapping": mapping,
+        "entities_found": count_entities(results),
+    }
 
-    mapping: list[dict] = []
-    seen: set[tuple[str, str]] = set()
 
-    # Sort by start position descending so we can replace right-to-left
-    # without invalidating earlier indices.
-    results_by_position = sorted(results, key=lambda r: r.start, reverse=True)
+def anonymize_batch(
+    texts: list[str],
+    existing_mapping: list[dict] | None = None,
+    profile: str | None = None,
+) -> dict:
+    """Anonymize many texts in one pass with a single shared mapping.
 
-    anonymized = text
-    for result in results_by_position:
-        original = text[result.start : result.end]
-        replacement = generator.replacement_for(result.entity_type, original)
+    The texts are fed through spaCy in batched ``nlp.pipe`` mode via
+    Presidio's ``BatchAnalyzerEngine``, which amortizes pipeline overhead
+    across the batch.  One ``FakeGenerator`` (seeded from the first text,
+    like the first chunk of the chunked flow) is shared by every text, so
+    an entity gets the same replacement wherever it appears.
 
-        anonymized = anonymized[: result.start] + replacement + anonymized[result.end :]
+    Returns a dict matching the ``AnonymizeBatchResponse`` schema::
 
-        key = (result.entity_type, original)
-        if key not in seen:
-            seen.add(key)
-            mapping.append(
-                {
-                    "original": original,
-                    "replacement": replacement,
-                    "entity_type": result.entity_type,
-                }
-            )
+        {
+            "results": [{"anonymized_text": ..., "entities_found": [...]}, ...],
+            "mapping": [{"original": ..., "replacement": ..., "entity_type": ...}, ...],
+            "entities_found": [{"type": ..., "count": ...}, ...],
+        }
+    """
+    if not texts:
+        return {"results": [], "mapping": [], "entities_found": []}
 
-    # 4. Aggregate entity counts -------------------------------------------
-    counter: Counter[str] = Counter(r.entity_type for r in results)
-    entities_found = [
-        {"type": entity_type, "count": count}
-        for entity_type, count in counter.most_common()
-    ]
+    batch_results = _analyze_known(texts, get_profile(profile), existing_mapping)
+
+    generator = _make_generator(texts[0], existing_mapping)
+    mapping: list[dict] = []
+    seen: set[tuple[str, str]] = set()
+    all_results: list[RecognizerResult] = []
+    items: list[dict] = []
+
+    for text, results in zip(texts, batch_results):
+        results = resolve_overlaps(results)
+        all_results.extend(results)
+        anonymized = apply_replacements(text, results, generator, mapping, seen)
+        items.append(
+            {
+                "anonymized_text": anonymized,
+                "entities_found": count_entities(results),
+            }
+        )
 
     return {
-        "anonymized_text": anonymized,
+        "results": items,
         "mapping": mapping,
-        "entities_found": entities_found,
+        "entities_found": count_entities(all_results),
     }
 
 
+def analyze_spans(
+    text: str,
+    profile: str | None = None,
+    known_spans: list[Span] | None = None,
+) -> list[Span]:
+    """Detect PII in *text* without replacing it.
+
+    Returns the non-overlapping detections as ``Span`` tuples ordered by
+    start.  Used when replacement happens in another process (mapping
+    sessions live in the API process): plain tuples are cheap to send back
+    from a pool worker.  *known_spans* are occurrences of already mapped
+    originals, found by the caller (see ``MappingSession.known_spans``);
+    they are kept as they are and only the text between them is analyzed.
+    """
+    results = resolve_overlaps(
+        _analyze_around([text], get_profile(profile), [known_spans or []])[0]
+    )
+    return [Span(r.start, r.end, r.entity_type, r.score) for r in results]
+
+
 # ------------------------------------------------------------------
 # Internal helpers
 # ------------------------------------------------------------------
 
-def _resolve_overlaps(results: list[RecognizerResult]) -> list[RecognizerResult]:
-    """Remove overlapping detections, preferring longer (then higher-score) spans."""
-    # Sort by length descending, then by score descending.
-    results = sorted(results, key=lambda r: (-(r.end - r.start), -r.score))
+def _analyze_known(
+    texts: list[str], profile: dict, known_mapping: list[dict] | None
+) -> list[list[RecognizerResult]]:
+    """Analyze *texts*, matching already mapped originals without NER.
+
+    Occurrences of the originals in *known_mapping* are found with one
+    Aho-Corasick scan per text and reported with their mapped entity type.
+    Only the stretches of text between them go through ``_analyze_many``
+    (all stretches of all texts in one batch), so known entities are
+    replaced even where NER would miss them, and the analyzer sees less
+    text.
+    """
+    matcher = KnownEntityMatcher(known_mapping or [])
+    if not matcher:
+        return _analyze_many(texts, profile)
+    return _analyze_around(texts, profile, [matcher.find(text) for text in texts])
+
+
+def _analyze_around(
+    texts: list[str], profile: dict, known_spans: list[list[Span]]
+) -> list[list[RecognizerResult]]:
+    """Analyze *texts* except for the *known_spans* found in each of them.
+
+    The known spans are returned as results and only the stretches of
+    text between them go through ``_analyze_many``.
+    """
+    batch_results: list[list[RecognizerResult]] = []
+    gaps: list[tuple[int, int]] = []  # (text index, offset) per stretch
+    gap_texts: list[str] = []
+    for i, (text, known) in enumerate(zip(texts, known_spans)):
+        batch_results.append(_from_spans(known, 0))
+        bounds = [(span.start, span.end) for span in known]
+        bounds.append((len(text), len(text)))
+        position = 0
+        for start, end in bounds:
+            if text[position:start].strip():
+                gaps.append((i, position))
+                gap_texts.append(text[position:start])
+            position = end
+
+    for (i, offset), results in zip(gaps, _analyze_many(gap_texts, profile)):
+        for result in results:
+            result.start += offset
+            result.end += offset
+        batch_results[i].extend(results)
+    return batch_results
+
+
+def _analyze_many(texts: list[str], profile: dict) -> list[list[RecognizerResult]]:
+    """Analyze several texts, reusing cached results for known paragraphs.
+
+    Each text is split into blank-line separated paragraphs.  Paragraphs
+    found in the result cache are not analyzed again; the remaining ones
+    (each distinct paragraph once, even if repeated) are analyzed together
+    in one batch and their spans cached.  With the cache disabled, texts
+    are analyzed whole.  Profiles without NLP bypass all of this and only
+    run the pattern recognizers.
+    """
+    entities: list[str] = profile["entities"]
+    if not profile["use_nlp"]:
+        return [_analyze_patterns(text, entities) for text in texts]
+    if not _cache.enabled:
+        return _analyze_uncached(texts, entities)
+
+    batch_results: list[list[RecognizerResult]] = [[] for _ in texts]
+    # Cache key -> every (text index, offset) the paragraph occurs at.
+    pending: dict[bytes, list[tuple[int, int]]] = {}
+    miss_texts: list[str] = []
+
+    for i, text in enumerate(texts):
+        for start, end in paragraph_spans(text):
+            paragraph = text[start:end]
+            key = _cache.key(paragraph, entities)
+            if key in pending:
+                pending[key].append((i, start))
+                continue
+            spans = _cache.get(key)
+            if spans is not None:
+                batch_results[i].extend(_from_spans(spans, start))
+                continue
+            pending[key] = [(i, start)]
+            miss_texts.append(paragraph)
+
+    for (key, occurrences), results in zip(pending.items(), _analyze_uncached(miss_texts, entities)):
+        spans = [Span(r.start, r.end, r.entity_type, r.score) for r in results]
+        _cache.put(key, spans)
+        for i, offset in occurrences:
+            batch_results[i].extend(_from_spans(spans, offset))
+    return batch_results
+
+
+def _analyze_uncached(
+    texts: list[str], entities: list[str]
+) -> list[list[RecognizerResult]]:
+    """Analyze several texts, batching the ones that fit in a single window."""
+    batch_results: list[list[RecognizerResult]] = [[] for _ in texts]
+
+    short = [i for i, text in enumerate(texts) if len(text) <= WINDOW_SIZE]
+    if short:
+        analyzed = get_batch_analyzer().analyze_iterator(
+            texts=[texts[i] for i in short],
+            language="en",
+            entities=entities,
+        )
+        for i, results in zip(short, analyzed):
+            batch_results[i] = results
+
+    for i, text in enumerate(texts):
+        if len(text) > WINDOW_SIZE:
+            batch_results[i] = _analyze_windowed(text, entities)
+    return batch_results
+
+
+def _analyze_patterns(text: str, entities: list[str]) -> list[RecognizerResult]:
+    """Run only the recognizers that work without spaCy NLP artifacts."""
+    results: list[RecognizerResult] = []
+    for recognizer in _pattern_recognizers(tuple(entities)):
+        results.extend(
+            recognizer.analyze(text=text, entities=entities, nlp_artifacts=None) or []
+        )
+    return results
+
+
+@lru_cache(maxsize=None)
+def _pattern_recognizers(entities: tuple[str, ...]) -> list[EntityRecognizer]:
+    """Return the registered non-NLP recognizers for *entities*, without
+    loading the NLP model."""
+    return [
+        recognizer
+        for recognizer in get_pattern_registry().get_recognizers(
+            language="en", entities=list(entities)
+        )
+        if not isinstance(recognizer, SpacyRecognizer)
+    ]
 
-    kept: list[RecognizerResult] = []
-    for candidate in results:
-        if not any(_overlaps(candidate, existing) for existing in kept):
-            kept.append(candidate)
-    return kept
 
+def _from_spans(spans: Iterable[Span], offset: int) -> list[RecognizerResult]:
+    """Rebuild ``RecognizerResult`` objects from cached spans at *offset*."""
+    return [
+        RecognizerResult(entity_type, start + offset, end + offset, score)
+        for start, end, entity_type, score in spans
+    ]
 
-def _overlaps(a: RecognizerResult, b: RecognizerResult) -> bool:
-    """Return True if spans *a* and *b* overlap."""
-    return a.start < b.end and b.start < a.end
+
+def _analyze_windowed(text: str, entities: list[str]) -> list[RecognizerResult]:
+    """Analyze *text* window by window and merge the spans at the seams.
+
+    Windows overlap by at least half of ``WINDOW_OVERLAP`` characters and
+    each seam is owned by one side (``segmentation.owns_span``), so an
+    entity near a seam is kept from a window that saw it whole.
+    Duplicates are removed later by ``resolve_overlaps``.  Only one
+    window's spaCy ``Doc`` is alive at a time.
+    """
+    windows = sentence_windows(text, WINDOW_SIZE, WINDOW_OVERLAP)
+    ranges = seam_ranges(windows)
+    merged: list[RecognizerResult] = []
+    for index, (start, end) in enumerate(windows):
+        for result in get_analyzer().analyze(
+            text=text[start:end],
+            language="en",
+            entities=entities,
+        ):
+            result.start += start
+            result.end += start
+            if owns_span(windows, ranges, index, result.start, result.end):
+                merged.append(result)
+    return merged
+
+
+def _make_generator(
+    text: str, existing_mapping: list[dict] | None = None
+) -> FakeGenerator:
+    """Create a ``FakeGenerator`` seeded from *text*.
+
+    Pre-populates the cache with previously seen entity replacements so
+    chunked anonymization stays consistent across calls.
+    """
+    generator = FakeGenerator(text)
+    if existing_mapping:
+        for entry in existing_mapping:
+            entity_type = entry.get("entity_type", "")
+            original = entry.get("original", "")
+            if entity_type and original and "replacement" in entry:
+                generator.remember(entity_type, original, entry["replacement"])
+    return generator
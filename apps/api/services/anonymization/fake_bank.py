@@ -0,0 +1,139 @@
+"""
+Process-wide banks of pre-generated fake values.
+
+Building a ``Faker()`` loads every provider and each value costs a Python
+call chain, so generating replacements on demand per request is slow.
+Instead, each process generates a fixed bank of distinct fake values per
+entity type once, from a fixed seed, and ``FakeGenerator`` picks values
+from it by index.  Because the seed is fixed, every process (API workers,
+pool workers, the CLI) builds identical banks, so a replacement does not
+depend on which process produced it.
+
+Configuration (environment variables):
+
+    ANONYMIZER_FAKE_BANK_SIZE   Values per entity type (default: 2048).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Callable, Optional
+
+from faker import Faker
+
+BANK_SIZE = int(os.getenv("ANONYMIZER_FAKE_BANK_SIZE", "2048"))
+BANK_SEED = 20240611
+
+FALLBACK = "FALLBACK"
+
+
+# --- Value factories ----------------------------------------------------
+
+def _case_number(faker: Faker) -> str:
+    district = faker.random_int(min=1, max=9)
+    year = faker.random_int(min=20, max=25)
+    seq = faker.random_int(min=100, max=99999)
+    return f"{district}:{year:02d}-cv-{seq:05d}"
+
+
+# Court kinds combined with states and counties, so the bank has thousands
+# of distinct courts rather than one per state.
+_COURT_KINDS = (
+    "Superior Court",
+    "District Court",
+    "Circuit Court",
+    "Probate Court",
+    "Family Court",
+    "Municipal Court",
+    "Court of Common Pleas",
+)
+
+
+def _court_name(faker: Faker) -> str:
+    kind = faker.random_element(_COURT_KINDS)
+    if faker.boolean():
+        return f"{kind} of {faker.state()}"
+    return f"{faker.last_name()} County {kind}"
+
+
+def _driver_license(faker: Faker) -> str:
+    letter = faker.random_uppercase_letter()
+    number = faker.random_int(min=1000000, max=9999999)
+    return f"{letter}{number}"
+
+
+def _fallback(faker: Faker) -> str:
+    return f"[REDACTED-{faker.lexify(text='??????').upper()}]"
+
+
+FACTORIES: dict[str, Callable[[Faker], str]] = {
+    "PERSON": lambda faker: faker.name(),
+    "ORGANIZATION": lambda faker: faker.company(),
+    "LOCATION": lambda faker: faker.city(),
+    "PHONE_NUMBER": lambda faker: faker.phone_number(),
+    "EMAIL_ADDRESS": lambda faker: faker.email(),
+    "US_SSN": lambda faker: faker.ssn(),
+    "DATE_TIME": lambda faker: faker.date(),
+    "CASE_NUMBER": _case_number,
+    "COURT_NAME": _court_name,
+    "US_DRIVER_LICENSE": _driver_license,
+    "CREDIT_CARD": lambda faker: faker.credit_card_number(),
+    "IP_ADDRESS": lambda faker: faker.ipv4(),
+    FALLBACK: _fallback,
+}
+
+
+class FakeValueBank:
+    """Distinct pre-generated fake values for every entity type."""
+
+    def __init__(self, size: int = BANK_SIZE, seed: int = BANK_SEED) -> None:
+        # seed_instance() gives this Faker its own random.Random; the
+        # class-level Faker.seed() would reseed the generator shared by
+        # every Faker in the process.
+        faker = Faker()
+        faker.seed_instance(seed)
+        self._values: dict[str, list[str]] = {
+            entity_type: _distinct(factory, faker, size)
+            for entity_type, factory in FACTORIES.items()
+        }
+
+    def values(self, entity_type: str) -> list[str]:
+        """Return the bank for *entity_type* (the fallback bank if unknown)."""
+        return self._values.get(entity_type) or self._values[FALLBACK]
+
+
+def _distinct(factory: Callable[[Faker], str], faker: Faker, size: int) -> list[str]:
+    """Draw up to *size* distinct values.
+
+    Stops early once 100 draws in a row produce nothing new, i.e. the
+    factory's value space (e.g. 50 state court names) is exhausted.
+    """
+    values: dict[str, None] = {}
+    duplicates = 0
+    while len(values) < size and duplicates < 100:
+        value = factory(faker)
+        if value in values:
+            duplicates += 1
+        else:
+            values[value] = None
+            duplicates = 0
+    return list(values)
+
+
+_bank: Optional[FakeValueBank] = None
+_bank_lock = threading.Lock()
+
+
+def get_bank() -> FakeValueBank:
+    """Return the process-wide bank, building it on first use.
+
+    Safe to call from several threads: the bank is built exactly once and
+    is read-only afterwards.
+    """
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = FakeValueBank()
+    return _bank
@@ -4,12 +4,29 @@ Faker-based replacement generator for anonymized entities.
 Produces deterministic fake values seeded from the input text so the same
 document always yields the same replacements.  Each original value is mapped
 to exactly one fake value to keep replacements consistent within a document.
+
+Values come from the process-wide banks in ``fake_bank``: the replacement
+for an original is looked up at an index derived from a hash of (seed,
+entity type, original), so generating it is an O(1) lookup and no
+``Faker`` is constructed per request.  If that value is already taken by
+another original in the same document, the next free one is used, so two
+different originals never share a replacement.  Taken bank positions are
+skipped through path-compressed links and a per-value suffix counter takes
+over once a bank is used up, so each new value stays amortized O(1) even
+on documents with more distinct entities than the bank holds.
+
+All state that determines the output (seed, cache, used values) belongs to
+the instance and the shared bank is read-only, so generators for different
+documents can run concurrently on threads without affecting each other's
+results.  A single instance is not meant to be shared between threads.
 """
 
 from __future__ import annotations
 
 import hashlib
-from faker import Faker
+from typing import MutableMapping, Optional
+
+from services.anonymization.fake_bank import get_bank
 
 
 def _seed_from_text(text: str) -> int:
@@ -21,12 +38,18 @@ def _seed_from_text(text: str) -> int:
 class FakeGenerator:
     """Generates consistent fake replacements for detected PII entities."""
 
-    def __init__(self, text: str) -> None:
-        seed = _seed_from_text(text)
-        self._faker = Faker()
-        Faker.seed(seed)
-        # Cache: (entity_type, original) -> replacement
-        self._cache: dict[tuple[str, str], str] = {}
+    def __init__(self, text: str, cache: Optional[MutableMapping] = None) -> None:
+        self._seed = _seed_from_text(text)
+        self._bank = get_bank()
+        # Cache: (entity_type, original) -> replacement.  Callers may supply
+        # their own mapping, e.g. one that does not keep originals in clear.
+        self._cache: MutableMapping[tuple[str, str], str] = {} if cache is None else cache
+        # Replacements already handed out, to keep them one-to-one.
+        self._used: set[str] = set()
+        # Per entity type: taken bank index -> a later index to try next.
+        self._skip: dict[str, dict[int, int]] = {}
+        # Bank value -> next suffix to try once the bank is used up.
+        self._suffixes: dict[str, int] = {}
 
     # ------------------------------------------------------------------
     # Public API
@@ -39,75 +62,60 @@ class FakeGenerator:
         """
         key = (entity_type, original)
         if key not in self._cache:
-            self._cache[key] = self._generate(entity_type)
+            self.remember(entity_type, original, self._generate(entity_type, original))
         return self._cache[key]
 
+    def remember(self, entity_type: str, original: str, replacement: str) -> None:
+        """Record an existing *replacement* (e.g. from an earlier chunk)."""
+        self._cache[(entity_type, original)] = replacement
+        self._used.add(replacement)
+
     # ------------------------------------------------------------------
     # Private helpers
     # ------------------------------------------------------------------
 
-    def _generate(self, entity_type: str) -> str:
-        """Dispatch to the appropriate Faker provider."""
-        generators = {
-            "PERSON": self._person,
-            "ORGANIZATION": self._organization,
-            "LOCATION": self._location,
-            "PHONE_NUMBER": self._phone,
-            "EMAIL_ADDRESS": self._email,
-            "US_SSN": self._ssn,
-            "DATE_TIME": self._date,
-            "CASE_NUMBER": self._case_number,
-            "COURT_NAME": self._court_name,
-            "US_DRIVER_LICENSE": self._driver_license,
-            "CREDIT_CARD": self._credit_card,
-            "IP_ADDRESS": self._ip_address,
-        }
-        gen = generators.get(entity_type, self._fallback)
-        return gen()
-
-    # --- Individual generators ----------------------------------------
-
-    def _person(self) -> str:
-        return self._faker.name()
-
-    def _organization(self) -> str:
-        return self._faker.company()
-
-    def _location(self) -> str:
-        return self._faker.city()
-
-    def _phone(self) -> str:
-        return self._faker.phone_number()
-
-    def _email(self) -> str:
-        return self._faker.email()
-
-    def _ssn(self) -> str:
-        return self._faker.ssn()
-
-    def _date(self) -> str:
-        return self._faker.date()
-
-    def _case_number(self) -> str:
-        district = self._faker.random_int(min=1, max=9)
-        year = self._faker.random_int(min=20, max=25)
-        seq = self._faker.random_int(min=100, max=99999)
-        return f"{district}:{year:02d}-cv-{seq:05d}"
-
-    def _court_name(self) -> str:
-        state = self._faker.state()
-        return f"Superior Court of {state}"
-
-    def _driver_license(self) -> str:
-        letter = self._faker.random_uppercase_letter()
-        number = self._faker.random_int(min=1000000, max=9999999)
-        return f"{letter}{number}"
-
-    def _credit_card(self) -> str:
-        return self._faker.credit_card_number()
-
-    def _ip_address(self) -> str:
-        return self._faker.ipv4()
-
-    def _fallback(self) -> str:
-        return f"[REDACTED-{self._faker.lexify(text='??????').upper()}]"
+    def _generate(self, entity_type: str, original: str) -> str:
+        """Pick the bank value for *original*, probing past taken ones."""
+        values = self._bank.values(entity_type)
+        digest = hashlib.blake2b(
+            f"{self._seed}\0{entity_type}\0{original}".encode("utf-8", errors="surrogatepass"),
+            digest_size=8,
+        ).digest()
+        start = int.from_bytes(digest, "big") % len(values)
+
+        index = self._next_free(entity_type, values, start)
+        if index is not None:
+            return values[index]
+
+        # Every value in the bank is taken; disambiguate with a counter.
+        base = values[start]
+        suffix = self._suffixes.get(base, 2)
+        while f"{base} {suffix}" in self._used:
+            suffix += 1
+        self._suffixes[base] = suffix + 1
+        return f"{base} {suffix}"
+
+    def _next_free(self, entity_type: str, values: list[str], start: int) -> Optional[int]:
+        """Return the first index from *start* on (wrapping) whose value is
+        free, or ``None`` if the bank is used up.
+
+        Taken indexes link forward to where the search continued; the links
+        on a search path are pointed at its result, like union-find.
+        """
+        skip = self._skip.setdefault(entity_type, {})
+        size = len(values)
+        path: list[int] = []
+        index = start
+        while len(skip) < size:
+            if index in skip:
+                path.append(index)
+                index = skip[index]
+            elif values[index] in self._used:
+                skip[index] = (index + 1) % size
+                path.append(index)
+                index = skip[index]
+            else:
+                for taken in path:
+                    skip[taken] = index
+                return index
+        return None
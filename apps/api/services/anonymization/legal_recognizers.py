@@ -2,10 +2,22 @@
 Custom legal pattern recognizers for Presidio.
 
 Defines PatternRecognizer instances for CASE_NUMBER and COURT_NAME
-entity types commonly found in legal documents.
+entity types commonly found in legal documents, and a single-pass
+``LegalPatternRecognizer`` built from the same patterns that is what the
+engine actually registers.
 """
 
-from presidio_analyzer import PatternRecognizer, Pattern
+import re
+from typing import Optional
+
+from presidio_analyzer import (
+    AnalysisExplanation,
+    LocalRecognizer,
+    Pattern,
+    PatternRecognizer,
+    RecognizerResult,
+)
+from presidio_analyzer.nlp_engine import NlpArtifacts
 
 
 # ---------------------------------------------------------------------------
@@ -111,5 +123,108 @@ court_name_recognizer = PatternRecognizer(
     supported_language="en",
 )
 
+
+# ---------------------------------------------------------------------------
+# Single-pass recognizer
+# PatternRecognizer scans the whole document once per Pattern -- nine
+# passes for the two recognizers above, several with expensive
+# ``[a-zA-Z\s]{2,30}`` tails.  LegalPatternRecognizer compiles each entity's
+# patterns into one alternation of named groups (one pass per entity) and
+# skips the court alternation altogether when the text never mentions a
+# court.  Overlapping matches of different patterns are no longer all
+# reported, but the engine keeps only the longest of overlapping spans
+# anyway, so the final output is the same.
+# ---------------------------------------------------------------------------
+
+# Same flags PatternRecognizer applies to every pattern by default.
+_REGEX_FLAGS = re.DOTALL | re.MULTILINE | re.IGNORECASE
+
+
+class LegalPatternRecognizer(LocalRecognizer):
+    """Detects CASE_NUMBER and COURT_NAME with one combined regex per entity."""
+
+    def __init__(self) -> None:
+        # entity -> (combined regex, literal prefilter, {pattern name: score})
+        self._matchers: dict[str, tuple[re.Pattern, re.Pattern, dict[str, float]]] = {
+            "CASE_NUMBER": _combine(
+                # Appellate first: its "No." prefix starts before the number
+                # the generic pattern would otherwise claim.
+                [_case_number_patterns[1], _case_number_patterns[0], _case_number_patterns[2]],
+                first_chars=r"\dncd",
+                prefilter=r"-",
+            ),
+            "COURT_NAME": _combine(
+                _court_name_patterns,
+                first_chars="usc",
+                prefilter=r"court",
+            ),
+        }
+        super().__init__(
+            supported_entities=list(self._matchers),
+            name="LegalPatternRecognizer",
+            supported_language="en",
+        )
+
+    def load(self) -> None:
+        pass
+
+    def analyze(
+        self,
+        text: str,
+        entities: list[str],
+        nlp_artifacts: Optional[NlpArtifacts] = None,
+    ) -> list[RecognizerResult]:
+        results: list[RecognizerResult] = []
+        for entity, (regex, prefilter, scores) in self._matchers.items():
+            if entity not in entities:
+                continue
+            if not prefilter.search(text):
+                continue
+            for match in regex.finditer(text):
+                start, end = match.span()
+                if start == end:
+                    continue
+                pattern_name = match.lastgroup
+                score = scores[pattern_name]
+                results.append(
+                    RecognizerResult(
+                        entity_type=entity,
+                        start=start,
+                        end=end,
+                        score=score,
+                        analysis_explanation=AnalysisExplanation(
+                            recognizer=self.name,
+                            original_score=score,
+                            pattern_name=pattern_name,
+                        ),
+                        recognition_metadata={
+                            RecognizerResult.RECOGNIZER_NAME_KEY: self.name,
+                            RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: self.id,
+                        },
+                    )
+                )
+        return results
+
+
+def _combine(
+    patterns: list[Pattern], first_chars: str, prefilter: str
+) -> tuple[re.Pattern, re.Pattern, dict[str, float]]:
+    """Compile *patterns* into one alternation of named groups.
+
+    *first_chars* lists every character a match can start with; the leading
+    lookahead lets the regex engine reject other positions without trying
+    each alternative.  *prefilter* is a literal every match contains.
+    """
+    alternation = "|".join(f"(?P<{p.name}>{p.regex})" for p in patterns)
+    regex = re.compile(rf"(?=[{first_chars}])(?:{alternation})", _REGEX_FLAGS)
+    return (
+        regex,
+        re.compile(prefilter, re.IGNORECASE),
+        {p.name: p.score for p in patterns},
+    )
+
+
+legal_pattern_recognizer = LegalPatternRecognizer()
+
 # Convenience list for bulk registration
-ALL_LEGAL_RECOGNIZERS = [case_number_recognizer, court_name_recognizer]
+ALL_LEGAL_RECOGNIZERS = [legal_pattern_recognizer]
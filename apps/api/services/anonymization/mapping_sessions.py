@@ -0,0 +1,299 @@
+"""
+Short-lived server-side mapping sessions for chunked anonymization.
+
+Without a session, a client anonymizing a long document chunk by chunk has
+to resend the whole accumulated ``existing_mapping`` with every chunk, and
+the engine rebuilds its replacement cache from it each time -- quadratic in
+document length.  A mapping session keeps that state on the server instead:
+the client opens one, references it by ID on every chunk, and gets back only
+the entries that chunk added.
+
+Each session has its own random keys: lookups go through an HMAC of (entity
+type, original) and the entries themselves are stored Fernet-encrypted, so
+the session's memory alone does not reveal the originals once its keys are
+gone.  The one exception is the session's ``KnownEntityMatcher``, which has
+to hold the originals to find them in later chunks; it is extended with each
+chunk's new entries (instead of decrypting the whole mapping and rebuilding
+it per chunk) and dropped together with the keys.  Sessions expire after a
+sliding TTL and are burned (keys, entries and matcher dropped) when the
+client ends them.
+
+Every session belongs to the user who opened it and is only found for that
+user.  The store is bounded three ways: open sessions per process, open
+sessions per user, and mapping entries per session.  When a limit is hit
+the request is refused with ``MappingSessionLimitError``; live sessions are
+never evicted to make room.
+
+Sessions live in the memory of the API process that created them.  With
+several API workers the client must be routed back to the same worker (or
+fall back to ``existing_mapping`` when a session is not found).
+
+Configuration (environment variables):
+
+    ANONYMIZER_MAPPING_TTL                Idle seconds before a session expires (default: 900).
+    ANONYMIZER_MAPPING_SESSIONS           Maximum open sessions per process (default: 1000).
+    ANONYMIZER_MAPPING_SESSIONS_PER_USER  Maximum open sessions per user (default: 5).
+    ANONYMIZER_MAPPING_ENTRIES            Maximum mapping entries per session (default: 50000).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Iterator, MutableMapping, Optional
+
+from cryptography.fernet import Fernet
+
+from services.anonymization.aho_corasick import KnownEntityMatcher
+from services.anonymization.fake_generator import FakeGenerator
+from services.anonymization.spans import Span, apply_replacements, replacement_spans
+
+SESSION_TTL = int(os.getenv("ANONYMIZER_MAPPING_TTL", "900"))
+MAX_SESSIONS = int(os.getenv("ANONYMIZER_MAPPING_SESSIONS", "1000"))
+MAX_SESSIONS_PER_USER = int(os.getenv("ANONYMIZER_MAPPING_SESSIONS_PER_USER", "5"))
+MAX_ENTRIES = int(os.getenv("ANONYMIZER_MAPPING_ENTRIES", "50000"))
+
+
+class MappingSessionLimitError(RuntimeError):
+    """Raised when a session cannot be opened or grown because a limit is hit."""
+
+
+class _SealedCache(MutableMapping):
+    """Replacement cache keyed by an HMAC of ``(entity_type, original)``.
+
+    Drop-in for the ``FakeGenerator`` cache.  Only digests and replacements
+    are held, so the cache cannot be iterated back to the originals.
+    """
+
+    def __init__(self, key: bytes) -> None:
+        self._key = key
+        self._replacements: dict[bytes, str] = {}
+
+    def digest(self, item: tuple[str, str]) -> bytes:
+        entity_type, original = item
+        message = f"{entity_type}\0{original}".encode("utf-8", errors="surrogatepass")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def __contains__(self, item: object) -> bool:
+        return self.digest(item) in self._replacements  # type: ignore[arg-type]
+
+    def __getitem__(self, item: tuple[str, str]) -> str:
+        return self._replacements[self.digest(item)]
+
+    def __setitem__(self, item: tuple[str, str], replacement: str) -> None:
+        self._replacements[self.digest(item)] = replacement
+
+    def __delitem__(self, item: tuple[str, str]) -> None:
+        del self._replacements[self.digest(item)]
+
+    def __iter__(self) -> Iterator:
+        raise TypeError("sealed cache keys cannot be listed")
+
+    def __len__(self) -> int:
+        return len(self._replacements)
+
+
+class _SealedSet:
+    """Set of ``(entity_type, original)`` pairs backed by the cache's HMAC."""
+
+    def __init__(self, cache: _SealedCache) -> None:
+        self._cache = cache
+        self._digests: set[bytes] = set()
+
+    def __contains__(self, item: tuple[str, str]) -> bool:
+        return self._cache.digest(item) in self._digests
+
+    def add(self, item: tuple[str, str]) -> None:
+        self._digests.add(self._cache.digest(item))
+
+
+class MappingSession:
+    """Mapping state shared by the chunks of one document."""
+
+    def __init__(
+        self, owner: str, ttl: int = SESSION_TTL, max_entries: int = MAX_ENTRIES
+    ) -> None:
+        self.id = secrets.token_urlsafe(24)
+        self.owner = owner
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._fernet = Fernet(Fernet.generate_key())
+        self._cache = _SealedCache(os.urandom(32))
+        self._seen = _SealedSet(self._cache)
+        self._records: list[bytes] = []
+        self._matcher = KnownEntityMatcher(())
+        self._generator: Optional[FakeGenerator] = None
+        self._lock = threading.Lock()
+        self.touch()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def touch(self) -> None:
+        """Extend the session's lifetime by its TTL from now."""
+        self.expires_at = time.monotonic() + self.ttl
+
+    def render(
+        self,
+        text: str,
+        spans: list[Span],
+        existing_mapping: Optional[list[dict]] = None,
+        response_format: str = "full",
+    ) -> tuple[str | list[dict], list[dict]]:
+        """Replace *spans* in *text* and return it with the new mapping entries.
+
+        The replacement generator is seeded from the first chunk the session
+        sees, exactly like a one-shot ``anonymize`` call on that chunk.
+        *existing_mapping* entries (e.g. from before the session was opened)
+        are added to the session first and are not part of the delta.  With
+        ``response_format="spans"`` the edits are returned instead of the
+        text (see ``spans.replacement_spans``).
+
+        Raises ``MappingSessionLimitError`` once the session holds
+        ``max_entries`` entries; the chunk that crosses the limit is still
+        rendered, so a session can end up to one chunk's entries over it.
+        """
+        with self._lock:
+            generator = self._absorb(text, existing_mapping)
+            delta: list[dict] = []
+            render = replacement_spans if response_format == "spans" else apply_replacements
+            output = render(text, spans, generator, delta, self._seen)
+            for entry in delta:
+                self._seal(entry)
+            return output, delta
+
+    def known_spans(
+        self, text: str, existing_mapping: Optional[list[dict]] = None
+    ) -> list[Span]:
+        """Return the occurrences in *text* of originals already mapped.
+
+        *existing_mapping* is added to the session first, as in ``render``.
+        """
+        with self._lock:
+            self._absorb(text, existing_mapping)
+            return self._matcher.find(text)
+
+    def entries(self) -> list[dict]:
+        """Decrypt and return every mapping entry, in insertion order."""
+        with self._lock:
+            return [json.loads(self._fernet.decrypt(record)) for record in self._records]
+
+    def burn(self) -> None:
+        """Drop the keys and every entry; the session is unusable afterwards."""
+        with self._lock:
+            self._records.clear()
+            self._matcher = KnownEntityMatcher(())
+            self._cache = _SealedCache(os.urandom(32))
+            self._seen = _SealedSet(self._cache)
+            self._generator = None
+            self._fernet = Fernet(Fernet.generate_key())
+            self.expires_at = 0.0
+
+    def _absorb(self, text: str, existing_mapping: Optional[list[dict]]) -> FakeGenerator:
+        if len(self._records) + len(existing_mapping or []) >= self.max_entries:
+            raise MappingSessionLimitError(
+                f"Mapping session is full ({self.max_entries} entries)"
+            )
+        generator = self._generator_for(text)
+        for entry in existing_mapping or []:
+            key = (entry["entity_type"], entry["original"])
+            if key not in self._seen:
+                generator.remember(key[0], key[1], entry["replacement"])
+                self._seen.add(key)
+                self._seal(entry)
+        return generator
+
+    def _generator_for(self, text: str) -> FakeGenerator:
+        if self._generator is None:
+            self._generator = FakeGenerator(text, cache=self._cache)
+        return self._generator
+
+    def _seal(self, entry: dict) -> None:
+        record = {
+            "original": entry["original"],
+            "replacement": entry["replacement"],
+            "entity_type": entry["entity_type"],
+        }
+        self._records.append(self._fernet.encrypt(json.dumps(record).encode("utf-8")))
+        self._matcher.add((record,))
+
+
+class MappingSessionStore:
+    """Open mapping sessions of this process, expired by TTL."""
+
+    def __init__(
+        self,
+        max_sessions: int = MAX_SESSIONS,
+        ttl: int = SESSION_TTL,
+        max_per_user: int = MAX_SESSIONS_PER_USER,
+        max_entries: int = MAX_ENTRIES,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_per_user = max_per_user
+        self.max_entries = max_entries
+        self._sessions: dict[str, MappingSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, owner: str) -> MappingSession:
+        """Open a new session for *owner*.
+
+        Raises ``MappingSessionLimitError`` if the store or the owner's
+        quota is full.
+        """
+        with self._lock:
+            self._sweep()
+            if len(self._sessions) >= self.max_sessions:
+                raise MappingSessionLimitError("Too many open mapping sessions, try again later")
+            owned = sum(1 for s in self._sessions.values() if s.owner == owner)
+            if owned >= self.max_per_user:
+                raise MappingSessionLimitError(
+                    f"At most {self.max_per_user} mapping sessions can be open per user"
+                )
+            session = MappingSession(owner, self.ttl, self.max_entries)
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str, owner: str) -> Optional[MappingSession]:
+        """Return *owner*'s live session for *session_id* and refresh its TTL."""
+        with self._lock:
+            self._sweep()
+            session = self._sessions.get(session_id)
+        if session is None or session.owner != owner:
+            return None
+        session.touch()
+        return session
+
+    def burn(self, session_id: str, owner: str) -> bool:
+        """Close and wipe *owner*'s session.  Returns ``False`` if it did not exist."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.owner != owner:
+                return False
+            del self._sessions[session_id]
+        session.burn()
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sweep()
+            return len(self._sessions)
+
+    def _sweep(self) -> None:
+        expired = [sid for sid, session in self._sessions.items() if session.expired]
+        for sid in expired:
+            self._sessions.pop(sid).burn()
+
+
+_store = MappingSessionStore()
+
+
+def get_mapping_sessions() -> MappingSessionStore:
+    """Return the process-wide mapping session store."""
+    return _store
@@ -0,0 +1,372 @@
+"""
+Process-pool execution backend for the anonymization engine.
+
+Presidio/spaCy analysis is CPU-bound and would block the event loop if it
+ran inside an ``async def`` endpoint, stalling every concurrent SSE stream
+on the worker.  This module owns a ``ProcessPoolExecutor`` whose workers
+each import the engine (and therefore build their own warmed analyzer)
+once at start-up.  Endpoints dispatch engine calls to the pool and await
+the result, with a bounded number of pending submissions and a per-call
+timeout.
+
+Tasks are addressed by ``"module:function"`` strings rather than function
+objects so that the parent process never has to import -- and load the
+spaCy model for -- the modules that only the workers need.
+
+Configuration (environment variables):
+
+    ANONYMIZER_POOL_SIZE     Worker processes per API process (default: 2,
+                             or 1 on a single CPU).  ``0`` disables the pool
+                             and runs calls on the event loop's default
+                             thread pool in this process (the engine is
+                             thread-safe, but analysis then shares one GIL).
+                             ``gunicorn.conf.py`` derives it from a per-host
+                             total instead.
+    ANONYMIZER_QUEUE_SIZE    Submissions allowed to wait for a free worker
+                             before new calls are rejected (default: 32).
+    ANONYMIZER_TIMEOUT       Per-call timeout in seconds (default: 60).
+    ANONYMIZER_POOL_START_METHOD
+                             ``spawn`` (default) or ``fork``.  ``fork`` lets
+                             workers inherit a model preloaded by the
+                             parent instead of loading their own copy; see
+                             ``gunicorn.conf.py``.
+    ANONYMIZER_PARALLEL_CHARS
+                             Texts at least this long (default: 200000) are
+                             split into segments that are analyzed on
+                             several workers at once; ``0`` disables this.
+    ANONYMIZER_SEGMENT_CHARS Target segment size (default: 50000).
+
+Every worker holds its own analyzer.  With ``spawn`` that is a private
+copy of the NER model -- on the order of 1 GB resident for
+``en_core_web_lg`` -- so memory grows with pool size times API processes,
+which is why the default pool is small.  Raise it on hosts with the RAM to
+spare, or use ``fork`` to share a preloaded model (``gunicorn.conf.py``).
+
+Splitting a text depends only on the text and the segment size, and the
+segment results are merged (``spans.merge_segments``) and rendered in
+document order, so the output does not depend on which worker finishes
+first and an original gets one replacement however many segments found
+it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from services.anonymization.aho_corasick import KnownEntityMatcher
+from services.anonymization.segmentation import sentence_windows
+from services.anonymization.spans import Span, merge_segments
+
+logger = logging.getLogger(__name__)
+
+# Small by default: every worker loads its own copy of the NER model.
+POOL_SIZE = int(os.getenv("ANONYMIZER_POOL_SIZE", str(min(2, os.cpu_count() or 1))))
+QUEUE_SIZE = int(os.getenv("ANONYMIZER_QUEUE_SIZE", "32"))
+CALL_TIMEOUT = float(os.getenv("ANONYMIZER_TIMEOUT", "60"))
+START_METHOD = os.getenv("ANONYMIZER_POOL_START_METHOD", "spawn")
+PARALLEL_CHARS = int(os.getenv("ANONYMIZER_PARALLEL_CHARS", "200000"))
+SEGMENT_CHARS = int(os.getenv("ANONYMIZER_SEGMENT_CHARS", "50000"))
+# Segments overlap like the engine's analysis windows.
+SEGMENT_OVERLAP = int(os.getenv("ANONYMIZER_WINDOW_OVERLAP", "2000"))
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when the submission queue is full."""
+
+
+class AnonymizationTimeoutError(TimeoutError):
+    """Raised when a pooled call does not finish within its timeout."""
+
+
+class PoolCrashedError(RuntimeError):
+    """Raised when a worker died during a call; the pool is restarted."""
+
+
+# ------------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------------
+
+def _worker_init(pids=None) -> None:
+    """Load the shared analyzer and fake-value banks once per worker so the
+    first real request does not pay for model loading.  Reports the
+    worker's PID on *pids*, a queue read by ``AnonymizationPool``."""
+    if pids is not None:
+        pids.put(os.getpid())
+    import services.anonymization.engine  # noqa: F401
+    from services.anonymization.analyzer import warm_up
+    from services.anonymization.fake_bank import get_bank
+
+    warm_up()
+    get_bank()
+
+
+@lru_cache(maxsize=None)
+def _resolve(target: str) -> Callable[..., Any]:
+    """Turn a ``"module:function"`` string into the callable it names."""
+    module_name, _, func_name = target.partition(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _invoke(target: str, args: tuple, kwargs: dict) -> Any:
+    return _resolve(target)(*args, **kwargs)
+
+
+# ------------------------------------------------------------------
+# Parent side
+# ------------------------------------------------------------------
+
+class AnonymizationPool:
+    """A bounded, timeout-aware front end over a ``ProcessPoolExecutor``."""
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        queue_size: int = QUEUE_SIZE,
+        timeout: float = CALL_TIMEOUT,
+        start_method: str = START_METHOD,
+    ) -> None:
+        self.size = max(0, size)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid_queue = None
+        self._pids: set[int] = set()
+        self._pending = 0
+
+    # --- Lifecycle ----------------------------------------------------
+
+    def start(self) -> None:
+        """Spawn the worker processes (no-op when the pool is disabled)."""
+        if self.size == 0 or self._executor is not None:
+            return
+        # "spawn" keeps workers independent of the parent's event loop
+        # threads and open sockets; "fork" shares an already loaded model
+        # copy-on-write.
+        context = multiprocessing.get_context(self.start_method)
+        self._pid_queue = context.SimpleQueue()
+        self._pids = set()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=context,
+            initializer=_worker_init,
+            initargs=(self._pid_queue,),
+        )
+        # Force every worker to start (and warm up) now rather than lazily
+        # on the first request.
+        for _ in range(self.size):
+            self._executor.submit(int)
+        logger.info(
+            "[Anonymization Pool] Started %d workers (%s)", self.size, self.start_method
+        )
+
+    def shutdown(self) -> None:
+        """Stop the workers, cancelling anything still queued."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def worker_pids(self) -> list[int]:
+        """Return the PIDs of the worker processes that have started."""
+        if self._executor is None:
+            return []
+        while not self._pid_queue.empty():
+            self._pids.add(self._pid_queue.get())
+        return sorted(self._pids)
+
+    # --- Dispatch -----------------------------------------------------
+
+    async def run(self, target: str, *args: Any, **kwargs: Any) -> Any:
+        """Run ``target(*args, **kwargs)`` in a worker and return its result.
+
+        Raises ``PoolSaturatedError`` if more than ``size + queue_size``
+        calls are already in flight, ``AnonymizationTimeoutError`` if the
+        call takes longer than the configured timeout and
+        ``PoolCrashedError`` if its worker died.
+        """
+        if self._pending >= (self.size or 1) + self.queue_size:
+            raise PoolSaturatedError("Anonymization queue is full")
+
+        if self._executor is None:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        # With the pool disabled, self._executor is None and the call runs
+        # on the loop's default thread pool.
+        executor = self._executor
+        try:
+            future = loop.run_in_executor(executor, _invoke, target, args, kwargs)
+        except BrokenProcessPool as exc:
+            self._restart(executor)
+            raise PoolCrashedError("Anonymization worker crashed") from exc
+        # A timed-out or abandoned call keeps its worker busy, so its slot
+        # is only released once the worker is done with it.
+        self._pending += 1
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise AnonymizationTimeoutError(
+                f"Anonymization did not finish within {self.timeout:g}s"
+            )
+        except BrokenProcessPool as exc:
+            self._restart(executor)
+            raise PoolCrashedError("Anonymization worker crashed") from exc
+
+    def _restart(self, executor: Optional[ProcessPoolExecutor]) -> None:
+        """Replace *executor* after a worker died (e.g. OOM-killed), so later
+        requests are not all failed by the broken executor.
+
+        Every call in flight sees the breakage; only the first one to get
+        here restarts, and never a pool that has been replaced already.
+        """
+        if executor is None or self._executor is not executor:
+            return
+        logger.error("[Anonymization Pool] Worker crashed, restarting pool")
+        self.shutdown()
+        self.start()
+
+    def _release(self, future: asyncio.Future) -> None:
+        self._pending -= 1
+        if not future.cancelled():
+            future.exception()  # retrieved here if the caller gave up
+
+    async def map(self, target: str, calls: list[tuple[tuple, dict]]) -> list[Any]:
+        """Run ``target(*args, **kwargs)`` for each of *calls* concurrently.
+
+        At most ``size`` of the calls are in flight at once, so one large
+        job cannot fill the submission queue by itself.  Results are in
+        call order; if a call fails, the rest are cancelled.
+        """
+        limit = asyncio.Semaphore(max(1, self.size))
+
+        async def call(args: tuple, kwargs: dict) -> Any:
+            async with limit:
+                return await self.run(target, *args, **kwargs)
+
+        tasks = [asyncio.ensure_future(call(args, kwargs)) for args, kwargs in calls]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+# Module-level singleton -- started and stopped by the app lifespan.
+_pool = AnonymizationPool()
+
+
+def get_pool() -> AnonymizationPool:
+    """Return the process-wide anonymization pool."""
+    return _pool
+
+
+async def run_anonymize(
+    text: str,
+    existing_mapping: list[dict] | None = None,
+    profile: str | None = None,
+    response_format: str = "full",
+) -> dict:
+    """Pooled equivalent of ``services.anonymization.engine.anonymize``.
+
+    Large texts are analyzed in parallel segments (see ``_analyze_segments``)
+    and the merged spans rendered by one worker.
+    """
+    if _parallel(text):
+        known = KnownEntityMatcher(existing_mapping or []).find(text)
+        spans = await _analyze_segments(text, profile, known)
+        return await _pool.run(
+            "services.anonymization.engine:render",
+            text,
+            spans,
+            existing_mapping=existing_mapping,
+            response_format=response_format,
+        )
+    return await _pool.run(
+        "services.anonymization.engine:anonymize",
+        text,
+        existing_mapping=existing_mapping,
+        profile=profile,
+        response_format=response_format,
+    )
+
+
+async def run_anonymize_batch(
+    texts: list[str],
+    existing_mapping: list[dict] | None = None,
+    profile: str | None = None,
+) -> dict:
+    """Pooled equivalent of ``services.anonymization.engine.anonymize_batch``."""
+    return await _pool.run(
+        "services.anonymization.engine:anonymize_batch",
+        texts,
+        existing_mapping=existing_mapping,
+        profile=profile,
+    )
+
+
+async def run_analyze_spans(
+    text: str,
+    profile: str | None = None,
+    known_spans: list | None = None,
+) -> list:
+    """Pooled equivalent of ``services.anonymization.engine.analyze_spans``.
+
+    Large texts are analyzed in parallel segments.
+    """
+    if _parallel(text):
+        return await _analyze_segments(text, profile, known_spans)
+    return await _pool.run(
+        "services.anonymization.engine:analyze_spans",
+        text,
+        profile=profile,
+        known_spans=known_spans,
+    )
+
+
+async def run_scrub_texts(texts: list[str]) -> list[str]:
+    """Pooled equivalent of ``services.pii_scrubber.scrub_texts``."""
+    return await _pool.run("services.pii_scrubber:scrub_texts", texts)
+
+
+def _parallel(text: str) -> bool:
+    return PARALLEL_CHARS > 0 and _pool.size > 1 and len(text) >= PARALLEL_CHARS
+
+
+async def _analyze_segments(
+    text: str, profile: str | None, known_spans: list[Span] | None
+) -> list[Span]:
+    """Analyze sentence-aligned segments of *text* on several workers.
+
+    Only each segment's text, and the known spans that lie inside it, are
+    sent to its worker; the spans come back relative to the segment and
+    are merged here.
+    """
+    windows = sentence_windows(text, SEGMENT_CHARS, SEGMENT_OVERLAP)
+    segment_spans = await _pool.map(
+        "services.anonymization.engine:analyze_spans",
+        [
+            (
+                (text[start:end],),
+                {
+                    "profile": profile,
+                    "known_spans": [
+                        Span(span.start - start, span.end - start, span.entity_type, span.score)
+                        for span in known_spans or []
+                        if start <= span.start and span.end <= end
+                    ],
+                },
+            )
+            for start, end in windows
+        ],
+    )
+    return merge_segments(text, windows, segment_spans)
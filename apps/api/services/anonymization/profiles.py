@@ -0,0 +1,68 @@
+"""
+Named detection profiles for the anonymization engine.
+
+A profile selects which entity types are detected and whether the spaCy
+NLP pipeline runs at all:
+
+    full   Every supported entity, including the NER-based PERSON,
+           ORGANIZATION and LOCATION (the original behavior).
+    fast   Structured identifiers only, found by the pattern recognizers
+           (Presidio's regex/checksum recognizers plus the legal
+           recognizers).  spaCy is skipped entirely, so latency is a few
+           regex passes over the text.
+
+Pure Python so routers can validate a profile name without importing the
+engine.
+"""
+
+from __future__ import annotations
+
+# Entity types the engine will attempt to detect.
+SUPPORTED_ENTITIES: list[str] = [
+    "PERSON",
+    "ORGANIZATION",
+    "LOCATION",
+    "PHONE_NUMBER",
+    "EMAIL_ADDRESS",
+    "US_SSN",
+    "DATE_TIME",
+    "CASE_NUMBER",
+    "COURT_NAME",
+    "US_DRIVER_LICENSE",
+    "CREDIT_CARD",
+    "IP_ADDRESS",
+]
+
+# Entities that pattern recognizers can find without NLP artifacts.
+PATTERN_ENTITIES: list[str] = [
+    "PHONE_NUMBER",
+    "EMAIL_ADDRESS",
+    "US_SSN",
+    "DATE_TIME",
+    "CASE_NUMBER",
+    "COURT_NAME",
+    "US_DRIVER_LICENSE",
+    "CREDIT_CARD",
+    "IP_ADDRESS",
+]
+
+PROFILES: dict[str, dict] = {
+    "full": {"entities": SUPPORTED_ENTITIES, "use_nlp": True},
+    "fast": {"entities": PATTERN_ENTITIES, "use_nlp": False},
+}
+
+DEFAULT_PROFILE = "full"
+
+
+def get_profile(name: str | None) -> dict:
+    """Return the profile called *name* (the default profile for ``None``).
+
+    Raises ``ValueError`` for unknown names.
+    """
+    profile = PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        raise ValueError(
+            f"Unknown detection profile '{name}'. "
+            f"Available profiles: {', '.join(sorted(PROFILES))}"
+        )
+    return profile
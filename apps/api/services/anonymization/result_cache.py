@@ -0,0 +1,101 @@
+"""
+Content-addressed cache of analyzer results.
+
+Legal documents repeat boilerplate -- signature blocks, caption headers,
+court names -- across files and sessions.  This cache maps a keyed hash of
+a paragraph (plus the entity set it was analyzed for) to the spans the
+analyzer found in it, so NER only runs on paragraphs it has not seen
+before.  Only offsets, entity types and scores are stored; the paragraph
+text itself is never kept, and the hash key is random per process so
+cached keys cannot be matched against guessed inputs offline.
+
+Replacement consistency is unaffected: cached spans go through the same
+``FakeGenerator`` as fresh ones.  The cache lives in the process that runs
+the analyzer, i.e. one per anonymization pool worker.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from services.anonymization.spans import Span
+
+MAX_ENTRIES = int(os.getenv("ANONYMIZER_CACHE_ENTRIES", "10000"))
+MAX_SPANS = int(os.getenv("ANONYMIZER_CACHE_SPANS", "200000"))
+
+
+class AnalysisCache:
+    """LRU cache of paragraph analysis results, bounded by entries and spans.
+
+    Span offsets are relative to the paragraph.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_spans: int = MAX_SPANS) -> None:
+        self.max_entries = max_entries
+        self.max_spans = max_spans
+        self._entries: OrderedDict[bytes, tuple[Span, ...]] = OrderedDict()
+        self._span_count = 0
+        self._key = os.urandom(32)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, text: str, entities: Iterable[str]) -> bytes:
+        """Return the cache key for *text* analyzed for *entities*."""
+        digest = hashlib.blake2b(key=self._key, digest_size=32)
+        digest.update(",".join(sorted(entities)).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8", errors="surrogatepass"))
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[tuple[Span, ...]]:
+        """Return the cached spans for *key*, or ``None`` on a miss."""
+        with self._lock:
+            spans = self._entries.get(key)
+            if spans is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return spans
+
+    def put(self, key: bytes, spans: Iterable[Span]) -> None:
+        """Store *spans* under *key*, evicting least recently used entries."""
+        spans = tuple(spans)
+        if not self.enabled or len(spans) > self.max_spans:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._span_count -= len(previous)
+            self._entries[key] = spans
+            self._span_count += len(spans)
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self._span_count > self.max_spans
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._span_count -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._span_count = 0
+
+    def stats(self) -> dict:
+        """Return size and hit-rate counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "spans": self._span_count,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
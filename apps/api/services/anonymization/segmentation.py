@@ -0,0 +1,126 @@
+"""
+Sentence-aligned text segmentation for the anonymization engine.
+
+Splits long documents into windows that end on sentence or paragraph
+boundaries so each piece can be analyzed on its own without cutting a
+sentence (and the entities in it) in half.  Pure Python -- no Presidio or
+spaCy imports -- so it can be used from the API process as well as from
+analyzer workers.
+"""
+
+from __future__ import annotations
+
+import re
+
+# A sentence ends with terminal punctuation (optionally followed by closing
+# quotes/brackets) and whitespace; a paragraph ends with a blank line.  The
+# boundary position is the end of the match, i.e. the start of the next
+# sentence.
+_BOUNDARY = re.compile(r"[.!?][\"')\]]*\s+|\n[ \t]*\n\s*")
+_WHITESPACE = re.compile(r"\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+
+
+def paragraph_spans(text: str) -> list[tuple[int, int]]:
+    """Return ``(start, end)`` spans of the blank-line separated paragraphs.
+
+    The separators themselves are not part of any span, and whitespace-only
+    paragraphs are skipped.
+    """
+    spans: list[tuple[int, int]] = []
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        if text[start : match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def sentence_windows(
+    text: str, window_size: int, overlap: int = 0
+) -> list[tuple[int, int]]:
+    """Return ``(start, end)`` windows covering *text*.
+
+    Each window is at most *window_size* characters and ends on the last
+    sentence boundary inside it, falling back to the last whitespace and
+    finally to a hard cut.  Consecutive windows overlap by between
+    ``overlap // 2`` and *overlap* characters: the next window starts on
+    the first sentence boundary in that range, else on the first word
+    start, else exactly *overlap* characters back.  Use ``owns_span`` to
+    decide which window's copy of a span near a seam to keep.  With
+    ``overlap=0`` the windows tile the text exactly.
+    """
+    length = len(text)
+    if length <= window_size:
+        return [(0, length)]
+
+    windows: list[tuple[int, int]] = []
+    start = 0
+    while start < length:
+        end = min(start + window_size, length)
+        if end < length:
+            end = _last_break(text, start + window_size // 2, end)
+        windows.append((start, end))
+        if end >= length:
+            break
+        next_start = end
+        if overlap > 0:
+            lo = max(start + 1, end - overlap)
+            hi = max(lo, end - overlap // 2)
+            next_start = _first_break(text, lo, hi)
+        start = next_start
+    return windows
+
+
+def seam_ranges(windows: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Return the ``[lo, hi)`` range of span starts each window owns.
+
+    Every seam is split at the midpoint of the overlap between the two
+    windows, so each position belongs to exactly one window, and an
+    entity starting there has at least half the overlap to its owner's
+    edge.
+    """
+    cuts = [(end + next_start) // 2 for (_, end), (next_start, _) in zip(windows, windows[1:])]
+    return list(zip([windows[0][0]] + cuts, cuts + [windows[-1][1]]))
+
+
+def owns_span(
+    windows: list[tuple[int, int]],
+    ranges: list[tuple[int, int]],
+    index: int,
+    start: int,
+    end: int,
+) -> bool:
+    """Whether window *index* keeps the span ``[start, end)`` (document offsets).
+
+    A window keeps the spans starting in its range (see ``seam_ranges``).
+    It also keeps a span starting before its range that runs past the end
+    of the previous window, which only saw it cut short; overlap
+    resolution then prefers the longer copy.
+    """
+    lo, hi = ranges[index]
+    if lo <= start < hi:
+        return True
+    return start < lo and index > 0 and end > windows[index - 1][1]
+
+
+def _last_break(text: str, lo: int, hi: int) -> int:
+    """Return the last sentence boundary (else whitespace) in ``[lo, hi]``."""
+    for pattern in (_BOUNDARY, _WHITESPACE):
+        last = None
+        for match in pattern.finditer(text, lo, hi):
+            last = match
+        if last is not None:
+            return last.end()
+    return hi
+
+
+def _first_break(text: str, lo: int, hi: int) -> int:
+    """Return the first sentence boundary (else word start) in ``[lo, hi]``, else *lo*."""
+    for pattern in (_BOUNDARY, _WHITESPACE):
+        match = pattern.search(text, lo, hi)
+        if match:
+            return match.end()
+    return lo
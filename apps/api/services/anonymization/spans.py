@@ -0,0 +1,243 @@
+"""
+Span bookkeeping for the anonymization engine.
+
+Resolves overlapping detections and rebuilds the anonymized text from the
+surviving spans.  Both steps are near-linear in the number of spans and the
+length of the text, which matters on entity-dense legal documents with
+thousands of hits.  Pure Python -- works on anything with ``start``,
+``end``, ``score`` and ``entity_type`` attributes, such as Presidio's
+``RecognizerResult``.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Iterator, NamedTuple
+
+from services.anonymization.segmentation import owns_span, seam_ranges
+
+if TYPE_CHECKING:
+    from presidio_analyzer import RecognizerResult
+
+    from services.anonymization.fake_generator import FakeGenerator
+
+
+# Output formats for anonymized text: the whole text, or replacement spans.
+RESPONSE_FORMATS = ("full", "spans")
+
+_ASTRAL = re.compile("[\U00010000-\U0010ffff]")
+
+
+class Span(NamedTuple):
+    """A detection reduced to plain data (cheap to cache and to pickle)."""
+
+    start: int
+    end: int
+    entity_type: str
+    score: float
+
+
+def resolve_overlaps(results: list[RecognizerResult]) -> list[RecognizerResult]:
+    """Remove overlapping detections, preferring longer (then higher-score) spans.
+
+    Candidates are visited longest-first and kept only if they do not
+    overlap an already kept span.  Kept spans never overlap each other, so
+    they are stored sorted by start and a candidate only has to be checked
+    against its two neighbours (found by binary search) instead of every
+    kept span.  Returns the kept spans ordered by start position.
+    """
+    # Sort by length descending, then by score descending.
+    candidates = sorted(results, key=lambda r: (-(r.end - r.start), -r.score))
+
+    starts: list[int] = []
+    ends: list[int] = []
+    kept: list[RecognizerResult] = []
+    for candidate in candidates:
+        i = bisect_right(starts, candidate.start)
+        if i > 0 and ends[i - 1] > candidate.start:
+            continue
+        if i < len(starts) and starts[i] < candidate.end:
+            continue
+        starts.insert(i, candidate.start)
+        ends.insert(i, candidate.end)
+        kept.insert(i, candidate)
+    return kept
+
+
+def merge_segments(
+    text: str,
+    windows: list[tuple[int, int]],
+    segment_spans: list[list[Span]],
+) -> list[Span]:
+    """Combine spans detected separately in the *windows* of *text*.
+
+    ``segment_spans[i]`` holds the spans found in ``text[start:end]`` for
+    ``windows[i]``, relative to that window.  They are shifted to document
+    offsets and, as in the engine's windowed analysis, each seam is owned
+    by one side (``segmentation.owns_span``); duplicates from the overlaps
+    are removed by ``resolve_overlaps``.  Entity types are then
+    reconciled with ``reconcile_entity_types``.  The result only depends
+    on the inputs, not on the order in which the windows were analyzed.
+    """
+    ranges = seam_ranges(windows)
+    merged: list[Span] = []
+    for index, ((start, _), spans) in enumerate(zip(windows, segment_spans)):
+        for span in spans:
+            shifted = Span(span.start + start, span.end + start, span.entity_type, span.score)
+            if owns_span(windows, ranges, index, shifted.start, shifted.end):
+                merged.append(shifted)
+    return reconcile_entity_types(text, resolve_overlaps(merged))
+
+
+def settled_offset(spans: list[Span], cut: int) -> int:
+    """Return how far the overlap resolution of *spans* is final.
+
+    Spans found later are assumed to start at or after *cut*.  Overlapping
+    spans are resolved as a group (``resolve_overlaps``), so a later span
+    can only change the outcome for the group of overlapping *spans* that
+    reaches past *cut*; everything before that group's start is settled.
+    """
+    group_start = group_end = None
+    for span in sorted(spans, key=lambda s: s.start):
+        if group_end is None or span.start >= group_end:
+            if group_end is not None and group_end > cut:
+                break
+            group_start, group_end = span.start, span.end
+        else:
+            group_end = max(group_end, span.end)
+    if group_end is not None and group_end > cut:
+        return min(cut, group_start)
+    return cut
+
+
+def reconcile_entity_types(text: str, spans: list[Span]) -> list[Span]:
+    """Give every occurrence of the same original one entity type.
+
+    Replacements are keyed by ``(entity_type, original)``, so an original
+    detected as PERSON in one place and LOCATION in another would get two
+    different fake values.  Each original takes the type it was detected
+    as most often, then the one with the highest score, then the first by
+    name.
+    """
+    votes: dict[str, dict[str, tuple[int, float]]] = {}
+    for span in spans:
+        per_type = votes.setdefault(text[span.start : span.end], {})
+        count, score = per_type.get(span.entity_type, (0, 0.0))
+        per_type[span.entity_type] = (count + 1, max(score, span.score))
+
+    chosen = {
+        original: min(per_type, key=lambda t: (-per_type[t][0], -per_type[t][1], t))
+        for original, per_type in votes.items()
+        if len(per_type) > 1
+    }
+    if not chosen:
+        return spans
+    return [
+        span._replace(entity_type=chosen.get(text[span.start : span.end], span.entity_type))
+        for span in spans
+    ]
+
+
+def check_response_format(response_format: str) -> None:
+    """Raise ``ValueError`` unless *response_format* is in ``RESPONSE_FORMATS``."""
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(
+            f"Unknown response format '{response_format}'. "
+            f"Available: {', '.join(RESPONSE_FORMATS)}"
+        )
+
+
+def apply_replacements(
+    text: str,
+    results: list[RecognizerResult],
+    generator: FakeGenerator,
+    mapping: list[dict],
+    seen: set[tuple[str, str]],
+) -> str:
+    """Substitute every span in *results* and return the anonymized text.
+
+    *results* must not overlap.  The output is assembled left to right from
+    untouched slices and replacements and joined once, rather than copying
+    the whole string for every entity.
+
+    New ``(entity_type, original)`` pairs are appended to *mapping* in
+    document order; *seen* tracks which pairs are already there so callers
+    can share both across several texts.
+    """
+    parts: list[str] = []
+    position = 0
+    for result, replacement in _replacements(text, results, generator, mapping, seen):
+        parts.append(text[position : result.start])
+        parts.append(replacement)
+        position = result.end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def replacement_spans(
+    text: str,
+    results: list[RecognizerResult],
+    generator: FakeGenerator,
+    mapping: list[dict],
+    seen: set[tuple[str, str]],
+) -> list[dict]:
+    """Like ``apply_replacements``, but return the edits instead of the text.
+
+    Each edit is ``{"offset", "length", "replacement", "entity_type"}``,
+    ordered by offset, with offsets and lengths in UTF-16 code units so a
+    JavaScript client can apply them to the original string directly.
+    """
+    to_utf16 = _utf16_offsets(text)
+    return [
+        {
+            "offset": to_utf16(result.start),
+            "length": to_utf16(result.end) - to_utf16(result.start),
+            "replacement": replacement,
+            "entity_type": result.entity_type,
+        }
+        for result, replacement in _replacements(text, results, generator, mapping, seen)
+    ]
+
+
+def _replacements(
+    text: str,
+    results: list[RecognizerResult],
+    generator: FakeGenerator,
+    mapping: list[dict],
+    seen: set[tuple[str, str]],
+) -> Iterator[tuple[RecognizerResult, str]]:
+    """Yield ``(result, replacement)`` by start, recording new mapping entries."""
+    for result in sorted(results, key=lambda r: r.start):
+        original = text[result.start : result.end]
+        replacement = generator.replacement_for(result.entity_type, original)
+        key = (result.entity_type, original)
+        if key not in seen:
+            seen.add(key)
+            mapping.append(
+                {
+                    "original": original,
+                    "replacement": replacement,
+                    "entity_type": result.entity_type,
+                }
+            )
+        yield result, replacement
+
+
+def _utf16_offsets(text: str) -> Callable[[int], int]:
+    """Return a converter from code point offsets in *text* to UTF-16 ones."""
+    if not text or max(text) <= "\uffff":
+        return lambda offset: offset
+    # Characters outside the BMP take two UTF-16 code units.
+    astral = [match.start() for match in _ASTRAL.finditer(text)]
+    return lambda offset: offset + bisect_left(astral, offset)
+
+
+def count_entities(results: list[RecognizerResult]) -> list[dict]:
+    """Aggregate detections into ``[{"type": ..., "count": ...}, ...]``."""
+    counter: Counter[str] = Counter(r.entity_type for r in results)
+    return [
+        {"type": entity_type, "count": count}
+        for entity_type, count in counter.most_common()
+    ]
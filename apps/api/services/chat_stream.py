@@ -0,0 +1,120 @@
+"""
+Streaming chat completions from OpenRouter as SSE events.
+
+Both chat endpoints stream the same way: POST the messages with
+``stream: true``, read the ``data:`` lines, and forward each content delta
+as a ``token`` event (or an ``error`` event if OpenRouter or the network
+fails).  ``ChatStream`` does that once for both; an endpoint that has to
+rewrite the tokens on their way out (``/api/chat/anonymized`` reverses its
+replacements) passes a ``transform`` hook and a ``flush`` hook for
+whatever the transform still holds back at the end.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import AsyncIterator, Callable, Optional
+
+import httpx
+
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+
+def message_event(payload: dict) -> dict:
+    """Wrap *payload* as an SSE ``message`` event."""
+    return {"event": "message", "data": json.dumps(payload)}
+
+
+class ChatStream:
+    """One streamed completion.
+
+    Iterate ``events()`` and forward them.  Afterwards ``completed`` tells
+    whether the stream ended normally (an ``error`` event was sent
+    otherwise) and ``prompt_tokens`` / ``completion_tokens`` hold the usage
+    OpenRouter reported.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        messages: list[dict],
+        transform: Optional[Callable[[str], str]] = None,
+        flush: Optional[Callable[[], str]] = None,
+    ) -> None:
+        self.model = model
+        self.messages = messages
+        self._transform = transform
+        self._flush = flush
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.completed = False
+
+    async def events(self) -> AsyncIterator[dict]:
+        """Yield ``token`` events, or an ``error`` event on failure."""
+        try:
+            async with httpx.AsyncClient(timeout=120.0) as client:
+                async with client.stream(
+                    "POST",
+                    OPENROUTER_CHAT_URL,
+                    headers={
+                        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+                        "Content-Type": "application/json",
+                        "HTTP-Referer": "https://burnchat.ai",
+                        "X-Title": "BurnChat",
+                    },
+                    json={
+                        "model": self.model,
+                        "messages": self.messages,
+                        "stream": True,
+                    },
+                ) as response:
+                    if response.status_code != 200:
+                        body = await response.aread()
+                        error_detail = body.decode("utf-8", errors="replace")
+                        yield message_event({
+                            "type": "error",
+                            "content": f"OpenRouter error ({response.status_code}): {error_detail}",
+                        })
+                        return
+
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data: "):
+                            continue
+
+                        data_str = line[6:]
+                        if data_str.strip() == "[DONE]":
+                            break
+
+                        try:
+                            data = json.loads(data_str)
+                        except json.JSONDecodeError:
+                            continue
+
+                        # Extract usage if present in the chunk
+                        if "usage" in data:
+                            self.prompt_tokens = data["usage"].get("prompt_tokens", 0)
+                            self.completion_tokens = data["usage"].get("completion_tokens", 0)
+
+                        choices = data.get("choices", [])
+                        if not choices:
+                            continue
+
+                        content = choices[0].get("delta", {}).get("content", "")
+                        if content and self._transform is not None:
+                            content = self._transform(content)
+                        if content:
+                            yield message_event({"type": "token", "content": content})
+
+        except httpx.HTTPError as exc:
+            yield message_event({
+                "type": "error",
+                "content": f"Stream error: {exc}",
+            })
+            return
+
+        tail = self._flush() if self._flush is not None else ""
+        if tail:
+            yield message_event({"type": "token", "content": tail})
+        self.completed = True
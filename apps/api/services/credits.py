@@ -0,0 +1,55 @@
+"""Credit accounting for chat completions.
+
+Shared by the chat endpoints: after a completion has streamed, its token
+usage is priced with ``model_selection.cost_calculator`` and deducted from
+the user's balance.
+"""
+
+
+async def deduct_chat_credits(user_id: str, prompt_tokens: int, completion_tokens: int, model: str = "openai/gpt-4o-mini") -> dict:
+    """Calculate token usage cost using model pricing with 1.5x margin and deduct credits.
+
+    Returns a dict with usage information.
+    """
+    from database import get_supabase
+    from services.model_selection.cost_calculator import estimate_credits
+
+    total_tokens = prompt_tokens + completion_tokens
+    credits_used = estimate_credits(model, prompt_tokens, completion_tokens)
+
+    db = get_supabase()
+
+    # Get current balance
+    response = (
+        db.table("users")
+        .select("credit_balance")
+        .eq("id", user_id)
+        .single()
+        .execute()
+    )
+
+    if not response.data:
+        return {"credits_used": credits_used, "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens, "total_tokens": total_tokens}
+
+    new_balance = max(0, response.data["credit_balance"] - credits_used)
+
+    # Update balance
+    db.table("users").update({"credit_balance": new_balance}).eq("id", user_id).execute()
+
+    # Record transaction
+    db.table("credit_transactions").insert({
+        "user_id": user_id,
+        "type": "chat",
+        "amount": -credits_used,
+        "description": f"Chat completion: {total_tokens} tokens",
+        "balance_after": new_balance,
+    }).execute()
+
+    return {
+        "credits_used": credits_used,
+        "credit_balance": new_balance,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": total_tokens,
+    }
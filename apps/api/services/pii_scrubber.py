@@ -2,25 +2,48 @@
 Server-side PII scrubber — second pass safety net using Presidio.
 Browser strips ~95% of PII with small GLiNER + regex.
 This catches anything exotic the browser missed.
+
+Chat history is resent in full every turn, so scrubbed messages are cached
+by a keyed hash of their content: each turn only analyzes the messages it
+has not seen before, and analyzes them together in one batched pass.
 """
 
+import hashlib
 import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-_analyzer = None
+CACHE_ENTRIES = int(os.getenv("PII_SCRUB_CACHE_ENTRIES", "5000"))
+SCORE_THRESHOLD = 0.5
+
 _anonymizer = None
 
+# Keyed content hash -> scrubbed text (LRU).  The key is random per process,
+# so cache keys cannot be matched against guessed messages offline.
+_cache: "OrderedDict[bytes, str]" = OrderedDict()
+_cache_key = os.urandom(32)
+_cache_lock = threading.Lock()
+
 
 def _get_analyzer():
-    global _analyzer
-    if _analyzer is not None:
-        return _analyzer
+    """Use the process-wide analyzer shared with the anonymization engine,
+    so the scrubber does not load a second copy of the spaCy model."""
+    try:
+        from services.anonymization.analyzer import get_analyzer
+        return get_analyzer()
+    except Exception as e:
+        logger.error(f"[PII Scrubber] Failed to load analyzer: {e}")
+        return None
+
+
+def _get_batch_analyzer():
     try:
-        from presidio_analyzer import AnalyzerEngine
-        _analyzer = AnalyzerEngine()
-        logger.info("[PII Scrubber] Presidio analyzer loaded")
-        return _analyzer
+        from services.anonymization.analyzer import get_batch_analyzer
+        return get_batch_analyzer()
     except Exception as e:
         logger.error(f"[PII Scrubber] Failed to load analyzer: {e}")
         return None
@@ -52,7 +75,7 @@ def scrub_text(text: str) -> str:
         return text
 
     try:
-        results = analyzer.analyze(text=text, language="en", score_threshold=0.5)
+        results = analyzer.analyze(text=text, language="en", score_threshold=SCORE_THRESHOLD)
         if not results:
             return text
 
@@ -65,8 +88,129 @@ def scrub_text(text: str) -> str:
         return text
 
 
+def scrub_texts(texts: list[str]) -> Optional[list[str]]:
+    """Scrub several texts with one batched analyzer pass (``nlp.pipe``).
+
+    Returns ``None`` instead of passing the texts through when scrubbing
+    is not possible, so callers do not cache unscrubbed text as scrubbed.
+    """
+    analyzer = _get_batch_analyzer()
+    anonymizer = _get_anonymizer()
+
+    if not analyzer or not anonymizer:
+        logger.warning("[PII Scrubber] Engines not available, passing through")
+        return None
+
+    try:
+        analyzed = analyzer.analyze_iterator(
+            texts=texts, language="en", score_threshold=SCORE_THRESHOLD
+        )
+        scrubbed = []
+        found = 0
+        for text, results in zip(texts, analyzed):
+            found += len(results)
+            if results:
+                text = anonymizer.anonymize(text=text, analyzer_results=results).text
+            scrubbed.append(text)
+        logger.info(f"[PII Scrubber] Found {found} items in {len(texts)} texts")
+        return scrubbed
+    except Exception as e:
+        logger.error(f"[PII Scrubber] Scrub failed: {e}")
+        return None
+
+
+class ScrubError(RuntimeError):
+    """Raised when the anonymization pool cannot scrub the new messages."""
+
+
 def scrub_messages(messages: list[dict]) -> list[dict]:
-    scrubbed = []
-    for msg in messages:
-        scrubbed.append({**msg, "content": scrub_text(msg.get("content", ""))})
-    return scrubbed
+    contents = [msg.get("content", "") for msg in messages]
+    new, cached = _lookup(contents)
+    fresh = _scrubbed(new, scrub_texts(new) if new else None)
+    return _apply(messages, contents, {**cached, **fresh})
+
+
+async def scrub_messages_pooled(messages: list[dict]) -> list[dict]:
+    """``scrub_messages`` with the analysis run on the anonymization pool.
+
+    The cache stays in this process; only messages it has not seen go to a
+    pool worker, in one call.  If the pool is saturated, times out or
+    crashes, ``ScrubError`` is raised instead of sending the new messages
+    unscrubbed.
+    """
+    from services.anonymization.pool import (
+        AnonymizationTimeoutError,
+        PoolCrashedError,
+        PoolSaturatedError,
+        run_scrub_texts,
+    )
+
+    contents = [msg.get("content", "") for msg in messages]
+    new, cached = _lookup(contents)
+    scrubbed = None
+    if new:
+        try:
+            scrubbed = await run_scrub_texts(new)
+        except (PoolSaturatedError, PoolCrashedError, AnonymizationTimeoutError) as e:
+            logger.warning(f"[PII Scrubber] Pool unavailable: {e}")
+            raise ScrubError("PII scrubbing is temporarily unavailable") from e
+    return _apply(messages, contents, {**cached, **_scrubbed(new, scrubbed)})
+
+
+# --- Cache helpers ---
+
+def _key(text: str) -> bytes:
+    return hashlib.blake2b(
+        text.encode("utf-8", errors="surrogatepass"), key=_cache_key, digest_size=32
+    ).digest()
+
+
+def _lookup(contents: list[str]) -> tuple[list[str], dict[str, str]]:
+    """Split the distinct non-blank contents into new and cached ones.
+
+    Returns the texts not cached yet and the scrubbed versions of the rest,
+    read now: the entries may be evicted by another request before the new
+    texts come back from the analyzer.
+    """
+    new: dict[str, None] = {}
+    cached: dict[str, str] = {}
+    with _cache_lock:
+        for text in contents:
+            if not text or not text.strip() or text in new or text in cached:
+                continue
+            key = _key(text)
+            if key in _cache:
+                _cache.move_to_end(key)
+                cached[text] = _cache[key]
+            else:
+                new[text] = None
+    return list(new), cached
+
+
+def _scrubbed(new: list[str], scrubbed: Optional[list[str]]) -> dict[str, str]:
+    """Map each new text to its scrubbed version and cache successful results.
+
+    Texts that could not be scrubbed map to themselves and are not cached,
+    so the next turn retries them.
+    """
+    if scrubbed is None:
+        return {text: text for text in new}
+    fresh = dict(zip(new, scrubbed))
+    if CACHE_ENTRIES <= 0:
+        return fresh
+    with _cache_lock:
+        for text, result in fresh.items():
+            _cache[_key(text)] = result
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return fresh
+
+
+def _apply(messages: list[dict], contents: list[str], scrubbed: dict[str, str]) -> list[dict]:
+    """Swap each message's content for its scrubbed version."""
+    result = []
+    for msg, text in zip(messages, contents):
+        if text and text.strip():
+            text = scrubbed[text]
+        result.append({**msg, "content": text})
+    return result
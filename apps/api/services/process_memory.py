@@ -0,0 +1,50 @@
+"""Per-process memory accounting.
+
+Reports how much of a process's resident memory is shared with other
+processes (e.g. copy-on-write pages inherited from a preloading gunicorn
+master) versus private to it.  Uses ``/proc/<pid>/smaps_rollup`` on Linux
+and falls back to the peak RSS from ``getrusage`` elsewhere.
+"""
+
+import os
+import resource
+import sys
+from typing import Optional
+
+# smaps_rollup field -> key in the returned dict.  All values are in kB.
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private",
+}
+
+
+def memory_usage(pid: Optional[int] = None) -> dict:
+    """Return memory figures in MiB for *pid* (default: this process).
+
+    ``rss`` is resident memory, ``pss`` the proportional share (shared
+    pages divided by the number of processes mapping them), ``shared`` and
+    ``private`` the split of ``rss``.  Only ``rss`` is available on
+    platforms without ``smaps_rollup``, and then only for this process.
+    """
+    pid = pid or os.getpid()
+    totals = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                field, _, value = line.partition(":")
+                key = _SMAPS_FIELDS.get(field)
+                if key:
+                    totals[key] += int(value.split()[0])
+    except OSError:
+        if pid != os.getpid():
+            return {"pid": pid}
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kB elsewhere.
+        rss_kb = peak // 1024 if sys.platform == "darwin" else peak
+        return {"pid": pid, "rss_mb": round(rss_kb / 1024, 1)}
+
+    return {"pid": pid, **{f"{k}_mb": round(v / 1024, 1) for k, v in totals.items()}}
@@ -1,19 +1,215 @@
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from operator import itemgetter
+
 import tiktoken
 
+ENCODING_NAME = "cl100k_base"
+
+# Preferred chunk edges, strongest first: a blank line, then the end of a
+# sentence (terminal punctuation and closing quotes/brackets, before the
+# whitespace that starts the next one).
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s)")
+
+
+@lru_cache(maxsize=None)
+def _encoding() -> tiktoken.Encoding:
+    """Resolve the tokenizer once per process."""
+    return tiktoken.get_encoding(ENCODING_NAME)
+
+
+def chunk_document(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[dict]:
+    """Split text into overlapping chunks of up to ``chunk_size`` tokens.
+
+    The text is tokenized once.  Each chunk ends on the last paragraph
+    break, else the last sentence end, in the second half of its token
+    window, and the next chunk starts on the first sentence start inside
+    the ``overlap`` tokens before that; where there is none, the window is
+    cut at the token limit (moved by a token or two if that would split a
+    multi-byte character).  Chunk text is sliced from ``text`` rather than
+    decoded from tokens.
+
+    Args:
+        text: The text to split.
+        chunk_size: Maximum tokens per chunk.
+        overlap: Tokens shared by consecutive chunks.
+
+    Returns:
+        A list of dicts with ``text``, ``token_count`` and the ``start`` /
+        ``end`` character offsets of the chunk in ``text``.
+    """
+    return _split(text, chunk_size, overlap, final=True)[0]
+
+
+class StreamingChunker:
+    """``chunk_document`` over text that arrives in pieces.
+
+    ``feed`` returns the chunks that can no longer change and keeps the
+    text from the next chunk's start on; ``flush`` chunks what is left.
+    Only that tail is tokenized again, so the work stays linear in the
+    text as long as pieces are not tiny.  Offsets are relative to the
+    concatenation of all pieces.
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200) -> None:
+        self._chunk_size = chunk_size
+        self._overlap = overlap
+        self._buffer = ""
+        self._offset = 0
+
+    def feed(self, text: str) -> list[dict]:
+        """Add *text* and return the chunks that are now final."""
+        self._buffer += text
+        return self._emit(final=False)
+
+    def flush(self) -> list[dict]:
+        """Return the remaining chunks (call once, after the last piece)."""
+        return self._emit(final=True)
+
+    def _emit(self, final: bool) -> list[dict]:
+        chunks, rest = _split(self._buffer, self._chunk_size, self._overlap, final)
+        for chunk in chunks:
+            chunk["start"] += self._offset
+            chunk["end"] += self._offset
+        self._buffer = self._buffer[rest:]
+        self._offset += rest
+        return chunks
+
 
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
-    enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
+    return [chunk["text"] for chunk in chunk_document(text, chunk_size, overlap)]
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoding().encode_ordinary(text))
+
+
+class _TokenWidths(dict):
+    """Token id -> (characters it starts, whether it begins mid-character).
+
+    Filled lazily; a document uses a few thousand distinct tokens, so
+    after warm-up this replaces decoding every token with a dict lookup.
+    """
+
+    def __init__(self, enc: tiktoken.Encoding) -> None:
+        super().__init__()
+        self._enc = enc
+
+    def __missing__(self, token: int) -> tuple[int, bool]:
+        data = self._enc.decode_single_token_bytes(token)
+        # A character is counted in the token holding its first byte.
+        width = sum(1 for byte in data if not 0x80 <= byte < 0xC0)
+        self[token] = value = (width, 0x80 <= data[0] < 0xC0)
+        return value
+
+
+@lru_cache(maxsize=None)
+def _token_widths() -> _TokenWidths:
+    return _TokenWidths(_encoding())
+
+
+def _split(
+    text: str, chunk_size: int, overlap: int, final: bool
+) -> tuple[list[dict], int]:
+    """Chunk *text*; return the chunks and where the unchunked rest starts.
+
+    Unless *final*, the text is assumed to continue: chunking stops before
+    the first chunk whose token window reaches the last token, which could
+    still merge with what follows.
+    """
+    tokens = _encoding().encode_ordinary(text)
+    if not tokens:
+        return [], len(text) if final else 0
+    offsets = _token_offsets(tokens, text.isascii())
+    total = len(tokens)
+    offsets.append(len(text))  # so offsets[total] is the end of the text
+
     chunks = []
     start = 0
-    while start < len(tokens):
-        end = start + chunk_size
-        chunk_tokens = tokens[start:end]
-        chunks.append(enc.decode(chunk_tokens))
-        start = end - overlap
-    return chunks
+    while True:
+        if not final and start + chunk_size >= total - 1:
+            return chunks, offsets[start]
+        end = min(start + chunk_size, total)
+        if end < total:
+            end = _snap_end(text, offsets, start + max(1, chunk_size // 2), end)
+            end = _char_boundary(offsets, end, start + 1, total)
+        chunks.append(
+            {
+                "text": text[offsets[start] : offsets[end]],
+                "token_count": end - start,
+                "start": offsets[start],
+                "end": offsets[end],
+            }
+        )
+        if end >= total:
+            return chunks, len(text)
+        next_start = max(start + 1, end - overlap)
+        if next_start < end:
+            next_start = _snap_start(text, offsets, next_start, end)
+        start = _char_boundary(offsets, next_start, next_start, end)
 
 
-def count_tokens(text: str) -> int:
-    enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
+def _token_offsets(tokens: list[int], text_is_ascii: bool = False) -> list[int]:
+    """Return the character offset at which each token starts.
+
+    Same result as ``Encoding.decode_with_offsets`` without decoding the
+    text again.
+    """
+    widths = _token_widths()
+    if text_is_ascii:
+        lengths = map(itemgetter(0), map(widths.__getitem__, tokens[:-1]))
+        return list(accumulate(lengths, initial=0))
+    offsets = []
+    position = 0
+    for token in tokens:
+        width, continues = widths[token]
+        offsets.append(max(0, position - continues))
+        position += width
+    return offsets
+
+
+def _char_boundary(offsets: list[int], index: int, lo: int, hi: int) -> int:
+    """Move a cut at token *index* off the inside of a multi-byte character.
+
+    Tokens can split a character's UTF-8 bytes; a cut between such tokens
+    would give an empty or repeated slice.  Moves back (not below *lo*)
+    to the nearest token that starts a new character, else forward (not
+    past *hi*).
+    """
+    for step, limit in ((-1, lo), (1, hi)):
+        candidate = index
+        while candidate != limit and offsets[candidate] == offsets[candidate - 1]:
+            candidate += step
+        if offsets[candidate] != offsets[candidate - 1] or candidate == hi:
+            return candidate
+    return index
+
+
+def _snap_end(text: str, offsets: list[int], lo: int, hi: int) -> int:
+    """Return the token index in ``(lo, hi]`` to end a chunk on.
+
+    The last paragraph break in that range wins, then the last sentence
+    end; otherwise ``hi``.
+    """
+    for pattern in (_PARAGRAPH_BREAK, _SENTENCE_END):
+        last = None
+        for match in pattern.finditer(text, offsets[lo], offsets[hi]):
+            last = match
+        if last is not None:
+            index = bisect_left(offsets, last.end(), lo, hi)
+            if index > lo:
+                return index
+    return hi
+
+
+def _snap_start(text: str, offsets: list[int], lo: int, hi: int) -> int:
+    """Return the first token in ``[lo, hi)`` that starts a sentence, else ``lo``."""
+    match = _SENTENCE_END.search(text, offsets[lo], offsets[hi])
+    if match:
+        index = bisect_left(offsets, match.end(), lo, hi)
+        if index < hi:
+            return index
+    return lo
@@ -1,33 +1,215 @@
+from abc import ABC, abstractmethod
+import asyncio
+import logging
 import os
+import random
 
 import httpx
 from dotenv import load_dotenv
 
+from services.rag.chunker import count_tokens
+from services.rag.embedding_cache import get_cache
+
 _env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".env")
 load_dotenv(_env_path, override=True)
 
+logger = logging.getLogger(__name__)
+
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_EMBEDDINGS_URL = "https://openrouter.ai/api/v1/embeddings"
-EMBEDDING_MODEL = "openai/text-embedding-3-small"
+
+EMBEDDING_DIMENSIONS = 1536  # width of the pgvector columns
+# Backend -> default model: an OpenRouter model id, or for ``onnx`` a
+# directory with an exported model (see ``local_embedders``).  ``hashing``
+# has no model and is meant for tests and offline benchmarks.
+EMBEDDING_BACKENDS: dict[str, str] = {
+    "openrouter": "openai/text-embedding-3-small",
+    "onnx": "models/all-MiniLM-L6-v2",
+    "hashing": "",
+}
+DEFAULT_EMBEDDING_BACKEND = "openrouter"
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", DEFAULT_EMBEDDING_BACKEND)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or None
+
 BATCH_SIZE = 100
+# A batch is closed at BATCH_SIZE texts or BATCH_TOKENS tokens, whichever
+# comes first; up to CONCURRENCY batches are in flight at once.
+BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))
+CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 20.0
+
+_RETRY_STATUS = {408, 429}
+
+
+class EmbeddingBackend(ABC):
+    """Turns texts into vectors ``EMBEDDING_DIMENSIONS`` floats wide.
+
+    ``name`` identifies the backend and model.  Vectors from different
+    names are not comparable, so the cache is keyed by it and switching
+    backends means re-ingesting documents.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def embed(
+        self, texts: list[str], token_counts: list[int] | None
+    ) -> list[list[float]]:
+        """Return one vector per text, in order."""
 
 
-async def embed_texts(texts: list[str]) -> list[list[float]]:
-    """Embed a list of texts using OpenRouter's embedding API.
+class OpenRouterBackend(EmbeddingBackend):
+    """OpenRouter's embedding API.
 
-    Texts are batched in groups of 100 to stay within API limits.
+    Texts are packed in order into batches of at most ``BATCH_SIZE`` texts
+    and ``BATCH_TOKENS`` tokens (counted here unless given), and up to
+    ``CONCURRENCY`` batches are sent at once.  A batch that fails with a
+    rate limit, a server error or a network error is retried with jittered
+    exponential backoff; if it still fails, the other batches are
+    cancelled and the error is raised.
+    """
+
+    def __init__(self, model: str) -> None:
+        self.name = self.model = model
+
+    async def embed(
+        self, texts: list[str], token_counts: list[int] | None
+    ) -> list[list[float]]:
+        if token_counts is None:
+            token_counts = [count_tokens(text) for text in texts]
+
+        limit = asyncio.Semaphore(max(1, CONCURRENCY))
+        async with httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=max(1, CONCURRENCY)),
+        ) as client:
+
+            async def embed(batch: list[str]) -> list[list[float]]:
+                async with limit:
+                    return await _embed_batch(client, self.model, batch)
+
+            tasks = [
+                asyncio.ensure_future(embed(texts[start:end]))
+                for start, end in _pack(token_counts)
+            ]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        return [embedding for batch in results for embedding in batch]
+
+
+class LocalBackend(EmbeddingBackend):
+    """A ``local_embedders`` model, run in a thread and zero-padded.
+
+    Zero padding changes neither cosine distances nor inner products, so
+    narrower models fit the fixed-width vector column as they are.
+    """
+
+    def __init__(self, name: str, model) -> None:
+        if model.dimensions > EMBEDDING_DIMENSIONS:
+            raise ValueError(
+                f"Embedding model '{name}' has {model.dimensions} dimensions; "
+                f"the vector column holds {EMBEDDING_DIMENSIONS}"
+            )
+        self.name = name
+        self._model = model
+        self._padding = [0.0] * (EMBEDDING_DIMENSIONS - model.dimensions)
+
+    async def embed(
+        self, texts: list[str], token_counts: list[int] | None
+    ) -> list[list[float]]:
+        vectors = await asyncio.to_thread(self._model.embed, texts)
+        return [vector + self._padding for vector in vectors]
+
+
+_backend: EmbeddingBackend | None = None
+
+
+def create_backend(backend: str, model: str | None = None) -> EmbeddingBackend:
+    """Return the embedding backend *backend*.
+
+    *model* replaces the backend's default model.  Raises ``ValueError``
+    for unknown backends.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend '{backend}'. "
+            f"Available backends: {', '.join(sorted(EMBEDDING_BACKENDS))}"
+        )
+    model = model or EMBEDDING_BACKENDS[backend]
+    if backend == "openrouter":
+        return OpenRouterBackend(model)
+
+    from services.rag import local_embedders
+
+    if backend == "onnx":
+        return LocalBackend(f"onnx:{model}", local_embedders.OnnxEmbedder(model))
+    return LocalBackend(
+        f"hashing:{EMBEDDING_DIMENSIONS}",
+        local_embedders.HashingEmbedder(EMBEDDING_DIMENSIONS),
+    )
+
+
+def get_backend() -> EmbeddingBackend:
+    """Return the configured backend, loading its model on first use."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend(EMBEDDING_BACKEND, EMBEDDING_MODEL)
+    return _backend
+
+
+async def embed_texts(
+    texts: list[str], token_counts: list[int] | None = None
+) -> list[list[float]]:
+    """Embed a list of texts with the configured backend.
+
+    Texts embedded before are served from ``embedding_cache``; only the
+    rest are passed to the backend, each once.
 
     Args:
         texts: The texts to embed.
+        token_counts: Tokens per text, if already known (e.g. from the
+            chunker).
 
     Returns:
-        A list of embedding vectors, one per input text.
+        A list of embedding vectors, one per input text, in input order.
     """
-    all_embeddings: list[list[float]] = []
+    if not texts:
+        return []
+    backend = get_backend()
+    return await get_cache().embed(backend.name, texts, token_counts, backend.embed)
+
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for i in range(0, len(texts), BATCH_SIZE):
-            batch = texts[i : i + BATCH_SIZE]
+def _pack(token_counts: list[int]) -> list[tuple[int, int]]:
+    """Return ``(start, end)`` index ranges of consecutive texts per batch."""
+    batches = []
+    start = tokens = 0
+    for index, count in enumerate(token_counts):
+        if index > start and (
+            index - start >= BATCH_SIZE or tokens + count > BATCH_TOKENS
+        ):
+            batches.append((start, index))
+            start, tokens = index, 0
+        tokens += count
+    batches.append((start, len(token_counts)))
+    return batches
+
+
+async def _embed_batch(
+    client: httpx.AsyncClient, model: str, batch: list[str]
+) -> list[list[float]]:
+    """POST one batch, retrying transient failures."""
+    attempt = 0
+    while True:
+        try:
             response = await client.post(
                 OPENROUTER_EMBEDDINGS_URL,
                 headers={
@@ -35,16 +217,41 @@ async def embed_texts(texts: list[str]) -> list[list[float]]:
                     "Content-Type": "application/json",
                 },
                 json={
-                    "model": EMBEDDING_MODEL,
+                    "model": model,
                     "input": batch,
                 },
             )
-            response.raise_for_status()
-            data = response.json()
+        except httpx.TransportError as exc:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+            logger.warning("[Embedder] %s, retrying in %.1fs", type(exc).__name__, delay)
+        else:
+            if response.status_code not in _RETRY_STATUS and response.status_code < 500:
+                response.raise_for_status()
+                data = response.json()
+                # OpenRouter returns embeddings sorted by index, but sort
+                # explicitly to be safe.
+                sorted_embeddings = sorted(data["data"], key=lambda x: x["index"])
+                return [item["embedding"] for item in sorted_embeddings]
+            if attempt == MAX_RETRIES:
+                response.raise_for_status()
+            delay = _retry_after(response) or _backoff(attempt)
+            logger.warning(
+                "[Embedder] HTTP %d, retrying in %.1fs", response.status_code, delay
+            )
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in ``[0, base * 2**attempt]``."""
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**attempt))
 
-            # OpenRouter returns embeddings sorted by index, but sort
-            # explicitly to be safe.
-            sorted_embeddings = sorted(data["data"], key=lambda x: x["index"])
-            all_embeddings.extend([item["embedding"] for item in sorted_embeddings])
 
-    return all_embeddings
+def _retry_after(response: httpx.Response) -> float | None:
+    """Seconds from a numeric ``Retry-After`` header, capped."""
+    try:
+        return min(RETRY_MAX_SECONDS, max(0.0, float(response.headers["retry-after"])))
+    except (KeyError, ValueError):
+        return None
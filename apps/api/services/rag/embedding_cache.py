@@ -0,0 +1,280 @@
+"""
+Content-addressed cache of embedding vectors.
+
+Re-uploaded documents, shared boilerplate chunks and repeated questions
+are embedded with the same model over and over.  This cache sits in front
+of the embedding API and maps ``sha256(model, text)`` to the vector, so a
+repeat costs a dict lookup instead of a network round trip.
+
+* memory -- an LRU of up to ``EMBEDDING_CACHE_ENTRIES`` vectors per
+  process, stored as float32 (what pgvector keeps anyway).
+* disk -- optional.  With ``EMBEDDING_CACHE_PATH`` set, vectors missing
+  from memory are looked up in (and written to) a SQLite file there,
+  which survives restarts and is shared by the workers on one host.
+  Only the hash and the vector are stored, never the text; but vectors
+  of known text can be recomputed, so point it at storage with the same
+  retention rules as the chunk table.
+* single flight -- concurrent requests for a text that is already being
+  embedded wait for that request instead of sending their own.
+
+If embedding fails, the waiting requests get the same error and nothing
+is cached.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_ENTRIES", "5000"))
+DISK_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+MAX_DISK_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "1000000"))
+# How many disk writes between checks of the disk entry limit.
+_PRUNE_EVERY = 1000
+
+Fetch = Callable[[list[str], Optional[list[int]]], Awaitable[list[list[float]]]]
+
+
+class _DiskTier:
+    """SQLite table of ``key -> float32 vector`` (thread-safe).
+
+    The oldest writes are dropped once the table holds more than
+    ``max_entries`` rows.
+    """
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, array]:
+        found: dict[bytes, array] = {}
+        with self._lock:
+            # Stay under SQLite's limit on bound parameters.
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                )
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector
+        return found
+
+    def put_many(self, items: list[tuple[bytes, array]]) -> None:
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._writes += len(items)
+            if self._writes >= _PRUNE_EVERY:
+                self._writes = 0
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE rowid <= (SELECT MAX(rowid) FROM embeddings) - ?",
+                    (self.max_entries,),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class EmbeddingCache:
+    """Memory LRU, optional disk tier and single-flight for embeddings."""
+
+    def __init__(
+        self,
+        max_entries: int = MAX_ENTRIES,
+        disk_path: str = DISK_PATH,
+        max_disk_entries: int = MAX_DISK_ENTRIES,
+    ) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, array] = OrderedDict()
+        self._inflight: dict[bytes, asyncio.Future] = {}
+        self._disk: Optional[_DiskTier] = None
+        if disk_path:
+            try:
+                self._disk = _DiskTier(disk_path, max_disk_entries)
+            except sqlite3.Error as e:
+                logger.error(f"[Embedding Cache] Disk tier disabled: {e}")
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        """Return the cache key for *text* embedded with *model*."""
+        digest = hashlib.sha256(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8", errors="surrogatepass"))
+        return digest.digest()
+
+    async def embed(
+        self,
+        model: str,
+        texts: list[str],
+        token_counts: Optional[list[int]],
+        fetch: Fetch,
+    ) -> list[list[float]]:
+        """Return embeddings for *texts*, calling *fetch* only for misses.
+
+        *fetch* takes the missing texts (each once) and their token counts
+        and returns their embeddings in order.
+        """
+        keys = [self.key(model, text) for text in texts]
+        vectors: dict[bytes, array] = {}
+        waiting: dict[bytes, tuple[asyncio.Future, int]] = {}
+        owned: dict[bytes, int] = {}  # key -> index of its first text
+        for index, key in enumerate(keys):
+            if key in vectors or key in waiting or key in owned:
+                continue
+            vector = self._get(key)
+            if vector is not None:
+                vectors[key] = vector
+            elif key in self._inflight:
+                waiting[key] = (self._inflight[key], index)
+            else:
+                owned[key] = index
+        if owned:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in owned}
+            self._inflight.update(futures)
+            error: Optional[BaseException] = None
+            try:
+                vectors.update(await self._load(model, owned, texts, token_counts, fetch))
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                # Settle every future, whatever happened, so no waiter hangs.
+                for key, future in futures.items():
+                    self._inflight.pop(key, None)
+                    if key in vectors:
+                        future.set_result(vectors[key])
+                    elif isinstance(error, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(
+                            error or RuntimeError("Embedding finished without a vector")
+                        )
+                        future.exception()  # retrieved here if nobody waits
+        for key, (future, index) in waiting.items():
+            try:
+                vectors[key] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The request we waited for was cancelled; embed it ourselves.
+                counts = [token_counts[index]] if token_counts else None
+                embedding = await self.embed(model, [texts[index]], counts, fetch)
+                vectors[key] = array("f", embedding[0])
+        return [vectors[key].tolist() for key in keys]
+
+    async def _load(
+        self,
+        model: str,
+        owned: dict[bytes, int],
+        texts: list[str],
+        token_counts: Optional[list[int]],
+        fetch: Fetch,
+    ) -> dict[bytes, array]:
+        """Read *owned* keys from disk, else fetch them, and cache them."""
+        found: dict[bytes, array] = {}
+        if self._disk is not None:
+            try:
+                found = await asyncio.to_thread(self._disk.get_many, list(owned))
+            except sqlite3.Error as e:
+                logger.warning(f"[Embedding Cache] Disk read failed: {e}")
+            self.disk_hits += len(found)
+            for key, vector in found.items():
+                self._put(key, vector)
+
+        missing = [(key, index) for key, index in owned.items() if key not in found]
+        self.misses += len(missing)
+        if missing:
+            embeddings = await fetch(
+                [texts[index] for _, index in missing],
+                [token_counts[index] for _, index in missing] if token_counts else None,
+            )
+            if len(embeddings) != len(missing):
+                raise ValueError(
+                    f"Embedding backend returned {len(embeddings)} vectors "
+                    f"for {len(missing)} texts"
+                )
+            fetched = [
+                (key, array("f", embedding))
+                for (key, _), embedding in zip(missing, embeddings)
+            ]
+            for key, vector in fetched:
+                self._put(key, vector)
+                found[key] = vector
+            if self._disk is not None:
+                try:
+                    await asyncio.to_thread(self._disk.put_many, fetched)
+                except sqlite3.Error as e:
+                    logger.warning(f"[Embedding Cache] Disk write failed: {e}")
+        return found
+
+    def _get(self, key: bytes) -> Optional[array]:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return vector
+
+    def _put(self, key: bytes, vector: array) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return size and hit-rate counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk": self._disk is not None,
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,98 @@
+"""
+Embedding models that run in-process on the CPU.
+
+``OnnxEmbedder`` runs a sentence-transformer exported to ONNX; it needs
+the optional ``onnxruntime`` and ``tokenizers`` packages.
+``HashingEmbedder`` needs nothing: it hashes words into a fixed number of
+signed buckets, which is enough for tests and for benchmarking the ingest
+pipeline without a model or the network, but not for real retrieval.
+
+Both are synchronous and return L2-normalized vectors; ``embedder`` runs
+them off the event loop and pads them to the width of the vector column.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+from functools import lru_cache
+
+_WORD = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Signed feature hashing of lower-cased words."""
+
+    def __init__(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._vector(text) for text in texts]
+
+    def _vector(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for word in _WORD.findall(text.lower()):
+            index, sign = _bucket(word, self.dimensions)
+            vector[index] += sign
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+
+@lru_cache(maxsize=65536)
+def _bucket(word: str, dimensions: int) -> tuple[int, float]:
+    # blake2b rather than hash(), which is salted per process.
+    h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % dimensions, 1.0 if h >> 63 else -1.0
+
+
+class OnnxEmbedder:
+    """Mean-pooled sentence-transformer running on ONNX Runtime.
+
+    *path* is a directory holding ``model.onnx`` and ``tokenizer.json``, as
+    written by ``optimum-cli export onnx --model
+    sentence-transformers/all-MiniLM-L6-v2 DIR``.  Texts are truncated to
+    *max_tokens* and run ``batch_size`` at a time.
+    """
+
+    def __init__(self, path: str, max_tokens: int = 256, batch_size: int = 32) -> None:
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backend needs: pip install onnxruntime tokenizers"
+            ) from e
+
+        self.batch_size = batch_size
+        self._tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=max_tokens)
+        self._tokenizer.enable_padding()
+        self._session = onnxruntime.InferenceSession(
+            os.path.join(path, "model.onnx"), providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {item.name for item in self._session.get_inputs()}
+        self.dimensions = len(self.embed(["warm-up"])[0])
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors: list[list[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(texts[i : i + self.batch_size]))
+        return vectors
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        import numpy as np
+
+        encodings = self._tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.zeros_like(ids)
+        hidden = self._session.run(None, feed)[0]  # (batch, tokens, width)
+
+        weights = mask[:, :, None].astype(hidden.dtype)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.tolist()
@@ -0,0 +1,212 @@
+"""
+Streaming document ingestion: anonymize -> chunk -> embed -> store.
+
+The stages run concurrently as asyncio tasks connected by bounded queues,
+so chunks are embedded and inserted while later parts of the document are
+still being anonymized, and a slow stage makes the ones before it wait
+instead of piling up results.  Apart from the input text itself, memory
+is bounded by the queue sizes and one embedding batch per stage, not by
+the document size.
+
+* anonymize -- the text is cut into overlapping sentence-aligned segments
+  that are analyzed on the anonymization pool (a few ahead, in parallel).
+  Each seam is owned by one side as in ``spans.merge_segments``, so an
+  entity cut by a segment edge is kept from the segment that saw it whole.
+  The text is rendered in order, as far as the spans are settled, with one
+  ``FakeGenerator`` for the whole document, so an entity gets the same
+  replacement in every segment.  A document that fits in one segment is
+  anonymized exactly as by ``engine.anonymize``.
+* chunk -- ``StreamingChunker`` turns the anonymized pieces into chunks.
+* embed -- chunks are embedded ``EMBED_BATCH`` at a time, which
+  ``embed_texts`` sends as several concurrent requests.
+* store -- each embedded batch is inserted with its chunk indexes.
+
+If any stage fails, the others are cancelled, the chunks already stored
+for the document are deleted again and the error is raised to the caller,
+so a failed ingest leaves nothing behind to duplicate on retry.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Awaitable
+
+from services.anonymization.fake_generator import FakeGenerator
+from services.anonymization.pool import (
+    SEGMENT_CHARS,
+    SEGMENT_OVERLAP,
+    get_pool,
+    run_analyze_spans,
+)
+from services.anonymization.segmentation import owns_span, seam_ranges, sentence_windows
+from services.anonymization.spans import (
+    Span,
+    apply_replacements,
+    resolve_overlaps,
+    settled_offset,
+)
+from services.rag.chunker import StreamingChunker
+from services.rag.embedder import BATCH_SIZE, CONCURRENCY, embed_texts
+from services.rag.retriever import delete_chunks, store_chunks
+
+logger = logging.getLogger(__name__)
+
+# Enough chunks per embed_texts call to fill its concurrent requests.
+EMBED_BATCH = BATCH_SIZE * max(1, CONCURRENCY)
+# Anonymized segments waiting to be chunked, chunks waiting to be
+# embedded, and embedded batches waiting to be stored.
+SEGMENT_QUEUE = 4
+CHUNK_QUEUE = 2 * EMBED_BATCH
+BATCH_QUEUE = 2
+
+_DONE = None  # end-of-stream marker
+
+
+async def ingest_document(
+    session_id: str,
+    document_name: str,
+    text: str,
+    profile: str | None = None,
+) -> dict:
+    """Anonymize, chunk, embed and store one document.
+
+    Returns ``{"chunks": int, "entities_found": Counter}`` with the number
+    of chunks stored and detections per entity type.
+    """
+    segments: asyncio.Queue = asyncio.Queue(SEGMENT_QUEUE)
+    chunks: asyncio.Queue = asyncio.Queue(CHUNK_QUEUE)
+    batches: asyncio.Queue = asyncio.Queue(BATCH_QUEUE)
+    # Rows stored so far, deleted again if a later stage fails.
+    chunk_ids: list[str] = []
+
+    try:
+        entities, _, _, stored = await _run_stages(
+            _anonymize(text, profile, segments),
+            _chunk(segments, chunks),
+            _embed(chunks, batches),
+            _store(batches, session_id, document_name, chunk_ids),
+        )
+    except BaseException:
+        try:
+            await delete_chunks(chunk_ids)
+        except Exception as e:
+            logger.error(f"[Ingest] Could not delete partial chunks of {document_name}: {e}")
+        raise
+    return {"chunks": stored, "entities_found": entities}
+
+
+async def _run_stages(*stages: Awaitable[Any]) -> list[Any]:
+    """Run *stages* concurrently; cancel them all if one fails."""
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+# --- Stages ---
+
+async def _anonymize(text: str, profile: str | None, out: asyncio.Queue) -> Counter:
+    entities: Counter = Counter()
+    generator = FakeGenerator(text)
+    windows = sentence_windows(text, SEGMENT_CHARS, SEGMENT_OVERLAP)
+    ranges = seam_ranges(windows)
+    # Keep every pool worker busy with one segment of this document.
+    ahead = max(1, get_pool().size)
+    pending: deque = deque()
+    upcoming = iter(enumerate(windows))
+    # Owned spans (document offsets) not rendered yet, and how far the
+    # text has been rendered.
+    unsettled: list[Span] = []
+    position = 0
+
+    def submit() -> None:
+        item = next(upcoming, None)
+        if item is not None:
+            index, (start, end) = item
+            analysis = asyncio.ensure_future(run_analyze_spans(text[start:end], profile))
+            pending.append((index, analysis))
+
+    try:
+        for _ in range(ahead):
+            submit()
+        while pending:
+            index, analysis = pending.popleft()
+            spans = await analysis
+            submit()
+            start = windows[index][0]
+            for span in spans:
+                shifted = Span(span.start + start, span.end + start, span.entity_type, span.score)
+                if owns_span(windows, ranges, index, shifted.start, shifted.end):
+                    unsettled.append(shifted)
+
+            # Later segments only find spans from their own start on.
+            cut = windows[index + 1][0] if index + 1 < len(windows) else len(text)
+            settled = settled_offset(unsettled, cut)
+            final = [
+                Span(s.start - position, s.end - position, s.entity_type, s.score)
+                for s in resolve_overlaps(unsettled)
+                if s.end <= settled
+            ]
+            unsettled = [s for s in unsettled if s.end > settled]
+            entities.update(span.entity_type for span in final)
+            piece = text[position:settled]
+            position = settled
+            # Only the text is kept; the generator holds the replacements.
+            await out.put(apply_replacements(piece, final, generator, [], set()))
+    finally:
+        for _, analysis in pending:
+            analysis.cancel()
+    await out.put(_DONE)
+    return entities
+
+
+async def _chunk(pieces: asyncio.Queue, out: asyncio.Queue) -> None:
+    chunker = StreamingChunker()
+    while (piece := await pieces.get()) is not _DONE:
+        for chunk in chunker.feed(piece):
+            await out.put(chunk)
+    for chunk in chunker.flush():
+        await out.put(chunk)
+    await out.put(_DONE)
+
+
+async def _embed(chunks: asyncio.Queue, out: asyncio.Queue) -> None:
+    batch: list[dict] = []
+    while True:
+        chunk = await chunks.get()
+        if chunk is not _DONE:
+            batch.append(chunk)
+        if batch and (chunk is _DONE or len(batch) >= EMBED_BATCH):
+            embeddings = await embed_texts(
+                [item["text"] for item in batch],
+                token_counts=[item["token_count"] for item in batch],
+            )
+            await out.put((batch, embeddings))
+            batch = []
+        if chunk is _DONE:
+            break
+    await out.put(_DONE)
+
+
+async def _store(
+    batches: asyncio.Queue, session_id: str, document_name: str, chunk_ids: list[str]
+) -> int:
+    stored = 0
+    while (item := await batches.get()) is not _DONE:
+        batch, embeddings = item
+        chunk_ids += await store_chunks(
+            session_id=session_id,
+            document_name=document_name,
+            chunks=[chunk["text"] for chunk in batch],
+            embeddings=embeddings,
+            token_counts=[chunk["token_count"] for chunk in batch],
+            start_index=stored,
+        )
+        stored += len(batch)
+    return stored
@@ -7,7 +7,8 @@ async def store_chunks(
     chunks: list[str],
     embeddings: list[list[float]],
     token_counts: list[int],
-) -> None:
+    start_index: int = 0,
+) -> list[str]:
     """Store document chunks with their embeddings in the document_chunks table.
 
     Args:
@@ -16,6 +17,11 @@ async def store_chunks(
         chunks: The anonymized text chunks.
         embeddings: The embedding vector for each chunk.
         token_counts: The token count for each chunk.
+        start_index: ``chunk_index`` of the first chunk, when a document
+            is stored in several calls.
+
+    Returns:
+        The IDs of the inserted rows, for ``delete_chunks``.
     """
     db = get_supabase()
 
@@ -29,11 +35,20 @@ async def store_chunks(
             "token_count": token_count,
         }
         for idx, (chunk, embedding, token_count) in enumerate(
-            zip(chunks, embeddings, token_counts)
+            zip(chunks, embeddings, token_counts), start=start_index
         )
     ]
 
-    db.table("document_chunks").insert(rows).execute()
+    response = db.table("document_chunks").insert(rows).execute()
+    return [row["id"] for row in response.data or []]
+
+
+async def delete_chunks(chunk_ids: list[str]) -> None:
+    """Delete the document_chunks rows with the given IDs."""
+    db = get_supabase()
+    # Keep each request's ID filter to a reasonable URL length.
+    for start in range(0, len(chunk_ids), 200):
+        db.table("document_chunks").delete().in_("id", chunk_ids[start : start + 200]).execute()
 
 
 async def search_chunks(
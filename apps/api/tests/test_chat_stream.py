@@ -0,0 +1,60 @@
+"""``ChatStream`` turns OpenRouter's SSE lines into token events."""
+
+import asyncio
+import json
+
+import httpx
+
+from services import chat_stream
+from services.chat_stream import ChatStream
+
+
+def _client_for(handler):
+    real_client = httpx.AsyncClient
+
+    def client(**kwargs):
+        return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    return client
+
+
+def _collect(stream):
+    async def run():
+        return [json.loads(event["data"]) async for event in stream.events()]
+
+    return asyncio.run(run())
+
+
+def test_tokens_are_transformed_and_flushed(monkeypatch):
+    lines = [
+        {"choices": [{"delta": {"content": "Hello "}}]},
+        {"choices": [{"delta": {"content": "Jo"}}]},
+        {"choices": [], "usage": {"prompt_tokens": 7, "completion_tokens": 2}},
+    ]
+    body = "".join(f"data: {json.dumps(line)}\n\n" for line in lines) + "data: [DONE]\n\n"
+    monkeypatch.setattr(
+        chat_stream.httpx, "AsyncClient", _client_for(lambda request: httpx.Response(200, text=body))
+    )
+
+    held = []
+
+    def transform(content):
+        held.append(content)
+        return content.upper() if content.endswith(" ") else ""
+
+    stream = ChatStream("model", [], transform=transform, flush=lambda: "".join(held[1:]))
+    assert _collect(stream) == [
+        {"type": "token", "content": "HELLO "},
+        {"type": "token", "content": "Jo"},
+    ]
+    assert stream.completed
+    assert (stream.prompt_tokens, stream.completion_tokens) == (7, 2)
+
+
+def test_upstream_error_is_an_error_event(monkeypatch):
+    monkeypatch.setattr(
+        chat_stream.httpx, "AsyncClient", _client_for(lambda request: httpx.Response(502, text="bad"))
+    )
+    stream = ChatStream("model", [])
+    assert _collect(stream) == [{"type": "error", "content": "OpenRouter error (502): bad"}]
+    assert not stream.completed
@@ -0,0 +1,31 @@
+"""A failed or short fetch fails every request waiting on it."""
+
+import asyncio
+
+import pytest
+
+from services.rag.embedding_cache import EmbeddingCache
+
+
+def test_short_fetch_fails_all_waiters():
+    async def scenario():
+        cache = EmbeddingCache(max_entries=10, disk_path="")
+        release = asyncio.Event()
+
+        async def short_fetch(texts, token_counts):
+            await release.wait()
+            return [[1.0, 0.0]]
+
+        owner = asyncio.ensure_future(cache.embed("m", ["p", "q"], None, short_fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.embed("m", ["q"], None, short_fetch))
+        await asyncio.sleep(0)
+        release.set()
+
+        with pytest.raises(ValueError, match="1 vectors for 2 texts"):
+            await owner
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(waiter, timeout=1)
+        assert cache.stats()["entries"] == 0
+
+    asyncio.run(scenario())
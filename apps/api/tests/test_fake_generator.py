@@ -0,0 +1,24 @@
+"""Replacements stay one-to-one and cheap past the size of the bank."""
+
+from services.anonymization.fake_bank import BANK_SIZE, get_bank
+from services.anonymization.fake_generator import FakeGenerator
+
+
+def test_replacements_stay_distinct_past_the_bank():
+    generator = FakeGenerator("document")
+    count = 3 * BANK_SIZE
+    replacements = {generator.replacement_for("PERSON", f"person {i}") for i in range(count)}
+    assert len(replacements) == count
+    assert generator.replacement_for("PERSON", "person 7") in replacements
+
+
+def test_taken_values_are_skipped():
+    generator = FakeGenerator("document")
+    values = get_bank().values("CASE_NUMBER")
+    for value in values[:-1]:
+        generator.remember("CASE_NUMBER", f"existing {value}", value)
+    assert generator.replacement_for("CASE_NUMBER", "new") == values[-1]
+
+
+def test_court_bank_is_not_tiny():
+    assert len(get_bank().values("COURT_NAME")) >= min(BANK_SIZE, 1000)
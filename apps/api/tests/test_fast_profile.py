@@ -0,0 +1,16 @@
+"""The fast profile never loads the NLP model."""
+
+from services.anonymization import analyzer, engine
+
+
+def test_fast_profile_uses_pattern_registry_only(monkeypatch):
+    def no_model():
+        raise AssertionError("the NLP model was loaded")
+
+    monkeypatch.setattr(analyzer, "get_analyzer", no_model)
+    monkeypatch.setattr(engine, "get_analyzer", no_model)
+    engine._pattern_recognizers.cache_clear()
+
+    spans = engine.analyze_spans("Write to jane.doe@example.com today.", profile="fast")
+    assert [(s.start, s.end, s.entity_type) for s in spans] == [(9, 29, "EMAIL_ADDRESS")]
+    assert not analyzer.is_loaded()
@@ -0,0 +1,74 @@
+"""Mapping sessions match known originals without rebuilding per chunk."""
+
+from services.anonymization.aho_corasick import AhoCorasick, KnownEntityMatcher
+import pytest
+
+from services.anonymization.mapping_sessions import (
+    MappingSession,
+    MappingSessionLimitError,
+    MappingSessionStore,
+)
+from services.anonymization.spans import Span
+
+
+def test_added_patterns_match_like_a_fresh_automaton():
+    text = "Ann met Annabel and Anna Berg at Bergen."
+    patterns = [("Ann", "A"), ("Anna Berg", "B"), ("Bergen", "C"), ("Annabel", "D")]
+    grown = AhoCorasick(patterns[:2])
+    grown.find(text)
+    grown.add(patterns[2:])
+    assert grown.find(text) == AhoCorasick(patterns).find(text)
+
+
+def test_first_entry_for_an_original_wins():
+    matcher = KnownEntityMatcher([{"original": "Ann", "entity_type": "PERSON"}])
+    matcher.add([{"original": "Ann", "entity_type": "LOCATION"}])
+    assert matcher.find("Ann") == [Span(0, 3, "PERSON", 1.0)]
+
+
+def test_session_finds_originals_of_earlier_chunks():
+    session = MappingSession("user-1")
+    first = "Call Ann Lee today."
+    _, delta = session.render(first, [Span(5, 12, "PERSON", 0.85)])
+    assert [entry["original"] for entry in delta] == ["Ann Lee"]
+
+    existing = [{"original": "Acme", "replacement": "Globex", "entity_type": "ORGANIZATION"}]
+    second = "Ann Lee works at Acme."
+    assert session.known_spans(second, existing) == [
+        Span(0, 7, "PERSON", 1.0),
+        Span(17, 21, "ORGANIZATION", 1.0),
+    ]
+
+    session.burn()
+    assert session.known_spans(second) == []
+
+
+def test_sessions_are_only_found_by_their_owner():
+    store = MappingSessionStore()
+    session = store.create("user-1")
+    assert store.get(session.id, "user-2") is None
+    assert not store.burn(session.id, "user-2")
+    assert store.get(session.id, "user-1") is session
+    assert store.burn(session.id, "user-1")
+
+
+def test_full_store_refuses_instead_of_evicting():
+    store = MappingSessionStore(max_sessions=2, max_per_user=2)
+    first = store.create("user-1")
+    store.create("user-2")
+    with pytest.raises(MappingSessionLimitError):
+        store.create("user-3")
+    assert store.get(first.id, "user-1") is first
+
+    store = MappingSessionStore(max_sessions=10, max_per_user=1)
+    store.create("user-1")
+    with pytest.raises(MappingSessionLimitError):
+        store.create("user-1")
+    store.create("user-2")
+
+
+def test_full_session_refuses_new_chunks():
+    session = MappingSession("user-1", max_entries=1)
+    session.render("Call Ann Lee today.", [Span(5, 12, "PERSON", 0.85)])
+    with pytest.raises(MappingSessionLimitError):
+        session.known_spans("Ann Lee again.")
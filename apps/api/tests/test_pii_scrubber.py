@@ -0,0 +1,19 @@
+"""The pooled chat scrubber fails closed when the pool cannot scrub."""
+
+import asyncio
+
+import pytest
+
+from services import pii_scrubber
+from services.anonymization import pool
+from services.anonymization.pool import PoolSaturatedError
+
+
+def test_pool_failure_raises_instead_of_passing_through(monkeypatch):
+    async def saturated(texts):
+        raise PoolSaturatedError("busy")
+
+    monkeypatch.setattr(pool, "run_scrub_texts", saturated)
+    messages = [{"role": "user", "content": "Call Ann Lee at 555-0100, a fresh message."}]
+    with pytest.raises(pii_scrubber.ScrubError):
+        asyncio.run(pii_scrubber.scrub_messages_pooled(messages))
@@ -0,0 +1,54 @@
+"""A failed ingest deletes the chunks it already stored."""
+
+import asyncio
+
+import pytest
+
+from services.rag import pipeline
+
+
+class _PieceChunker:
+    """One chunk per anonymized piece, without a tokenizer."""
+
+    def feed(self, piece):
+        return [{"text": piece, "token_count": 1}]
+
+    def flush(self):
+        return []
+
+
+def test_failed_ingest_deletes_stored_chunks(monkeypatch):
+    stored: list[str] = []
+    deleted: list[str] = []
+    calls = []
+
+    async def analyze(segment, profile):
+        return []
+
+    async def embed(texts, token_counts=None):
+        calls.append(len(texts))
+        if len(calls) == 3:
+            raise RuntimeError("embedding failed")
+        return [[0.0] for _ in texts]
+
+    async def store(**kwargs):
+        ids = [f"{kwargs['start_index'] + i}" for i in range(len(kwargs["chunks"]))]
+        stored.extend(ids)
+        return ids
+
+    async def delete(chunk_ids):
+        deleted.extend(chunk_ids)
+
+    monkeypatch.setattr(pipeline, "run_analyze_spans", analyze)
+    monkeypatch.setattr(pipeline, "embed_texts", embed)
+    monkeypatch.setattr(pipeline, "store_chunks", store)
+    monkeypatch.setattr(pipeline, "delete_chunks", delete)
+    monkeypatch.setattr(pipeline, "StreamingChunker", _PieceChunker)
+    monkeypatch.setattr(pipeline, "EMBED_BATCH", 2)
+    monkeypatch.setattr(pipeline, "SEGMENT_CHARS", 100)
+    monkeypatch.setattr(pipeline, "SEGMENT_OVERLAP", 20)
+
+    text = " ".join(f"Sentence number {i}." for i in range(100))
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        asyncio.run(pipeline.ingest_document("session", "doc.txt", text))
+    assert stored and deleted == stored
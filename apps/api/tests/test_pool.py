@@ -0,0 +1,56 @@
+"""Pool slots and restarts follow the workers, not the callers."""
+
+import asyncio
+import os
+
+import pytest
+
+from services.anonymization import pool as pool_module
+from services.anonymization.pool import (
+    AnonymizationPool,
+    AnonymizationTimeoutError,
+    PoolCrashedError,
+    PoolSaturatedError,
+)
+
+
+def test_timed_out_call_holds_its_slot():
+    async def scenario():
+        # size=0 runs calls on threads, which behave the same way here.
+        pool = AnonymizationPool(size=0, queue_size=0, timeout=0.05)
+        with pytest.raises(AnonymizationTimeoutError):
+            await pool.run("time:sleep", 0.5)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run("builtins:len", "x")
+        await asyncio.sleep(0.6)
+        assert await pool.run("builtins:len", "x") == 1
+        assert pool._pending == 0
+
+    asyncio.run(scenario())
+
+
+def _no_warm_up(pids=None):
+    if pids is not None:
+        pids.put(os.getpid())
+
+
+def test_worker_crash_restarts_the_pool_once(monkeypatch):
+    monkeypatch.setattr(pool_module, "_worker_init", _no_warm_up)
+    pool = AnonymizationPool(size=2, queue_size=8, timeout=30, start_method="fork")
+    starts = []
+    start = pool.start
+    monkeypatch.setattr(pool, "start", lambda: (starts.append(1), start()))
+
+    async def scenario():
+        pool.start()
+        calls = [pool.run("time:sleep", 0.2) for _ in range(5)]
+        calls.append(pool.run("os:_exit", 1))
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert any(isinstance(r, PoolCrashedError) for r in results)
+        assert await pool.run("builtins:len", "xy") == 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert len(starts) == 2
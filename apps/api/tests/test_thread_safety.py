@@ -0,0 +1,72 @@
+"""Concurrent ``engine.anonymize`` calls give the same results as sequential ones.
+
+Distinct documents are anonymized once sequentially for reference outputs,
+then many times from a thread pool in shuffled order.  Any cross-talk
+between concurrent calls (shared random state, shared caches) shows up as
+a mismatch.
+"""
+
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from presidio_analyzer import RecognizerResult
+
+from services.anonymization import engine
+from services.anonymization.result_cache import AnalysisCache
+
+_FIRST = ["Maria", "James", "Wei", "Fatima", "Oliver", "Priya", "Diego", "Anna"]
+_LAST = ["Garcia", "Smith", "Chen", "Khan", "Brown", "Patel", "Lopez", "Novak"]
+_NAME = re.compile(rf"(?:{'|'.join(_FIRST)}) (?:{'|'.join(_LAST)})")
+
+DOCUMENTS = 40
+CALLS = 400
+THREADS = 16
+
+
+def build_document(index: int) -> str:
+    """Return a short, entity-rich document unique to *index*."""
+    rng = random.Random(index)
+    lines = [f"Matter {index}: engagement letter."]
+    for _ in range(rng.randint(3, 8)):
+        first, last = rng.choice(_FIRST), rng.choice(_LAST)
+        lines.append(
+            f"{first} {last} can be reached at {first.lower()}.{last.lower()}{index}@example.com "
+            f"or 212-555-{rng.randint(1000, 9999)} regarding Case No. "
+            f"{rng.randint(2015, 2024)}-CV-{rng.randint(1000, 99999)}."
+        )
+    return "\n\n".join(lines)
+
+
+class _NameBatchAnalyzer:
+    """Stands in for the spaCy-backed batch analyzer: finds names only."""
+
+    def analyze_iterator(self, texts, language, entities):
+        return [
+            [RecognizerResult("PERSON", m.start(), m.end(), 0.85) for m in _NAME.finditer(text)]
+            for text in texts
+        ]
+
+
+def _check_concurrent(profile: str) -> None:
+    documents = [build_document(i) for i in range(DOCUMENTS)]
+    reference = [engine.anonymize(doc, profile=profile) for doc in documents]
+    assert any(result["mapping"] for result in reference)
+
+    order = [i % DOCUMENTS for i in range(CALLS)]
+    random.Random(0).shuffle(order)
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = list(
+            executor.map(lambda i: (i, engine.anonymize(documents[i], profile=profile)), order)
+        )
+    assert [i for i, result in results if result != reference[i]] == []
+
+
+def test_fast_profile_is_thread_safe():
+    _check_concurrent("fast")
+
+
+def test_full_profile_with_shared_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(engine, "get_batch_analyzer", lambda: _NameBatchAnalyzer())
+    monkeypatch.setattr(engine, "_cache", AnalysisCache())
+    _check_concurrent("full")
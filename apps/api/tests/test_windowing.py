@@ -0,0 +1,102 @@
+"""Seams between analysis windows must not lose entities."""
+
+import asyncio
+import re
+
+from presidio_analyzer import RecognizerResult
+
+from services.anonymization import engine
+from services.anonymization.segmentation import owns_span, seam_ranges, sentence_windows
+from services.anonymization.spans import Span, merge_segments, resolve_overlaps
+
+# The only sentence boundary in the first window's overlap is its own end.
+TEXT = "word " * 36 + "end. " + "John Smith went home " + "word " * 60 + "done."
+NAME = re.compile(r"John Smith")
+
+
+class _NameAnalyzer:
+    """Stands in for the spaCy-backed analyzer: finds ``John Smith`` only."""
+
+    def analyze(self, text, language, entities):
+        return [RecognizerResult("PERSON", m.start(), m.end(), 0.85) for m in NAME.finditer(text)]
+
+
+def test_windows_overlap_without_a_boundary():
+    windows = sentence_windows(TEXT, 200, 50)
+    assert len(windows) > 1
+    for (_, end), (next_start, _) in zip(windows, windows[1:]):
+        assert end - next_start >= 25
+
+
+def test_every_position_has_one_owner():
+    windows = sentence_windows(TEXT, 200, 50)
+    ranges = seam_ranges(windows)
+    for position in range(len(TEXT)):
+        owners = [i for i, (lo, hi) in enumerate(ranges) if lo <= position < hi]
+        assert len(owners) == 1
+        start, end = windows[owners[0]]
+        assert start <= position < end
+
+
+def test_entity_at_window_start_is_kept(monkeypatch):
+    monkeypatch.setattr(engine, "WINDOW_SIZE", 200)
+    monkeypatch.setattr(engine, "WINDOW_OVERLAP", 50)
+    monkeypatch.setattr(engine, "get_analyzer", lambda: _NameAnalyzer())
+
+    found = engine._analyze_windowed(TEXT, ["PERSON"])
+
+    expected = NAME.search(TEXT).span()
+    assert [(r.start, r.end) for r in resolve_overlaps(found)] == [expected]
+
+
+def test_entity_cut_by_a_window_edge_is_kept_whole():
+    text = "word " * 37 + "John Smith " + "word " * 60
+    windows = sentence_windows(text, 200, 50)
+    ranges = seam_ranges(windows)
+    kept = []
+    for index, (start, end) in enumerate(windows):
+        for match in re.finditer(r"John(?: Smith)?", text[start:end]):
+            span = (match.start() + start, match.end() + start)
+            if owns_span(windows, ranges, index, *span):
+                kept.append(span)
+    assert NAME.search(text).span() in kept
+
+
+def test_merged_segments_keep_entity_at_segment_start():
+    windows = sentence_windows(TEXT, 200, 50)
+    segment_spans = [
+        [Span(m.start(), m.end(), "PERSON", 0.85) for m in NAME.finditer(TEXT[start:end])]
+        for start, end in windows
+    ]
+
+    merged = merge_segments(TEXT, windows, segment_spans)
+
+    assert [(s.start, s.end) for s in merged] == [NAME.search(TEXT).span()]
+
+
+def test_pipeline_keeps_entity_at_segment_seam(monkeypatch):
+    from services.anonymization.fake_generator import FakeGenerator
+    from services.anonymization.spans import apply_replacements
+    from services.rag import pipeline
+
+    async def analyze(segment, profile):
+        return [Span(m.start(), m.end(), "PERSON", 0.85) for m in NAME.finditer(segment)]
+
+    monkeypatch.setattr(pipeline, "SEGMENT_CHARS", 200)
+    monkeypatch.setattr(pipeline, "SEGMENT_OVERLAP", 50)
+    monkeypatch.setattr(pipeline, "run_analyze_spans", analyze)
+
+    async def run():
+        out = asyncio.Queue()
+        entities = await pipeline._anonymize(TEXT, None, out)
+        pieces = []
+        while (piece := out.get_nowait()) is not None:
+            pieces.append(piece)
+        return entities, "".join(pieces)
+
+    entities, anonymized = asyncio.run(run())
+    spans = [Span(m.start(), m.end(), "PERSON", 0.85) for m in NAME.finditer(TEXT)]
+    expected = apply_replacements(TEXT, spans, FakeGenerator(TEXT), [], set())
+    assert entities == {"PERSON": 1}
+    assert anonymized == expected
+    assert "John Smith" not in anonymized
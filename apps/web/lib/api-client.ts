@@ -42,25 +42,65 @@ class ApiClient {
   async anonymize(
     text: string,
     token?: string | null,
-    existingMapping?: { original: string; replacement: string; entity_type: string }[]
+    existingMapping?: { original: string; replacement: string; entity_type: string }[],
+    options: { mappingSessionId?: string | null; responseFormat?: "full" | "spans" } = {}
   ) {
     const payload: Record<string, unknown> = { text };
     if (existingMapping && existingMapping.length > 0) {
       payload.existing_mapping = existingMapping;
     }
+    if (options.mappingSessionId) {
+      payload.mapping_session_id = options.mappingSessionId;
+    }
+    if (options.responseFormat) {
+      payload.response_format = options.responseFormat;
+    }
     const res = await safeFetch("/api/anonymize", {
       method: "POST",
       headers: this.getHeaders(token),
       body: JSON.stringify(payload),
     });
     if (!res.ok) throw new Error(await res.text());
-    return res.json();
+    const result = await res.json();
+    if (result.spans && result.anonymized_text === undefined) {
+      // Compact format: rebuild the anonymized text from the sent text.
+      result.anonymized_text = applyReplacementSpans(text, result.spans);
+      delete result.spans;
+    }
+    return result;
+  }
+
+  /** Open a server-side mapping session; returns null if unavailable. */
+  async openMappingSession(token?: string | null): Promise<string | null> {
+    try {
+      const res = await safeFetch("/api/anonymize/mapping-sessions", {
+        method: "POST",
+        headers: this.getHeaders(token),
+      });
+      if (!res.ok) return null;
+      const data = await res.json();
+      return data.mapping_session_id ?? null;
+    } catch {
+      return null;
+    }
+  }
+
+  async burnMappingSession(mappingSessionId: string, token?: string | null) {
+    try {
+      await safeFetch(`/api/anonymize/mapping-sessions/${encodeURIComponent(mappingSessionId)}`, {
+        method: "DELETE",
+        headers: this.getHeaders(token),
+      });
+    } catch {}
   }
 
   /**
    * Anonymize large text by splitting into chunks and processing each
-   * sequentially. Each chunk sends the accumulated mapping from previous
-   * chunks so entity replacements stay consistent.
+   * sequentially. The mapping is kept in a server-side mapping session so
+   * each chunk only returns the entries it added; if no session can be
+   * opened (signed out, or a session limit is reached) or it expires,
+   * chunks send the accumulated mapping instead so entity replacements
+   * stay consistent.
    */
   async anonymizeChunked(
     text: string,
@@ -77,31 +117,53 @@ class ApiClient {
 
     let allAnonymized = "";
     const allMapping: { original: string; replacement: string; entity_type: string }[] = [];
+    const seen = new Set<string>();
     const entityCounts: Record<string, number> = {};
+    const openedSessionId = await this.openMappingSession(token);
+    let mappingSessionId = openedSessionId;
+
+    try {
+      for (let i = 0; i < chunks.length; i++) {
+        onProgress?.(
+          Math.round(((i) / chunks.length) * 100),
+          `Anonymizing part ${i + 1} of ${chunks.length}...`
+        );
+
+        let result;
+        if (mappingSessionId) {
+          try {
+            result = await this.anonymize(chunks[i], token, undefined, {
+              mappingSessionId,
+              responseFormat: "spans",
+            });
+          } catch {
+            // Session expired, full, or served by another worker: resend the mapping.
+            mappingSessionId = null;
+          }
+        }
+        if (!result) {
+          result = await this.anonymize(chunks[i], token, allMapping, { responseFormat: "spans" });
+        }
 
-    for (let i = 0; i < chunks.length; i++) {
-      onProgress?.(
-        Math.round(((i) / chunks.length) * 100),
-        `Anonymizing part ${i + 1} of ${chunks.length}...`
-      );
-
-      const result = await this.anonymize(chunks[i], token, allMapping);
+        allAnonymized += result.anonymized_text;
 
-      allAnonymized += result.anonymized_text;
+        // Accumulate mapping (deduplicate by original+entity_type)
+        for (const entry of result.mapping) {
+          const key = `${entry.entity_type}:${entry.original}`;
+          if (!seen.has(key)) {
+            seen.add(key);
+            allMapping.push(entry);
+          }
+        }
 
-      // Accumulate mapping (deduplicate by original+entity_type)
-      const seen = new Set(allMapping.map((m: { entity_type: string; original: string }) => `${m.entity_type}:${m.original}`));
-      for (const entry of result.mapping) {
-        const key = `${entry.entity_type}:${entry.original}`;
-        if (!seen.has(key)) {
-          seen.add(key);
-          allMapping.push(entry);
+        // Accumulate entity counts
+        for (const entity of result.entities_found) {
+          entityCounts[entity.type] = (entityCounts[entity.type] || 0) + entity.count;
         }
       }
-
-      // Accumulate entity counts
-      for (const entity of result.entities_found) {
-        entityCounts[entity.type] = (entityCounts[entity.type] || 0) + entity.count;
+    } finally {
+      if (openedSessionId) {
+        void this.burnMappingSession(openedSessionId, token);
       }
     }
 
@@ -366,4 +428,23 @@ function splitTextIntoChunks(text: string, maxChars: number): string[] {
   return chunks;
 }
 
+/**
+ * Apply the replacement spans of a `response_format: "spans"` anonymize
+ * response to the text that was sent.  Offsets and lengths are in UTF-16
+ * code units, i.e. plain JavaScript string indices, ordered by offset.
+ */
+export function applyReplacementSpans(
+  text: string,
+  spans: { offset: number; length: number; replacement: string }[]
+): string {
+  const parts: string[] = [];
+  let position = 0;
+  for (const span of spans) {
+    parts.push(text.slice(position, span.offset), span.replacement);
+    position = span.offset + span.length;
+  }
+  parts.push(text.slice(position));
+  return parts.join("");
+}
+
 export const apiClient = new ApiClient();